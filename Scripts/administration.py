@@ -130,7 +130,12 @@ class ABSAdmin(Extension):
     async def test_server_connection(self, ctx: SlashContext):
         try:
 
-            status = c.bookshelf_test_connection()
+            await ctx.defer(ephemeral=EPHEMERAL_OUTPUT)
+            status = await c.bookshelf_test_connection(max_attempts=1, exit_on_failure=False)
+            if status is None:
+                await ctx.send(f"Could not connect to {os.getenv('bookshelfURL')}, please check the logs.",
+                               ephemeral=EPHEMERAL_OUTPUT)
+                return
             await ctx.send(f"Successfully connected to {os.getenv('bookshelfURL')} with status: {status}",
                            ephemeral=EPHEMERAL_OUTPUT)
 
@@ -1,14 +1,24 @@
 import asyncio
 import os
+import time
+from collections import deque
+from functools import partial
+from typing import Optional
 
 import pytz
 from interactions import *
 
-import discord
 from main import voice_adapter
 from voice_adapter import VoiceStateShim
+from audio_pipeline import MonitoredSource, create_audio_source, uses_ffmpeg_volume
+from audio_cache import cached_url, prefetch
+from playback_session import (PlaybackSession, ResourceSampler, SESSION_ATTRIBUTES, StreamHealth, bind_guild,
+                              bind_guild_of, current_guild_id, next_book_start_time, playback_stats)
+import runtime_metrics
 
 import bookshelfAPI as c
+import catalog_index
+from scheduler import Job, scheduler
 import settings as s
 from settings import TIMEZONE
 from ui_components import get_playback_rows, create_playback_embed
@@ -27,6 +37,21 @@ logger = logging.getLogger("bot")
 # Update Frequency for session sync
 updateFrequency = s.UPDATES
 
+# Paused sessions are checked after AUTO_KILL_INTERVAL seconds and stopped AUTO_KILL_GRACE seconds after a warning
+AUTO_KILL_INTERVAL = int(os.getenv('AUTO_KILL_INTERVAL', '240'))
+AUTO_KILL_GRACE = int(os.getenv('AUTO_KILL_GRACE', '60'))
+
+# Seconds before the end of a book or episode to prepare the next one when autoplay is on
+PREWARM_LEAD = int(os.getenv('PREWARM_LEAD', '120'))
+
+# A playing stream that delivers no audio for STALL_TIMEOUT seconds is restarted at the last delivered position,
+# the session is ended after STALL_MAX_RETRIES restarts in a row that produce no audio
+STALL_TIMEOUT = int(os.getenv('STALL_TIMEOUT', '15'))
+STALL_MAX_RETRIES = int(os.getenv('STALL_MAX_RETRIES', '3'))
+STALL_CHECK_INTERVAL = max(1.0, STALL_TIMEOUT / 3)
+# A stream ending further than this from the end of the item dropped rather than finished
+STREAM_END_MARGIN = 10.0
+
 # Default only owner can use this bot
 ownership = s.OWNER_ONLY
 
@@ -47,66 +72,111 @@ def time_converter(time_sec: int) -> str:
 
 class AudioPlayBack(Extension):
     def __init__(self, bot):
-        # ABS Variables
-        self.cover_image = ''
-        self.bookItemID = ''
-        self.bookTitle = ''
-        self.bookDuration = None
-        self.bookFinished = False
-        # User Variables
-        self.username = ''
-        self.user_type = ''
-        self.current_channel = None
-        self.active_guild_id = None
-        # Session Variables
-        self.sessionID = ''
-        self.currentTime = 0.0
-        self.nextTime = None
-        self.activeSessions = 0
-        self.stream_started = False
-        self.sessionOwner = None
-        self.announcement_message = None
-        self.repeat_enabled = False
-        self.needs_restart = False
-        # Audio Variables
-        self.audio_source = None          # discord.PCMVolumeTransformer
-        self.active_guild_id = None       # already exists, keep it
-        self.context_voice_channel = None
-        self.current_playback_time = 0
-        self.audio_context = None
-        self.bitrate = 128000
-        self.volume = 0.5
-        self.placeholder = None
-        self.playbackSpeed = 1.0
-        self.updateFreqMulti = updateFrequency * self.playbackSpeed
-        self.play_state = 'stopped'
-        self.audio_message = None
-        self.needs_encoder = True
-        # Chapter Variables
-        self.currentChapter = None
-        self.chapterArray = None
-        self.currentChapterTitle = ''
-        self.newChapterTitle = ''
-        self.found_next_chapter = False
-        # Series Variables
-        self.currentSeries = None  # Series metadata
-        self.seriesAutoplay = True  # Auto-progression for book series
-        self.seriesList = []  # List of book IDs in series order
-        self.seriesIndex = None  # Current position in series
-        self.previousBookID = None
-        self.previousBookTime = None
-        self.isLastBookInSeries = False
-        self.isFirstBookInSeries = False
-        self.seriesBookCache = {}
-        # Podcast Variables
-        self.isPodcast = False
-        self.podcastAutoplay = True  # Auto-progression for podcast episodes
-        self.podcastEpisodes = []
-        self.currentEpisodeIndex = None
-        self.totalEpisodes = 0
-        self.isFirstEpisode = False
-        self.isLastEpisode = False
-        self.currentEpisodeTitle = ''
+        # guild id -> PlaybackSession, every guild streams independently
+        self.sessions = {}
+        self.resource_sampler = ResourceSampler()
+        # Seconds between the end of an item and the next one playing, for autoplay transitions
+        self.transition_gaps = deque(maxlen=100)
+        self.stream_health = StreamHealth()
+        self.loop = None
+        self.add_extension_prerun(self.bind_interaction_guild)
+        voice_adapter.on_end = self.on_playback_end
+        runtime_metrics.register_provider("playback", self.playback_stats)
+
+    # Sessions ---------------------------------
+
+    def __getattr__(self, name):
+        # Only reached for attributes not set on the extension itself
+        if name in SESSION_ATTRIBUTES:
+            if current_guild_id() is None:
+                logger.debug(f"Reading {name} with no guild bound, using the default")
+            return getattr(self.get_session(), name)
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def __setattr__(self, name, value):
+        if name in SESSION_ATTRIBUTES:
+            session = self.get_session()
+            if session.guild_id is None:
+                # A callback that runs outside of _run_for_guild or an interaction, its state would be lost
+                logger.warning(f"Writing {name} with no guild bound, the value is dropped", stack_info=True)
+            elif session.guild_id not in self.sessions:
+                logger.debug(f"No playback session in guild {session.guild_id}, dropping {name}")
+            setattr(session, name, value)
+        else:
+            super().__setattr__(name, value)
+
+    async def bind_interaction_guild(self, ctx, *args, **kwargs):
+        """
+        Extension prerun, commands and component callbacks work on their guild's session and talk to ABS
+        as the user who started it.
+        """
+        bind_guild_of(ctx)
+        session = self.sessions.get(current_guild_id())
+        if session is not None:
+            c.use_client(session.abs_client)
+
+    def get_session(self, guild_id: int = None) -> PlaybackSession:
+        """
+        :param guild_id: defaults to the guild bound to the current task
+        :return: the guild's PlaybackSession. Without playback in the guild a detached session holding the
+                 defaults is returned and never stored, so reads and writes after cleanup don't revive it.
+        """
+        if guild_id is None:
+            guild_id = current_guild_id()
+        session = self.sessions.get(guild_id)
+        if session is None:
+            session = self._create_session(guild_id, attached=False)
+        return session
+
+    def open_session(self, guild_id: int) -> PlaybackSession:
+        """Create the guild's session and its background tasks, only the play path starts playback."""
+        session = self.sessions.get(guild_id)
+        if session is None:
+            session = self._create_session(guild_id)
+        return session
+
+    def _create_session(self, guild_id: int, attached: bool = True) -> PlaybackSession:
+        """:param attached: store the session and register its jobs, detached sessions only hold defaults"""
+        session = PlaybackSession(guild_id)
+        session.updateFreqMulti = updateFrequency * session.playbackSpeed
+        # Playback and its background tasks keep the ABS identity of the user who started it
+        session.abs_client = c.current_client()
+        make_job = scheduler.add_job if attached else Job
+        session.session_update = Task(partial(self._run_for_guild, guild_id, self.sync_session),
+                                      IntervalTrigger(seconds=updateFrequency))
+        session.auto_kill_session = make_job(
+            f'auto-kill-session-{guild_id}', partial(self._run_for_guild, guild_id, self.check_idle_session),
+            interval=AUTO_KILL_INTERVAL, jitter=0)
+        session.stall_watchdog = make_job(
+            f'stall-watchdog-{guild_id}', partial(self._run_for_guild, guild_id, self.check_stream),
+            interval=STALL_CHECK_INTERVAL, jitter=0)
+        if attached:
+            self.sessions[guild_id] = session
+        return session
+
+    def _remove_session(self, guild_id: int):
+        session = self.sessions.pop(guild_id, None)
+        if session is None:
+            return
+        if session.prewarm_task and not session.prewarm_task.done():
+            session.prewarm_task.cancel()
+        if session.session_update.running:
+            session.session_update.stop()
+        session.auto_kill_session.stop()
+        scheduler.remove_job(session.auto_kill_session.name)
+        scheduler.remove_job(session.stall_watchdog.name)
+
+    async def _run_for_guild(self, guild_id: int, func):
+        session = self.sessions.get(guild_id)
+        if session is None:
+            # Cleaned up since the task was scheduled
+            return None
+        bind_guild(guild_id)
+        c.use_client(session.abs_client)
+        return await func()
+
+    def playback_stats(self) -> dict:
+        return playback_stats(self.sessions, self.resource_sampler, self.transition_gaps, self.stream_health)
 
     # Tasks ---------------------------------
 
@@ -207,18 +277,12 @@ class AudioPlayBack(Extension):
             # Build discord.py audio object
             preserved_vol = self.volume if hasattr(self, 'volume') and self.volume is not None else 0.5
 
-            ffmpeg_audio = discord.FFmpegPCMAudio(
-                audio_obj,
-                before_options=f"-re -ss {actual_start_time}",
-                options=""
-            )
-
-            audio = discord.PCMVolumeTransformer(
-                ffmpeg_audio,
-                volume=preserved_vol
-            )
+            # FFmpeg reads through the local audio cache when it is running
+            stream_url = cached_url(audio_obj)
+            audio = await create_audio_source(stream_url, actual_start_time, preserved_vol, self.bitrate)
 
             self.volume = preserved_vol
+            self.stream_url = stream_url
 
             # Update instance variables
             self.sessionID = session_id
@@ -240,8 +304,8 @@ class AudioPlayBack(Extension):
             logger.error(f"Error building session for item {item_id}: {e}")
             raise
 
-    @Task.create(trigger=IntervalTrigger(seconds=updateFrequency))
-    async def session_update(self):
+    async def sync_session(self):
+        """Runs every updateFrequency seconds as the guild session's session_update task"""
         # Check for restart flag
         if self.needs_restart:
             self.needs_restart = False
@@ -266,14 +330,26 @@ class AudioPlayBack(Extension):
             vc = voice_adapter.voice_clients.get(self.active_guild_id)
             if vc and vc.is_playing():
                 self.stream_started = True
+                self.stall_watchdog.start()
                 logger.info("🎵 Playback confirmed (discord.py)")
             else:
                 logger.info("Waiting for playback to begin...")
                 return
 
+        # Report the audio that reached Discord, counted in frames, so pauses, stalls and seeks don't drift
+        source = self.audioObj
+        listened, position = updateFrequency, self.nextTime
+        if isinstance(source, MonitoredSource):
+            listened, position = source.unsynced_seconds, source.position
+            # ABS ignores syncs of a second or less, the frames are reported with the next one
+            if listened <= 1:
+                logger.info("No audio delivered since the last sync, waiting for the stream")
+                return
+            source.mark_synced()
+
         logger.debug(f"Initializing Session Sync, current refresh rate set to: {updateFrequency} seconds")
         try:
-            self.current_playback_time = self.current_playback_time + updateFrequency
+            self.current_playback_time = self.current_playback_time + listened
             formatted_time = time_converter(self.current_playback_time)
 
             # Try to update the session
@@ -281,8 +357,8 @@ class AudioPlayBack(Extension):
                 updatedTime, duration, serverCurrentTime, finished_book = await c.bookshelf_session_update(
                     item_id=self.bookItemID,
                     session_id=self.sessionID,
-                    current_time=updateFrequency,
-                    next_time=self.nextTime,
+                    current_time=listened,
+                    next_time=position,
                     episode_id=getattr(self, 'episodeId', None))
 
                 self.currentTime = updatedTime
@@ -303,35 +379,13 @@ class AudioPlayBack(Extension):
                                 return  # Let the restart logic handle it
 
 
-                            elif self.podcastAutoplay and self.isPodcast and not self.isLastEpisode:
-                                logger.info("Episode completed - moving to next episode")
-
-                                # Move to next episode
-                                success = await self.move_to_podcast_episode(relative_move=1)
-                                if success:
-                                    logger.info("Successfully moved to next episode")
-                                    return  # Continue with the new episode
-                                else:
-                                    logger.error("Failed to move to next episode")
-                                    await self.cleanup_session("episode progression failed")
-                                    return
-
-                            elif self.seriesAutoplay and self.currentSeries and not self.isLastBookInSeries:
-                                logger.info("Book completed - moving to next book in series")
-
-                                # Store current book as previous
-                                self.previousBookID = self.bookItemID
-                                self.previousBookTime = self.currentTime
-
-                                # Move to next book
-                                success = await self.move_to_series_book("next")
-                                if success:
-                                    logger.info("Successfully moved to next book in series")
-                                    return  # Continue with the new book
-                                else:
-                                    logger.error("Failed to move to next book in series")
-                                    await self.cleanup_session("series progression failed")
-                                    return
+                            elif self.transitioning:
+                                # The end of the stream already started the next item
+                                return
+
+                            elif self.next_autoplay_kind():
+                                await self.advance_autoplay(self.next_autoplay_kind())
+                                return
                             else:
                                 logger.info("Stream has reached the end - cleaning up")
                                 await self.cleanup_session("natural audio completion")
@@ -345,6 +399,10 @@ class AudioPlayBack(Extension):
                         await self.cleanup_session("book completed by ABS")
                         return
 
+                # Prepare the next book or episode while this one plays out
+                if duration and 0 < duration - updatedTime <= PREWARM_LEAD:
+                    self.start_prewarm()
+
             except TypeError as e:
                 logger.warning(f"Session update error: {e} - session may be invalid or closed")
                 # Continue with task to allow chapter update even if session update fails
@@ -352,7 +410,7 @@ class AudioPlayBack(Extension):
             # Try to get current chapter
             try:
                 current_chapter, chapter_array, bookFinished, isPodcast = await c.bookshelf_get_current_chapter(
-                    self.bookItemID, updatedTime if 'updatedTime' in locals() else None)
+                    self.bookItemID, updatedTime if 'updatedTime' in locals() else position)
 
                 if not isPodcast and current_chapter and self.chapterArray and len(self.chapterArray) > 0:
                     # Check if current_chapter has a title key
@@ -452,13 +510,13 @@ class AudioPlayBack(Extension):
             logger.debug("Stopped session_update task")
 
         if self.auto_kill_session.running:
-            self.auto_kill_session.stop()
+            self.stop_auto_kill()
             logger.debug("Stopped auto_kill_session task")
 
         # Stop voice playback if active
         try:
             if getattr(self, "voice_state", None):
-                self.voice_state.stop()
+                self.stop_stream()
                 logger.debug("Stopped voice playback")
         except Exception as e:
             logger.debug(f"Error stopping voice playback: {e}")
@@ -492,14 +550,6 @@ class AudioPlayBack(Extension):
             except Exception as e:
                 logger.debug(f"Error closing ABS session: {e}")
 
-        # Clear bot presence
-        try:
-            if hasattr(self, 'client'):
-                await self.client.change_presence(activity=None)
-                logger.debug("Cleared bot presence")
-        except Exception as e:
-            logger.debug(f"Error clearing presence: {e}")
-
         # Reset all state variables
         try:
             self.sessionID = ''
@@ -558,50 +608,310 @@ class AudioPlayBack(Extension):
         except Exception as e:
             logger.error(f"Error resetting state variables: {e}")
 
-        # Clear presence
-        try:
-            await self.client.change_presence(activity=None)
-        except:
-            pass
-
-    @Task.create(trigger=IntervalTrigger(minutes=4))
-    async def auto_kill_session(self):
-        if self.play_state == 'paused' and self.audio_message is not None:
-            logger.warning("Auto kill session task active! Playback was paused, verifying if session should be active.")
-            voice_state = self.bot.get_bot_voice_state(self.active_guild_id)
-            channel = await self.bot.fetch_channel(self.current_channel)
-
-            chan_msg = await channel.send(
-                f"Current playback of **{self.bookTitle}** will be stopped in **60 seconds** if no activity occurs.")
-            await asyncio.sleep(60)
-
-            if channel and voice_state and self.play_state == 'paused':
-                await chan_msg.edit(
-                    content=f'Current playback of **{self.bookTitle}** has been stopped due to inactivity.')
-                await voice_state.stop()
-                await voice_state.disconnect()
-                await c.bookshelf_close_session(self.sessionID)
-                logger.warning("audio session deleted due to timeout.")
+        # Drop the guild's session, other guilds keep streaming
+        self._remove_session(current_guild_id())
+
+        # Clear presence once no guild is streaming
+        if not any(session.active for session in self.sessions.values()):
+            try:
+                await self.client.change_presence(activity=None)
+                logger.debug("Cleared bot presence")
+            except Exception as e:
+                logger.debug(f"Error clearing presence: {e}")
+
+    async def check_idle_session(self):
+        """
+        Scheduled as the guild session's auto-kill-session job. The first run while paused posts a warning and defers
+        the job by AUTO_KILL_GRACE seconds, the next run stops the session if playback is still paused.
+        """
+        if self.auto_kill_message is None:
+            if self.play_state == 'paused' and self.audio_message is not None:
+                logger.warning("Auto kill session task active! Playback was paused, verifying if session should be active.")
+                channel = await self.bot.fetch_channel(self.current_channel)
+                self.auto_kill_message = await channel.send(
+                    f"Current playback of **{self.bookTitle}** will be stopped in **{AUTO_KILL_GRACE} seconds** "
+                    f"if no activity occurs.")
+                self.auto_kill_session.defer(AUTO_KILL_GRACE)
+            return
+
+        chan_msg, self.auto_kill_message = self.auto_kill_message, None
 
-                # Reset Vars and close out loops
-                self.current_channel = None
-                self.play_state = 'stopped'
-                self.audio_message = None
-                self.activeSessions -= 1
-                self.sessionOwner = None
-                self.audioObj.cleanup()  # NOQA
-                self.announcement_message = None
-                self.context_voice_channel = None
+        if getattr(self, "voice_state", None) and self.play_state == 'paused':
+            await chan_msg.edit(
+                content=f'Current playback of **{self.bookTitle}** has been stopped due to inactivity.')
+            logger.warning("audio session deleted due to timeout.")
+            # Stops the stream and tasks, closes the ABS session and drops the guild's session
+            await self.cleanup_session("inactivity")
+            return
+
+        logger.debug("Session resumed, aborting task and deleting message!")
+        await chan_msg.delete()
+
+        # End loop
+        self.auto_kill_session.stop()
+
+    def stop_auto_kill(self):
+        """Stop the auto-kill-session job and remove a pending inactivity warning."""
+        self.auto_kill_session.stop()
+        if self.auto_kill_message is not None:
+            chan_msg, self.auto_kill_message = self.auto_kill_message, None
+            asyncio.create_task(chan_msg.delete())
+
+    async def set_volume(self, volume: float):
+        """
+        Apply a new volume to the playing source. PCM sources are scaled in place, Opus sources have the
+        volume applied by FFmpeg, so FFmpeg is restarted at the current position with the new volume.
+        :param volume: 0.0 - 1.0
+        """
+        self.volume = max(0.0, min(1.0, volume))
+        audio = self.audioObj
+        if not audio:
+            return
+
+        if not uses_ffmpeg_volume(audio):
+            audio.source.volume = self.volume
+            return
+
+        if not getattr(self, "voice_state", None) or not self.stream_url:
+            return
+
+        new_audio = await self.restart_source(self.playback_position())
+        await self.voice_state.play(new_audio)
+        if self.play_state == 'paused':
+            self.voice_state.pause()
+
+    async def restart_source(self, position: float):
+        """
+        Seek inside the open ABS session, only a new FFmpeg source is started at the offset. The session,
+        item metadata and chapters are kept, callers report the new position with bookshelf_session_update.
+        Falls back to building a new session when there is no stream to restart.
+        :param position: seconds from the start of the item
+        :return: audio source, the caller starts it with voice_state.play()
+        """
+        if not self.stream_url or not self.sessionID:
+            audio, _, _, _, _ = await self.build_session(item_id=self.bookItemID, start_time=position,
+                                                         episode_index=self.currentEpisodeIndex or 0)
+            return audio
 
-                if self.session_update.running:
-                    self.session_update.stop()
+        self.stream_started = False
+        audio = await create_audio_source(self.stream_url, position, self.volume, self.bitrate)
+        self.currentTime = position
+        self.audioObj = audio
+        logger.info(f"Restarted stream for session {self.sessionID} at {position}s")
+        return audio
+
+    def stop_stream(self):
+        """Stop the playing source on purpose, its end callback is then not taken for a dropped stream."""
+        if isinstance(self.audioObj, MonitoredSource):
+            self.audioObj.discarded = True
+        self.voice_state.stop()
 
+    def playback_position(self) -> float:
+        """:return: seconds into the item of the audio delivered to Discord, the last synced time otherwise"""
+        source = self.audioObj
+        if isinstance(source, MonitoredSource):
+            return source.position
+        return self.currentTime
+
+    def chapter_at(self, position: float) -> Optional[dict]:
+        """:return: the chapter containing position, from the chapters loaded with the item"""
+        if not self.chapterArray:
+            return None
+        current = None
+        for chapter in sorted(self.chapterArray, key=lambda ch: float(ch.get('start', 0))):
+            if float(chapter.get('start', 0)) <= position:
+                current = chapter
             else:
-                logger.debug("Session resumed, aborting task and deleting message!")
-                await chan_msg.delete()
+                break
+        return current
+
+    # Autoplay ---------------------------------
 
-            # End loop
-            self.auto_kill_session.stop()
+    def next_autoplay_kind(self) -> Optional[str]:
+        """:return: 'episode' or 'series' when autoplay continues after the current item, None otherwise"""
+        if self.repeat_enabled:
+            return None
+        if self.podcastAutoplay and self.isPodcast and not self.isLastEpisode:
+            return 'episode'
+        if self.seriesAutoplay and self.currentSeries and not self.isLastBookInSeries:
+            return 'series'
+        return None
+
+    def start_prewarm(self):
+        """Prepare the next item in the background, once per item."""
+        kind = self.next_autoplay_kind()
+        if kind is None or self.next_plan is not None:
+            return
+        if self.prewarm_task is not None and not self.prewarm_task.done():
+            return
+        guild_id = current_guild_id()
+        self.prewarm_task = asyncio.create_task(self._run_for_guild(guild_id, partial(self.prewarm_next, kind)))
+
+    async def prewarm_next(self, kind: str):
+        """
+        Fetch everything the next book or episode needs before the current one ends: resume position,
+        chapters and cover, and fill the head of its audio file in the audio cache. move_to_series_book
+        and move_to_podcast_episode use the plan instead of asking ABS again.
+        :param kind: 'episode' or 'series', see next_autoplay_kind
+        """
+        current_item = (self.bookItemID, self.episodeId)
+        try:
+            if kind == 'episode':
+                index = self.currentEpisodeIndex + 1
+                plan = {'kind': kind, 'target': index, 'for_item': current_item,
+                        'cover': await c.bookshelf_cover_image(self.bookItemID)}
+                file_url = await c.bookshelf_audio_file_url(self.bookItemID, index)
+            else:
+                target = self.seriesList[self.seriesIndex + 1]
+                start_time = next_book_start_time(await c.bookshelf_item_progress(target))
+                plan = {'kind': kind, 'target': target, 'for_item': current_item, 'start_time': start_time,
+                        'chapter': await c.bookshelf_get_current_chapter(target, start_time),
+                        'cover': await c.bookshelf_cover_image(target)}
+                file_url = await c.bookshelf_audio_file_url(target)
+
+            if file_url:
+                prefetch(file_url)
+            # The item may have changed while we were fetching
+            if (self.bookItemID, self.episodeId) == current_item:
+                self.next_plan = plan
+                logger.info(f"Prepared next {kind} {plan['target']} ahead of the end of {self.bookItemID}")
+        except Exception as e:
+            logger.warning(f"Could not prepare next {kind}, it will be loaded when this one ends: {e}")
+
+    def take_plan(self, kind: str, target) -> Optional[dict]:
+        """:return: the prepared plan when it matches the item being moved to, the plan is used up either way"""
+        plan, self.next_plan = self.next_plan, None
+        current_item = (self.bookItemID, self.episodeId)
+        if plan and (plan['kind'], plan['target'], plan['for_item']) == (kind, target, current_item):
+            return plan
+        return None
+
+    def on_playback_end(self, guild_id: int, source, error):
+        """VoiceAdapter end callback, runs on the discord.py player thread."""
+        if self.loop is None or guild_id not in self.sessions:
+            return
+        ended_at = time.monotonic()
+        self.loop.call_soon_threadsafe(
+            asyncio.ensure_future,
+            self._run_for_guild(guild_id, partial(self.handle_stream_end, source, ended_at, error)))
+
+    async def handle_stream_end(self, source, ended_at: float, error=None):
+        """
+        Start the next item as soon as the current stream runs out instead of waiting for the next
+        session sync, or resume a stream that dropped before the end of the item.
+        Ignores sources that were replaced or stopped on purpose.
+        """
+        if source is not self.audioObj or getattr(source, 'discarded', False):
+            return
+        if self.play_state != 'playing' or self.transitioning:
+            return
+        if not self.bookDuration:
+            return
+        position = self.playback_position()
+        if error is not None or self.bookDuration - position > STREAM_END_MARGIN:
+            await self.recover_stream(f"stream ended at {position:.1f}s of {self.bookDuration:.1f}s, error: {error}")
+            return
+        kind = self.next_autoplay_kind()
+        if kind is None:
+            return
+        self.stream_ended_at = ended_at
+        await self.advance_autoplay(kind)
+
+    async def advance_autoplay(self, kind: str) -> bool:
+        """
+        Move to and play the next episode or series book.
+        :param kind: 'episode' or 'series', see next_autoplay_kind
+        :return: True when the next item is playing
+        """
+        if self.transitioning:
+            return False
+        self.transitioning = True
+        try:
+            if kind == 'episode':
+                logger.info("Episode completed - moving to next episode")
+                success = await self.move_to_podcast_episode(relative_move=1)
+            else:
+                logger.info("Book completed - moving to next book in series")
+                # Store current book as previous
+                self.previousBookID = self.bookItemID
+                self.previousBookTime = self.currentTime
+                success = await self.move_to_series_book("next")
+
+            if not success:
+                logger.error(f"Failed to move to next {kind}")
+                await self.cleanup_session(f"{kind} progression failed")
+                return False
+
+            await self.voice_state.play(self.audioObj)
+            if self.stream_ended_at is not None:
+                gap = time.monotonic() - self.stream_ended_at
+                self.transition_gaps.append(gap)
+                logger.info(f"Autoplay moved to next {kind}, transition gap {gap:.2f}s")
+            return True
+        finally:
+            self.transitioning = False
+            self.stream_ended_at = None
+
+    # Stall Watchdog ---------------------------------
+
+    async def check_stream(self):
+        """Runs every STALL_CHECK_INTERVAL seconds as the guild session's stall_watchdog job"""
+        source = self.audioObj
+        if not isinstance(source, MonitoredSource) or source.ended or source.discarded or self.transitioning:
+            return
+        now = time.monotonic()
+
+        if self.stall_started_at is not None and source.first_frame_at is not None:
+            recovery_time = source.first_frame_at - self.stall_started_at
+            self.stream_health.record_recovery(recovery_time)
+            logger.info(f"Stream recovered after {recovery_time:.1f}s")
+            self.stall_started_at = None
+            self.stall_retries = 0
+
+        # Paused streams don't read frames, and any progress restarts the clock
+        if self.play_state != 'playing' or source is not self.watch_source or source.frames != self.watch_frames:
+            self.watch_source, self.watch_frames, self.watch_since = source, source.frames, now
+            return
+
+        if now - self.watch_since >= STALL_TIMEOUT:
+            await self.recover_stream(f"no audio for {now - self.watch_since:.0f}s")
+
+    async def recover_stream(self, reason: str):
+        """
+        Restart FFmpeg inside the open ABS session at the last position delivered to Discord.
+        Ends the session after STALL_MAX_RETRIES restarts in a row that produced no audio.
+        :param reason: logged with the recovery attempt
+        """
+        if self.transitioning or not getattr(self, "voice_state", None):
+            return
+        position = self.playback_position()
+
+        if self.stall_started_at is None:
+            self.stall_started_at = time.monotonic()
+            self.stream_health.record_stall()
+        self.stall_retries += 1
+
+        if self.stall_retries > STALL_MAX_RETRIES:
+            logger.error(f"Stream did not recover after {STALL_MAX_RETRIES} restarts ({reason})")
+            self.stream_health.record_failure()
+            self.stall_started_at = None
+            self.stall_retries = 0
+            await self.cleanup_session("stream stalled")
+            return
+
+        logger.warning(f"Stream stalled ({reason}), resuming at {position:.1f}s "
+                       f"(attempt {self.stall_retries}/{STALL_MAX_RETRIES})")
+        self.transitioning = True
+        try:
+            audio = await self.restart_source(position)
+            await self.voice_state.play(audio)
+            await c.bookshelf_session_update(item_id=self.bookItemID, session_id=self.sessionID,
+                                             current_time=updateFrequency - 0.5, next_time=position,
+                                             episode_id=self.episodeId)
+        except Exception as e:
+            logger.error(f"Error restarting stalled stream: {e}")
+        finally:
+            self.transitioning = False
 
     async def restart_media_from_beginning(self):
         """
@@ -731,10 +1041,6 @@ class AudioPlayBack(Extension):
             self.play_state = 'playing'
             self.audioObj = audio
 
-            # Apply preserved volume to new audio object
-            audio.volume = preserved_volume
-
-
             logger.info(f"Successfully restarted media from beginning. New session: {self.sessionID}")
             return True
 
@@ -883,33 +1189,27 @@ class AudioPlayBack(Extension):
             # Stop current session update task
             self.session_update.stop()
 
-            # Close current session
-            await c.bookshelf_close_session(self.sessionID)
-
             # Get chapter start time
             chapter_start = float(target_chapter.get('start'))
             self.newChapterTitle = target_chapter.get('title', 'Unknown Chapter')
 
             logger.info(f"Selected Chapter: {self.newChapterTitle}, Starting at: {chapter_start}")
 
-            # Use unified session builder
-            audio, currentTime, sessionID, bookTitle, bookDuration = await self.build_session(
-                item_id=self.bookItemID,
-                start_time=chapter_start
-            )
+            # Keep the ABS session, only FFmpeg restarts at the chapter start
+            await self.restart_source(chapter_start)
 
             self.currentChapter = target_chapter
             self.currentChapterTitle = target_chapter.get('title', 'Unknown Chapter')
             logger.info(f"Updated current chapter to: {self.currentChapterTitle}")
 
-            # Send manual session sync with new session ID
-            logger.info(f"Updating new session {sessionID} to position {chapter_start}")
+            # Report the new position on the same session
+            logger.info(f"Updating session {self.sessionID} to position {chapter_start}")
             try:
                 updatedTime, duration, serverCurrentTime, finished_book = await c.bookshelf_session_update(
                     item_id=self.bookItemID,
                     session_id=self.sessionID,
                     current_time=updateFrequency - 0.5,
-                    next_time=self.nextTime)
+                    next_time=chapter_start)
 
                 self.currentTime = updatedTime
                 logger.info(f"Session update successful: {updatedTime}")
@@ -919,24 +1219,6 @@ class AudioPlayBack(Extension):
             # Clear nextTime
             self.nextTime = None
 
-            # Verify chapter information with server
-            try:
-                verified_chapter, _, _, _ = await c.bookshelf_get_current_chapter(
-                    item_id=self.bookItemID, current_time=chapter_start)
-
-                if verified_chapter:
-                    verified_title = verified_chapter.get('title')
-                    logger.info(f"Server verified chapter title: {verified_title}")
-
-                    # If there's a mismatch, update to the server's version
-                    if verified_title != self.currentChapterTitle:
-                        logger.warning(
-                            f"Chapter title mismatch! Local: {self.currentChapterTitle}, Server: {verified_title}")
-                        self.currentChapter = verified_chapter
-                        self.currentChapterTitle = verified_title
-            except Exception as e:
-                logger.error(f"Error verifying chapter info: {e}")
-
             self.session_update.start()
             self.found_next_chapter = True
 
@@ -1021,6 +1303,10 @@ class AudioPlayBack(Extension):
             return
 
         logger.info(f"executing command /play")
+        # Also called from other extensions, e.g. /discover
+        bind_guild_of(ctx)
+        # Stream end callbacks arrive on the voice thread and are handed back to this loop
+        self.loop = asyncio.get_running_loop()
 
         # Defer the response right away to prevent "interaction already responded to" errors
         await ctx.defer(ephemeral=True)
@@ -1073,10 +1359,12 @@ class AudioPlayBack(Extension):
 
             if self.activeSessions >= 1:
                 await ctx.send(
-                    content=f"Bot can only play one session at a time, please stop your other active session and try again! Current session owner: {self.sessionOwner}",
+                    content=f"A session is already playing in this server, please stop it and try again! Current session owner: {self.sessionOwner}",
                     ephemeral=True)
                 return
 
+            self.open_session(current_guild_id())
+
             # Handle episode selection for podcasts
             episode_index = 0  # Default to newest episode
             if isPodcast and episode > 1:
@@ -1206,7 +1494,7 @@ class AudioPlayBack(Extension):
 
                     # Stop auto kill session task
                     if self.auto_kill_session.running:
-                        self.auto_kill_session.stop()
+                        self.stop_auto_kill()
 
                     self.audio_message = await ctx.send(
                         content=start_message,
@@ -1221,7 +1509,8 @@ class AudioPlayBack(Extension):
 
                     logger.info(f"Beginning audio stream" + (" from the beginning" if startover else ""))
 
-                    if not voice_adapter.wait_connected(guild_id, timeout=10.0):
+                    # Wait off the event loop so other guilds' sessions keep syncing
+                    if not await asyncio.to_thread(voice_adapter.wait_connected, guild_id, 10.0):
                         raise RuntimeError("Timed out waiting for voice connection")
 
                     self.activeSessions += 1
@@ -1254,6 +1543,7 @@ class AudioPlayBack(Extension):
 
                     logger.error(f"Error starting playback: {e}")
                     await ctx.send(content=f"Error starting playback: {str(e)}")
+                    self._remove_session(current_guild_id())
 
             else:
                 # voice_state already exists -> must still start playback
@@ -1261,7 +1551,7 @@ class AudioPlayBack(Extension):
                 channel = ctx.author.voice.channel
 
                 voice_adapter.connect(guild_id, channel.id)
-                if not voice_adapter.wait_connected(guild_id, timeout=10.0):
+                if not await asyncio.to_thread(voice_adapter.wait_connected, guild_id, 10.0):
                     raise RuntimeError("Timed out waiting for voice connection")
 
                 self.voice_state = VoiceStateShim(voice_adapter, guild_id, channel)
@@ -1282,6 +1572,8 @@ class AudioPlayBack(Extension):
         except Exception as e:
             logger.error(f"Unhandled error in play_audio: {e}")
             await ctx.send(content=f"An error occurred while trying to play this content: {str(e)}", ephemeral=True)
+            if not self.activeSessions:
+                self._remove_session(current_guild_id())
 
     # Commands --------------------------------
 
@@ -1332,7 +1624,7 @@ class AudioPlayBack(Extension):
                 # Stop auto kill session task and start session
                 if self.auto_kill_session.running:
                     logger.info("Stopping auto kill session backend task.")
-                    self.auto_kill_session.stop()
+                    self.stop_auto_kill()
                 self.play_state = 'playing'
                 self.session_update.start()
             else:
@@ -1387,7 +1679,7 @@ class AudioPlayBack(Extension):
         # Stop auto kill session task
         if self.auto_kill_session.running:
             logger.info("Stopping auto kill session backend task.")
-            self.auto_kill_session.stop()
+            self.stop_auto_kill()
 
         # Check if session was cleaned up (book completed)
         session_was_cleaned_up = not self.sessionID
@@ -1410,15 +1702,11 @@ class AudioPlayBack(Extension):
     @check_session_control()
     async def volume_adjuster(self, ctx, volume=-1):
         if getattr(self, "voice_state", None):
-            audio = self.audioObj
-
             if volume == -1:
                 status = "muted" if self.volume == 0 else f"{self.volume * 100}%"
                 await ctx.send(content=f"Volume currently set to: {status}", ephemeral=True)
             elif 0 <= volume <= 100:
-                volume_float = float(volume / 100)
-                audio.volume = volume_float
-                self.volume = audio.volume
+                await self.set_volume(float(volume / 100))
                 status = "muted" if volume == 0 else f"{volume}%"
                 await ctx.send(content=f"Volume set to: {status}", ephemeral=True)
             else:
@@ -1897,84 +2185,15 @@ class AudioPlayBack(Extension):
                 if user_input == "random":
                     choices.append({"name": "📚 Random Book (Surprise me!)", "value": "random"})
 
-                libraries = await c.bookshelf_libraries()
-                valid_libraries = []
-                found_titles = []
-
-                # Get valid libraries
-                for name, (library_id, audiobooks_only) in libraries.items():
-                    valid_libraries.append({"id": library_id, "name": name})
-                    logger.debug(f"Valid Library Found: {name} | {library_id}")
+                # Answer from the local catalog index when it has been built, otherwise search
+                # all libraries concurrently where slow libraries only drop their own results
+                results = await catalog_index.search_catalog(user_input, limit=25 - len(choices))
+                if results is None:
+                    results = await c.bookshelf_federated_search(user_input, limit=25 - len(choices))
 
-                # Search across all libraries, accumulating results
-                for lib_id in valid_libraries:
-                    library_iD = lib_id.get('id')
-                    logger.debug(f"Searching library: {lib_id.get('name')} | {library_iD}")
-
-                    try:
-                        limit = 10
-                        endpoint = f"/libraries/{library_iD}/search"
-                        params = f"&q={user_input}&limit={limit}"
-                        r = await c.bookshelf_conn(endpoint=endpoint, GET=True, params=params)
-
-                        if r.status_code == 200:
-                            data = r.json()
-
-                            book_dataset = data.get('book', [])
-                            podcast_dataset = data.get('podcast', [])
-
-                            logger.info(
-                                f"Library {lib_id.get('name')} search results: {len(book_dataset)} books, {len(podcast_dataset)} podcasts")
-
-                            # Process books
-                            for book in book_dataset:
-                                try:
-                                    authors_list = []
-                                    title = book['libraryItem']['media']['metadata']['title']
-                                    authors_raw = book['libraryItem']['media']['metadata'].get('authors', [])
-
-                                    for author in authors_raw:
-                                        name = author.get('name')
-                                        if name:
-                                            authors_list.append(name)
-
-                                    author = ', '.join(authors_list) if authors_list else 'Unknown Author'
-                                    book_id = book['libraryItem']['id']
-
-                                    # Add to list if not already present (avoid duplicates)
-                                    new_item = {'id': book_id, 'title': title, 'author': author}
-                                    if not any(item['id'] == book_id for item in found_titles):
-                                        found_titles.append(new_item)
-                                        logger.debug(f"Added book: {title}")
-                                except Exception as e:
-                                    logger.warning(f"Error processing book result: {e}")
-
-                            # Process podcasts
-                            for podcast in podcast_dataset:
-                                try:
-                                    title = podcast['libraryItem']['media']['metadata']['title']
-                                    # Podcasts have different author structure
-                                    podcast_metadata = podcast['libraryItem']['media']['metadata']
-                                    author = podcast_metadata.get('author', 'Unknown Author')
-                                    if not author or author == 'Unknown Author':
-                                        author = podcast_metadata.get('feedAuthor', 'Unknown Author')
-
-                                    book_id = podcast['libraryItem']['id']
-
-                                    # Add podcast emoji to distinguish in search
-                                    title_with_emoji = f"🎙️ {title}"
-
-                                    # Add to list if not already present (avoid duplicates)
-                                    new_item = {'id': book_id, 'title': title_with_emoji, 'author': author}
-                                    if not any(item['id'] == book_id for item in found_titles):
-                                        found_titles.append(new_item)
-                                        logger.debug(f"Added podcast: {title}")
-                                except Exception as e:
-                                    logger.warning(f"Error processing podcast result: {e}")
-
-                    except Exception as e:
-                        logger.error(f"Error searching library {library_iD}: {e}")
-                        continue  # Continue to next library even if this one fails
+                found_titles = [{'id': item['id'],
+                                 'title': f"🎙️ {item['title']}" if item['mediaType'] == 'podcast' else item['title'],
+                                 'author': item['author'] or 'Unknown Author'} for item in results]
 
                 # Process all found titles into choices for autocomplete
                 for book in found_titles:
@@ -2020,6 +2239,8 @@ class AudioPlayBack(Extension):
 
     @change_chapter.autocomplete("option")
     async def chapter_option_autocomplete(self, ctx: AutocompleteContext):
+        # Autocompletes skip the extension prerun
+        bind_guild_of(ctx)
         choices = [
             {"name": "next", "value": "next"},
             {"name": "previous", "value": "previous"}
@@ -2210,20 +2431,27 @@ class AudioPlayBack(Extension):
         target_book_id = self.seriesList[new_index]
         logger.info(f"Moving to series book at index {new_index}: {target_book_id}")
 
+        # Prepared by prewarm_next when autoplay reaches the end of the current book
+        plan = self.take_plan('series', target_book_id)
+        if direction != "next":
+            plan = None
+
         try:
             # Determine start time based on navigation type
-            if direction == "next":
+            if plan is not None:
+                start_time = plan['start_time']
+                logger.info(f"Using prepared plan for {target_book_id}")
+
+            elif direction == "next":
                 # Check if the target book is finished - if so, start from beginning
                 # Otherwise, let build_session respect the server's current position
                 try:
-                    progress_data = await c.bookshelf_item_progress(target_book_id)
-                    is_finished = progress_data.get('finished', 'False') == 'True'
+                    start_time = next_book_start_time(await c.bookshelf_item_progress(target_book_id))
 
-                    if is_finished:
-                        start_time = 0.0
+                    if start_time == 0.0:
                         logger.info(f"Target book {target_book_id} is finished - starting from beginning")
                     else:
-                        start_time = None  # Let build_session use server's current position
+                        # Let build_session use server's current position
                         logger.info(f"Target book {target_book_id} not finished - will respect server position")
 
                 except Exception as e:
@@ -2280,8 +2508,11 @@ class AudioPlayBack(Extension):
             self.nextTime = None
 
             # Set up chapter info for target book
-            current_chapter, chapter_array, bookFinished, isPodcast = await c.bookshelf_get_current_chapter(
-                target_book_id, start_time)
+            if plan is not None:
+                current_chapter, chapter_array, bookFinished, isPodcast = plan['chapter']
+            else:
+                current_chapter, chapter_array, bookFinished, isPodcast = await c.bookshelf_get_current_chapter(
+                    target_book_id, start_time)
             self.currentChapter = current_chapter
             self.chapterArray = chapter_array
 
@@ -2294,7 +2525,10 @@ class AudioPlayBack(Extension):
             self.bookFinished = False
 
             # Update cover image
-            self.cover_image = await c.bookshelf_cover_image(target_book_id)
+            if plan is not None:
+                self.cover_image = plan['cover']
+            else:
+                self.cover_image = await c.bookshelf_cover_image(target_book_id)
 
             self.session_update.start()
             return True
@@ -2378,6 +2612,11 @@ class AudioPlayBack(Extension):
         target_episode_id = target_episode.get('id')
         logger.info(f"Moving to {operation_desc}: {target_episode.get('title')}")
 
+        # Prepared by prewarm_next when autoplay reaches the end of the current episode
+        plan = self.take_plan('episode', new_index)
+        if relative_move != 1:
+            plan = None
+
         try:
             # Stop current session
             if self.session_update.running:
@@ -2424,7 +2663,10 @@ class AudioPlayBack(Extension):
             self.currentEpisodeTitle = target_episode.get('title', 'Unknown Episode')
 
             # Update cover image (could be episode-specific or podcast-general)
-            self.cover_image = await c.bookshelf_cover_image(self.bookItemID)
+            if plan is not None:
+                self.cover_image = plan['cover']
+            else:
+                self.cover_image = await c.bookshelf_cover_image(self.bookItemID)
 
             self.session_update.start()
             return True
@@ -2521,7 +2763,7 @@ class AudioPlayBack(Extension):
         # Stop auto kill session task if requested
         if stop_auto_kill and self.auto_kill_session.running:
             logger.info("Stopping auto kill session backend task.")
-            self.auto_kill_session.stop()
+            self.stop_auto_kill()
 
         # Update UI
         if update_buttons:
@@ -2547,7 +2789,7 @@ class AudioPlayBack(Extension):
             return
 
         await ctx.defer(edit_origin=True)
-        self.voice_state.stop()
+        self.stop_stream()
 
         # Use the unified method for seeking
         result = await self.shared_seek(seek_amount, is_forward=is_forward)
@@ -2728,21 +2970,20 @@ class AudioPlayBack(Extension):
 
         self.seriesBookCache = {}
 
+        try:
+            # One batch request for the whole series
+            series_details = await c.bookshelf_get_items_details(self.seriesList)
+        except Exception as e:
+            logger.error(f"Error caching series book data: {e}")
+            series_details = {}
+
         for book_id in self.seriesList:
-            try:
-                book_details = await c.bookshelf_get_item_details(book_id)
-                self.seriesBookCache[book_id] = {
-                    'title': book_details.get('title', 'Unknown Book'),
-                    'author': book_details.get('author', 'Unknown Author'),
-                    'duration': book_details.get('duration', 0)
-                }
-            except Exception as e:
-                logger.error(f"Error caching series book data for {book_id}: {e}")
-                self.seriesBookCache[book_id] = {
-                    'title': 'Unknown Book',
-                    'author': 'Unknown Author',
-                    'duration': 0
-                }
+            book_details = series_details.get(book_id, {})
+            self.seriesBookCache[book_id] = {
+                'title': book_details.get('title', 'Unknown Book'),
+                'author': book_details.get('author', 'Unknown Author'),
+                'duration': book_details.get('duration', 0)
+            }
 
     async def handle_media_selection(self, ctx, media_type="series"):
         """
@@ -2808,7 +3049,7 @@ class AudioPlayBack(Extension):
 
             # Stop current playback
             if self.voice_state and self.play_state == 'playing':
-                self.voice_state.stop()
+                self.stop_stream()
 
             # Move to selected media
             if media_type == "series":
@@ -2876,7 +3117,7 @@ class AudioPlayBack(Extension):
             # Stop auto kill session task
             if self.auto_kill_session.running:
                 logger.info("Stopping auto kill session backend task.")
-                self.auto_kill_session.stop()
+                self.stop_auto_kill()
 
             await self.update_callback_embed(ctx, update_buttons=True)
 
@@ -2908,7 +3149,7 @@ class AudioPlayBack(Extension):
             await ctx.defer(edit_origin=True)
 
             # Stop current playback
-            self.voice_state.stop()
+            self.stop_stream()
 
             # Check if we're on the last chapter before moving
             current_index = next((i for i, ch in enumerate(self.chapterArray)
@@ -2954,7 +3195,7 @@ class AudioPlayBack(Extension):
 
             await ctx.defer(edit_origin=True)
 
-            self.voice_state.stop()
+            self.stop_stream()
 
             # Find previous chapter
             await self.move_chapter(relative_move=-1)
@@ -2962,7 +3203,7 @@ class AudioPlayBack(Extension):
             # Check if move_chapter succeeded before proceeding
             if self.found_next_chapter:
                 await self.update_callback_embed(ctx, update_buttons=True, stop_auto_kill=True)
-                self.voice_state.stop()
+                self.stop_stream()
                 await self.voice_state.play(self.audioObj)
             else:
                 await ctx.send(content="Failed to navigate to previous chapter.", ephemeral=True)
@@ -3004,7 +3245,7 @@ class AudioPlayBack(Extension):
 
         # Stop current playback
         if self.play_state == 'playing':
-            self.voice_state.stop()
+            self.stop_stream()
 
         # Store current position before moving
         self.previousBookID = self.bookItemID
@@ -3037,7 +3278,7 @@ class AudioPlayBack(Extension):
 
         # Stop current playback
         if self.play_state == 'playing':
-            self.voice_state.stop()
+            self.stop_stream()
 
         # Move to previous book
         success = await self.move_to_series_book("previous")
@@ -3076,7 +3317,7 @@ class AudioPlayBack(Extension):
 
         # Stop current playback
         if self.play_state == 'playing':
-            self.voice_state.stop()
+            self.stop_stream()
 
         # Move to next episode
         success = await self.move_to_podcast_episode(relative_move=1)
@@ -3106,7 +3347,7 @@ class AudioPlayBack(Extension):
 
         # Stop current playback
         if self.play_state == 'playing':
-            self.voice_state.stop()
+            self.stop_stream()
 
         # Move to previous episode
         success = await self.move_to_podcast_episode(relative_move=-1)
@@ -3146,11 +3387,7 @@ class AudioPlayBack(Extension):
 
         if self.voice_state and ctx.author.voice:
             adjustment = 0.1
-            # Update Audio OBJ
-            audio = self.audioObj
-            self.volume = audio.volume
-            audio.volume = min(1.0, self.volume + adjustment)
-            self.volume = audio.volume
+            await self.set_volume(round(self.volume + adjustment, 2))
 
             # Update UI
             await self.update_callback_embed(ctx, update_buttons=False)
@@ -3164,11 +3401,7 @@ class AudioPlayBack(Extension):
 
         if self.voice_state and ctx.author.voice:
             adjustment = 0.1
-
-            audio = self.audioObj
-            self.volume = audio.volume
-            audio.volume = max(0.0, self.volume - adjustment)
-            self.volume = audio.volume
+            await self.set_volume(round(self.volume - adjustment, 2))
 
             # Update UI
             await self.update_callback_embed(ctx, update_buttons=False)
@@ -3207,7 +3440,8 @@ class AudioPlayBack(Extension):
         # Stop session update
         self.session_update.stop()
 
-        # Use our current tracked position as the baseline for seeking
+        # Seek from the position actually played, not the last sync
+        self.currentTime = self.playback_position()
         current_time = self.currentTime
 
         # Format timestamps for better readability in logs
@@ -3409,34 +3643,21 @@ class AudioPlayBack(Extension):
                     self.nextTime = max(0.0, self.currentTime - seek_amount)
                     logger.debug("Rewind: simple time rewind")
 
-        # Update the current time to match where we're seeking
-        self.currentTime = self.nextTime
-
-        # Use unified session builder
-        audio, actual_start_time, session_id, book_title, book_duration = await self.build_session(
-            item_id=self.bookItemID,
-            start_time=self.nextTime
-        )
+        # Keep the ABS session, only FFmpeg restarts at the new offset
+        audio = await self.restart_source(self.nextTime)
 
         # Send manual session sync
         await c.bookshelf_session_update(item_id=self.bookItemID, session_id=self.sessionID,
                                          current_time=updateFrequency - 0.5, next_time=self.nextTime)
 
-        # Do an explicit check to make sure we have the latest chapter info
-        # This is especially important after moving across chapter boundaries
+        # Make sure the chapter matches the new position, especially after crossing chapter boundaries
         if not self.isPodcast:
-            try:
-                current_chapter, _, _, _ = await c.bookshelf_get_current_chapter(
-                    item_id=self.bookItemID, current_time=self.currentTime)
+            current_chapter = self.chapter_at(self.currentTime)
+            if current_chapter:
+                self.currentChapter = current_chapter
+                self.currentChapterTitle = current_chapter.get('title', 'Unknown Chapter')
+                logger.info(f"Final chapter verification: {self.currentChapterTitle}")
 
-                if current_chapter:
-                    self.currentChapter = current_chapter
-                    self.currentChapterTitle = current_chapter.get('title', 'Unknown Chapter')
-                    logger.info(f"Final chapter verification: {self.currentChapterTitle}")
-            except Exception as e:
-                logger.error(f"Error in final chapter verification: {e}")
-
-        self.audioObj = audio
         self.nextTime = None
 
         self.session_update.start()
@@ -0,0 +1,393 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import bookshelfAPI as c
+from settings import str2bool
+
+logger = logging.getLogger("bot")
+
+# Local read-through cache for streamed audio files, FFmpeg reads from a loopback HTTP server backed by it
+AUDIO_CACHE_ENABLED = str2bool(os.getenv('AUDIO_CACHE_ENABLED', 'True'))
+AUDIO_CACHE_DIR = os.getenv('AUDIO_CACHE_DIR', os.path.join('db', 'audio_cache'))
+AUDIO_CACHE_MAX_MB = int(os.getenv('AUDIO_CACHE_MAX_MB', '1024'))
+# Bytes fetched from ABS per request and stored per cache file
+AUDIO_CACHE_CHUNK_SIZE = int(os.getenv('AUDIO_CACHE_CHUNK_KB', '1024')) * 1024
+# Chunks filled in the background ahead of the one FFmpeg is reading
+AUDIO_CACHE_READ_AHEAD = int(os.getenv('AUDIO_CACHE_READ_AHEAD', '16'))
+
+# /api/items/{item_id}/file/{ino}
+_FILE_URL = re.compile(r'/items/([^/?]+)/file/([^/?]+)')
+_SAFE_KEY = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+class AudioCache:
+    """
+    Size bounded LRU of audio byte ranges on disk, keyed by item id and inode. Files are split in fixed
+    size chunks, a chunk is fetched from ABS with a Range request the first time it is read.
+    """
+
+    def __init__(self, directory: str = AUDIO_CACHE_DIR, max_bytes: int = AUDIO_CACHE_MAX_MB * 1024 * 1024,
+                 chunk_size: int = AUDIO_CACHE_CHUNK_SIZE, read_ahead: int = AUDIO_CACHE_READ_AHEAD):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.read_ahead = read_ahead
+
+        # key -> upstream URL (with token), registered when a stream starts
+        self.sources: Dict[str, str] = {}
+        self._sizes: Dict[str, int] = {}
+        # chunk path -> size, least recently used first
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._fill_tasks: Dict[str, asyncio.Task] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.port = None
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.bytes_fetched = 0
+        self.evictions = 0
+
+    # Server ---------------------------------------------------------
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0):
+        os.makedirs(self.directory, exist_ok=True)
+        await asyncio.to_thread(self._load_index)
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Audio cache serving {self.directory} on {host}:{self.port} "
+                    f"({self._total // (1024 * 1024)}/{self.max_bytes // (1024 * 1024)} MB used)")
+
+    async def close(self):
+        for task in self._fill_tasks.values():
+            task.cancel()
+        self._fill_tasks.clear()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @property
+    def running(self) -> bool:
+        return self._server is not None
+
+    def local_url(self, upstream_url: str) -> str:
+        """
+        :param upstream_url: ABS file URL, /api/items/{item_id}/file/{ino}?token=...
+        :return: loopback URL FFmpeg should read instead, the upstream URL when it can't be cached
+        """
+        key = self._register(upstream_url)
+        if key is None:
+            return upstream_url
+        return f"http://127.0.0.1:{self.port}/{key}"
+
+    def prefetch(self, upstream_url: str, chunks: int = None):
+        """
+        Fill the head of a file in the background, e.g. the next item before the current one ends.
+        :param chunks: number of chunks from the start, defaults to read_ahead
+        """
+        key = self._register(upstream_url)
+        if key is not None:
+            self._schedule_fill(key, 0, chunks)
+
+    def _register(self, upstream_url: str) -> Optional[str]:
+        match = _FILE_URL.search(upstream_url)
+        if not self.running or not match:
+            return None
+        key = _SAFE_KEY.sub('_', f"{match.group(1)}_{match.group(2)}")
+        self.sources[key] = upstream_url
+        return key
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            if len(request) < 2 or request[0] not in ('GET', 'HEAD'):
+                await self._respond(writer, '405 Method Not Allowed')
+                return
+
+            key = request[1].lstrip('/')
+            if key not in self.sources:
+                await self._respond(writer, '404 Not Found')
+                return
+
+            size = await self.file_size(key)
+            start, end = _parse_range(headers.get('range'), size)
+            if start is None:
+                await self._respond(writer, '416 Range Not Satisfiable', {'Content-Range': f'bytes */{size}'})
+                return
+
+            response_headers = {
+                'Content-Type': 'application/octet-stream',
+                'Accept-Ranges': 'bytes',
+                'Content-Length': str(end - start + 1),
+            }
+            status = '200 OK'
+            if 'range' in headers:
+                status = '206 Partial Content'
+                response_headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+            await self._respond(writer, status, response_headers)
+            if request[0] == 'HEAD':
+                return
+
+            await self._stream(key, start, end, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # FFmpeg went away, e.g. seek or stop
+            pass
+        except Exception as e:
+            logger.error(f"Audio cache request failed: {e}")
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: str, headers: dict = None):
+        lines = [f"HTTP/1.1 {status}", "Connection: close"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        if headers is None:
+            lines.append("Content-Length: 0")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+        await writer.drain()
+
+    async def _stream(self, key: str, start: int, end: int, writer: asyncio.StreamWriter):
+        position = start
+        while position <= end:
+            index = position // self.chunk_size
+            chunk = await self.read_chunk(key, index)
+            self._schedule_fill(key, index + 1)
+
+            offset = position - index * self.chunk_size
+            data = chunk[offset:offset + end - position + 1]
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+            position += len(data)
+            self.bytes_served += len(data)
+
+    # Chunks ---------------------------------------------------------
+
+    async def file_size(self, key: str) -> int:
+        if key in self._sizes:
+            return self._sizes[key]
+
+        meta_path = os.path.join(self.directory, key, 'meta.json')
+        size = await asyncio.to_thread(_read_size, meta_path)
+        if size is None:
+            # The first chunk tells the total size through Content-Range, and is kept since it is read next
+            data, size = await self._fetch_range(key, 0, self.chunk_size - 1)
+            await asyncio.to_thread(_write_file, meta_path, json.dumps({'size': size}).encode())
+            first_chunk = self._chunk_path(key, 0)
+            if first_chunk not in self._lru:
+                await asyncio.to_thread(_write_file, first_chunk, data)
+                self._add(first_chunk, len(data))
+        self._sizes[key] = size
+        return size
+
+    def _chunk_path(self, key: str, index: int) -> str:
+        return os.path.join(self.directory, key, f"{index}.chunk")
+
+    async def read_chunk(self, key: str, index: int) -> bytes:
+        """:return: the chunk, from disk when cached, otherwise fetched from ABS and stored"""
+        path = self._chunk_path(key, index)
+        if path in self._lru:
+            try:
+                data = await asyncio.to_thread(_read_file, path)
+                self.hits += 1
+                self._touch(path)
+                return data
+            except OSError:
+                self._forget(path)
+
+        inflight = self._inflight.get(path)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[path] = future
+        try:
+            self.misses += 1
+            size = await self.file_size(key)
+            if path in self._lru:
+                # Stored while looking up the size
+                data = await asyncio.to_thread(_read_file, path)
+            else:
+                start = index * self.chunk_size
+                end = min(size, start + self.chunk_size) - 1
+                data, _ = await self._fetch_range(key, start, end)
+                await asyncio.to_thread(_write_file, path, data)
+                self._add(path, len(data))
+            future.set_result(data)
+            return data
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved, waiters get it re-raised
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(path, None)
+
+    async def _fetch_range(self, key: str, start: int, end: int) -> Tuple[bytes, int]:
+        """:return: (bytes, total file size)"""
+        async with c.http_client() as client:
+            r = await client.get(self.sources[key], headers={'Range': f'bytes={start}-{end}'})
+        r.raise_for_status()
+        self.bytes_fetched += len(r.content)
+        content_range = r.headers.get('content-range', '')
+        total = content_range.rpartition('/')[2]
+        size = int(total) if total.isdigit() else len(r.content)
+        if r.status_code == 200:
+            # Server ignored the range
+            return r.content[start:end + 1], size
+        return r.content, size
+
+    def _schedule_fill(self, key: str, index: int, count: int = None):
+        """Fill the next read_ahead (or count) chunks in the background, one fill task per file."""
+        count = self.read_ahead if count is None else count
+        task = self._fill_tasks.get(key)
+        if count <= 0 or (task is not None and not task.done()):
+            return
+        self._fill_tasks[key] = asyncio.create_task(self._fill(key, index, count))
+
+    async def _fill(self, key: str, first: int, count: int):
+        try:
+            size = await self.file_size(key)
+            last = min(first + count, (size - 1) // self.chunk_size + 1)
+            for index in range(first, last):
+                if self._chunk_path(key, index) not in self._lru:
+                    await self.read_chunk(key, index)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"Audio cache read-ahead stopped for {key}: {e}")
+
+    # LRU ------------------------------------------------------------
+
+    def _load_index(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.chunk'):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(entries):
+            self._lru[path] = size
+            self._total += size
+        self._evict()
+
+    def _touch(self, path: str):
+        self._lru.move_to_end(path)
+        try:
+            # Keeps the order across restarts
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _add(self, path: str, size: int):
+        self._lru[path] = size
+        self._total += size
+        self._evict()
+
+    def _forget(self, path: str):
+        self._total -= self._lru.pop(path, 0)
+
+    def _evict(self):
+        while self._total > self.max_bytes and self._lru:
+            path, size = self._lru.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "size_mb": round(self._total / (1024 * 1024), 1),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 1),
+            "chunks": len(self._lru),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes_served": self.bytes_served,
+            "bytes_fetched": self.bytes_fetched,
+        }
+
+
+def _parse_range(header: Optional[str], size: int) -> Tuple[Optional[int], Optional[int]]:
+    """:return: inclusive (start, end), (None, None) when the range can't be satisfied"""
+    if not header:
+        return 0, size - 1
+    match = re.match(r'bytes=(\d*)-(\d*)', header.strip())
+    if not match:
+        return 0, size - 1
+    first, last = match.groups()
+    if not first:
+        # Suffix range, the last N bytes
+        length = int(last or 0)
+        return (max(0, size - length), size - 1) if length else (None, None)
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return None, None
+    return start, end
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _read_size(meta_path: str) -> Optional[int]:
+    try:
+        with open(meta_path) as meta:
+            return json.load(meta)['size']
+    except FileNotFoundError:
+        return None
+
+
+def _write_file(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{time.monotonic_ns()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+# Global cache instance, started in main.py
+audio_cache = AudioCache()
+
+
+async def start_audio_cache():
+    if AUDIO_CACHE_ENABLED:
+        await audio_cache.start()
+
+
+async def close_audio_cache():
+    await audio_cache.close()
+
+
+def cached_url(upstream_url: str) -> str:
+    """:return: loopback URL for the stream when the cache is running, the upstream URL otherwise"""
+    return audio_cache.local_url(upstream_url)
+
+
+def prefetch(upstream_url: str, chunks: int = None):
+    """Start filling the head of a file that is about to be played, no-op when the cache is not running."""
+    audio_cache.prefetch(upstream_url, chunks)
@@ -0,0 +1,115 @@
+import logging
+import time
+
+import discord
+
+import settings as s
+
+logger = logging.getLogger("bot")
+
+# Codecs FFmpeg can send to Discord without re-encoding
+OPUS_CODECS = ('opus', 'libopus')
+
+# Let FFmpeg reconnect when an HTTP input drops instead of ending the stream
+RECONNECT_OPTIONS = "-reconnect 1 -reconnect_streamed 1 -reconnect_on_network_error 1 -reconnect_delay_max 5"
+
+# discord.py reads one 20 ms frame per read() call
+FRAME_SECONDS = 0.02
+
+
+class MonitoredSource(discord.AudioSource):
+    """
+    Wraps a source to record frame delivery. discord.py's player thread calls read(), the stall
+    watchdog and session sync look at the counters from the event loop.
+    """
+
+    def __init__(self, source: discord.AudioSource, start_time: float):
+        self.source = source
+        self.start_time = start_time
+        self.frames = 0
+        self.synced_frames = 0
+        self.first_frame_at = None
+        self.last_frame_at = None
+        self.ended = False
+        # Set when playback stops it on purpose, e.g. before a seek replaces it
+        self.discarded = False
+
+    def read(self) -> bytes:
+        data = self.source.read()
+        if data:
+            now = time.monotonic()
+            if self.first_frame_at is None:
+                self.first_frame_at = now
+            self.last_frame_at = now
+            self.frames += 1
+        else:
+            self.ended = True
+        return data
+
+    def is_opus(self) -> bool:
+        return self.source.is_opus()
+
+    def cleanup(self):
+        self.source.cleanup()
+
+    @property
+    def position(self) -> float:
+        """Seconds into the item of the last frame handed to Discord."""
+        return self.start_time + self.frames * FRAME_SECONDS
+
+    @property
+    def unsynced_seconds(self) -> float:
+        """Audio delivered since the last mark_synced(), the listening time to report to ABS."""
+        return (self.frames - self.synced_frames) * FRAME_SECONDS
+
+    def mark_synced(self):
+        self.synced_frames = self.frames
+
+
+def uses_ffmpeg_volume(source) -> bool:
+    """:return: True when volume is baked into the FFmpeg process and changing it needs a new source"""
+    if isinstance(source, MonitoredSource):
+        source = source.source
+    return not isinstance(source, discord.PCMVolumeTransformer)
+
+
+async def create_audio_source(stream_url: str, start_time: float, volume: float, bitrate: int = 128000):
+    """
+    Build the discord.py audio source for a stream.
+
+    With AUDIO_PIPELINE=opus FFmpeg resamples, applies the volume and encodes Opus itself, discord.py only
+    forwards the packets. Sources that are already Opus are stream copied when no volume change is needed.
+    With AUDIO_PIPELINE=pcm every frame is decoded to PCM and volume scaled in Python before discord.py encodes it.
+
+    :param stream_url: ABS file URL
+    :param start_time: position in seconds to start from
+    :param volume: 0.0 - 1.0
+    :param bitrate: voice channel bitrate in bits per second
+    :return: MonitoredSource wrapping the discord.AudioSource
+    """
+    return MonitoredSource(await _ffmpeg_source(stream_url, start_time, volume, bitrate), start_time)
+
+
+async def _ffmpeg_source(stream_url: str, start_time: float, volume: float, bitrate: int) -> discord.AudioSource:
+    before_options = f"-re -ss {start_time}"
+    if stream_url.startswith(('http://', 'https://')):
+        before_options += f" {RECONNECT_OPTIONS}"
+
+    if s.AUDIO_PIPELINE == 'pcm':
+        ffmpeg_audio = discord.FFmpegPCMAudio(stream_url, before_options=before_options, options="")
+        return discord.PCMVolumeTransformer(ffmpeg_audio, volume=volume)
+
+    if volume == 1.0:
+        try:
+            codec, _ = await discord.FFmpegOpusAudio.probe(stream_url)
+        except Exception as e:
+            logger.debug(f"Could not probe stream codec, encoding with libopus: {e}")
+            codec = None
+
+        if codec in OPUS_CODECS:
+            logger.info("Source is already Opus, stream copying")
+            return discord.FFmpegOpusAudio(stream_url, codec='copy', before_options=before_options)
+
+    kbps = max(8, min(512, bitrate // 1000))
+    return discord.FFmpegOpusAudio(stream_url, bitrate=kbps, before_options=before_options,
+                                   options=f"-af volume={volume:.2f}")
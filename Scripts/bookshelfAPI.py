@@ -1,16 +1,21 @@
 import asyncio
 import csv
+import heapq
 import logging
 import os
+import random
 import sys
 import time
 import traceback
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from contextvars import ContextVar
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import Optional
+from urllib.parse import quote, urlsplit
 
 import httpx
 from httpx import Timeout
-import requests
 
 from dotenv import load_dotenv
 from settings import OPT_IMAGE_URL, SERVER_URL, DEFAULT_PROVIDER
@@ -39,6 +44,519 @@ HTTPX_TIMEOUT = Timeout(
     pool=HTTPX_TIMEOUT_POOL
 )
 
+# Connection pool configuration
+HTTPX_MAX_CONNECTIONS = int(os.getenv('HTTPX_MAX_CONNECTIONS', '20'))
+HTTPX_MAX_KEEPALIVE = int(os.getenv('HTTPX_MAX_KEEPALIVE', '10'))
+HTTPX_KEEPALIVE_EXPIRY = float(os.getenv('HTTPX_KEEPALIVE_EXPIRY', '30.0'))
+HTTPX_HTTP2 = os.getenv('HTTPX_HTTP2', 'False').lower() in ('true', '1', 't')
+
+HTTPX_LIMITS = httpx.Limits(
+    max_connections=HTTPX_MAX_CONNECTIONS,
+    max_keepalive_connections=HTTPX_MAX_KEEPALIVE,
+    keepalive_expiry=HTTPX_KEEPALIVE_EXPIRY
+)
+
+# HTTP/2 requires the optional 'h2' package
+try:
+    import h2  # noqa: F401
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+# Shared client, bound to the event loop that opened it
+_http_client: httpx.AsyncClient | None = None
+_http_client_loop = None
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    use_http2 = HTTPX_HTTP2 and H2_AVAILABLE
+    if HTTPX_HTTP2 and not H2_AVAILABLE:
+        logger.warning("HTTPX_HTTP2 is enabled but the 'h2' package is not installed, falling back to HTTP/1.1")
+    return httpx.AsyncClient(timeout=HTTPX_TIMEOUT, limits=HTTPX_LIMITS, http2=use_http2)
+
+
+async def open_http_client() -> httpx.AsyncClient:
+    """
+    Open the shared, pooled HTTP client used by bookshelf_conn.
+    Must be called from the event loop that will use it (bot startup / webui lifespan).
+    :return: the shared httpx.AsyncClient
+    """
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is not None and not _http_client.is_closed and _http_client_loop is loop:
+        return _http_client
+
+    if _http_client is not None and not _http_client.is_closed:
+        # Opened on a different loop, it cannot be reused or awaited from here
+        logger.debug("Discarding HTTP client bound to a previous event loop")
+
+    _http_client = _build_http_client()
+    _http_client_loop = loop
+    logger.info(f"Opened pooled HTTP client (max_connections={HTTPX_MAX_CONNECTIONS}, "
+                f"keepalive={HTTPX_MAX_KEEPALIVE}, http2={HTTPX_HTTP2 and H2_AVAILABLE})")
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client if it was opened on the running loop."""
+    global _http_client, _http_client_loop
+    client = _http_client
+    if client is None:
+        return
+    if _http_client_loop is asyncio.get_running_loop() and not client.is_closed:
+        await client.aclose()
+        logger.info("Closed pooled HTTP client")
+    _http_client = None
+    _http_client_loop = None
+
+
+@asynccontextmanager
+async def http_client():
+    """
+    Yield the shared client when it is open on the running loop,
+    otherwise a short-lived client (startup checks, tests, other processes).
+    """
+    client = _http_client
+    if client is not None and not client.is_closed and _http_client_loop is asyncio.get_running_loop():
+        yield client
+    else:
+        async with httpx.AsyncClient(timeout=HTTPX_TIMEOUT) as transient:
+            yield transient
+
+
+class ABSClient:
+    """
+    An Audiobookshelf identity: server URL + API token.
+    bookshelf_* calls made while a client is active use its credentials instead of the
+    bookshelfURL/bookshelfToken environment variables. Activation is scoped to the current
+    asyncio task, so tasks can run concurrently as different users.
+
+        async with ABSClient(token):
+            libraries = await bookshelf_libraries()
+
+        libraries = await ABSClient(token).bookshelf_libraries()
+    """
+
+    def __init__(self, token: str, url: str = None):
+        self.token = token or ""
+        self.url = (url or os.environ.get("bookshelfURL") or SERVER_URL or "").rstrip("/")
+        self._reset_tokens = []
+
+    @classmethod
+    def from_env(cls) -> 'ABSClient':
+        return cls(os.environ.get("bookshelfToken", ""))
+
+    @property
+    def key(self) -> tuple:
+        return self.url, self.token
+
+    def __enter__(self):
+        self._reset_tokens.append(_active_client.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _active_client.reset(self._reset_tokens.pop())
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+    def __getattr__(self, name):
+        # client.bookshelf_x(...) runs bookshelf_x with this client active
+        func = globals().get(name) if name.startswith("bookshelf_") else None
+        if func is None or not asyncio.iscoroutinefunction(func):
+            raise AttributeError(name)
+
+        async def bound(*args, **kwargs):
+            with self:
+                return await func(*args, **kwargs)
+
+        return bound
+
+    def __repr__(self):
+        return f"ABSClient(url={self.url!r}, token=***{self.token[-4:]})"
+
+
+_active_client: ContextVar[Optional[ABSClient]] = ContextVar("abs_client", default=None)
+
+
+def current_client() -> ABSClient:
+    """:return: the active ABSClient, or one built from the environment"""
+    return _active_client.get() or ABSClient.from_env()
+
+
+def use_client(client: Optional[ABSClient]):
+    """
+    Activate client for the rest of the current asyncio task, e.g. one interaction or one run of a
+    background task. Unlike `with client:` there is no exit, the activation ends with the task.
+    :param client: None falls back to the environment
+    """
+    _active_client.set(client)
+
+
+# Federated search, overall deadline and per-library timeout (seconds).
+# Autocomplete has to answer within Discord's 3 second window.
+SEARCH_DEADLINE = float(os.getenv('ABS_SEARCH_DEADLINE', '2.5'))
+SEARCH_LIBRARY_TIMEOUT = float(os.getenv('ABS_SEARCH_LIBRARY_TIMEOUT', '2.0'))
+
+# Items per request when paging through a library
+LIBRARY_PAGE_SIZE = int(os.getenv('ABS_LIBRARY_PAGE_SIZE', '200'))
+
+# Batch item details, ids per /items/batch/get request and parallel requests when falling back
+ITEM_BATCH_SIZE = int(os.getenv('ABS_ITEM_BATCH_SIZE', '100'))
+ITEM_DETAILS_CONCURRENCY = int(os.getenv('ABS_ITEM_DETAILS_CONCURRENCY', '8'))
+
+# Seconds the per-user progress map (from /me) is reused before reloading
+PROGRESS_MAP_TTL = float(os.getenv('ABS_PROGRESS_MAP_TTL', '60'))
+# Loaded progress maps, keyed by (server, token)
+_progress_maps = {}
+
+# Resilience: GET retries with exponential backoff + jitter, circuit breaker per ABS server
+RETRY_ATTEMPTS = int(os.getenv('ABS_RETRY_ATTEMPTS', '3'))
+RETRY_BACKOFF_BASE = float(os.getenv('ABS_RETRY_BACKOFF_BASE', '0.5'))
+RETRY_BACKOFF_MAX = float(os.getenv('ABS_RETRY_BACKOFF_MAX', '8.0'))
+RETRY_STATUS_CODES = {502, 503, 504}
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('ABS_BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RESET_TIMEOUT = float(os.getenv('ABS_BREAKER_RESET_TIMEOUT', '30'))
+
+# Metadata cache configuration (TTL in seconds per resource type)
+CACHE_ENABLED = os.getenv('ABS_CACHE_ENABLED', 'True').lower() in ('true', '1', 't')
+CACHE_MAX_ENTRIES = int(os.getenv('ABS_CACHE_MAX_ENTRIES', '512'))
+CACHE_TTLS = {
+    'libraries': float(os.getenv('ABS_CACHE_TTL_LIBRARIES', '300')),
+    'items': float(os.getenv('ABS_CACHE_TTL_ITEMS', '120')),
+    'users': float(os.getenv('ABS_CACHE_TTL_USERS', '60')),
+    'series': float(os.getenv('ABS_CACHE_TTL_SERIES', '300')),
+}
+
+
+def _cache_resource(endpoint: str):
+    """
+    Map a GET endpoint to a cacheable resource type.
+    :param endpoint: API endpoint, ex: /items/<id>
+    :return: (resource_type, resource_id) or None if the endpoint should not be cached
+    """
+    parts = [p for p in endpoint.split('?')[0].split('/') if p]
+    if not parts:
+        return None
+
+    root = parts[0]
+    if root == 'libraries':
+        if len(parts) == 1:
+            return 'libraries', None
+        if len(parts) == 2:
+            return 'libraries', parts[1]
+        if len(parts) == 3 and parts[2] == 'series':
+            return 'series', parts[1]
+    elif root == 'items' and len(parts) == 2:
+        return 'items', parts[1]
+    elif root == 'users' and len(parts) <= 2:
+        return 'users', parts[1] if len(parts) == 2 else None
+    elif root == 'series' and len(parts) == 2:
+        return 'series', parts[1]
+    return None
+
+
+class MetadataCache:
+    """
+    In-process LRU cache for ABS metadata responses with a TTL per resource type.
+    Entries are keyed by the full request URL, which includes the server and token.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttls: dict = None):
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or CACHE_TTLS)
+        self._entries = OrderedDict()
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self.evictions = 0
+
+    def get(self, key, resource_type: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses[resource_type] += 1
+            return None
+
+        expires_at, value, _, _ = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses[resource_type] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits[resource_type] += 1
+        return value
+
+    def set(self, key, value, resource_type: str, resource_id=None):
+        ttl = self.ttls.get(resource_type, 0)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value, resource_type, resource_id)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, resource_type: str = None, resource_id=None) -> int:
+        """
+        Drop cached entries. With no arguments the whole cache is cleared.
+        :return: number of entries removed
+        """
+        if resource_type is None and resource_id is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+
+        stale = [key for key, (_, _, r_type, r_id) in self._entries.items()
+                 if (resource_type is None or r_type == resource_type)
+                 and (resource_id is None or r_id == resource_id)]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def stats(self) -> dict:
+        types = set(self.ttls) | set(self.hits) | set(self.misses)
+        sizes = defaultdict(int)
+        for _, _, r_type, _ in self._entries.values():
+            sizes[r_type] += 1
+        return {
+            "enabled": CACHE_ENABLED,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "types": {
+                r_type: {
+                    "hits": self.hits[r_type],
+                    "misses": self.misses[r_type],
+                    "entries": sizes[r_type],
+                    "ttl": self.ttls.get(r_type, 0),
+                } for r_type in sorted(types)
+            }
+        }
+
+
+metadata_cache = MetadataCache()
+
+
+def invalidate_cache(resource_type: str = None, resource_id=None) -> int:
+    """
+    Invalidation hook for the metadata cache.
+    :param resource_type: libraries, items, users or series. None matches all types.
+    :param resource_id: specific resource id. None matches all ids of the type.
+    :return: number of entries removed
+    """
+    removed = metadata_cache.invalidate(resource_type, resource_id)
+    if removed:
+        logger.debug(f"Cache invalidated {removed} entries (type={resource_type}, id={resource_id})")
+    return removed
+
+
+def invalidate_progress(item_id: str = None):
+    """
+    Playback/progress writes change the user's mediaProgress, optionally also drop the item itself.
+    :param item_id: item whose cached details should be dropped as well
+    """
+    invalidate_cache('users')
+    if item_id:
+        invalidate_cache('items', item_id)
+
+
+def get_cache_stats() -> dict:
+    """:return: hit/miss counters and sizes of the metadata cache, plus single-flight counters"""
+    stats = metadata_cache.stats()
+    stats["single_flight"] = dict(single_flight_stats, in_flight=len(_inflight_gets))
+    return stats
+
+
+def _invalidate_for_write(endpoint: str):
+    """Drop cache entries affected by a write to the given endpoint."""
+    parts = [p for p in endpoint.split('?')[0].split('/') if p]
+    if not parts:
+        return
+    if parts[:3] == ['items', 'batch', 'get']:
+        # Read only, batch fetches are sent as POST
+        return
+    if parts[0] in ('users', 'session', 'items') or parts[:2] == ['me', 'progress']:
+        # user records carry mediaProgress, which sessions and play requests update
+        invalidate_progress()
+    elif parts[0] == 'libraries':
+        invalidate_cache('libraries')
+        invalidate_cache('series')
+
+
+class ABSUnavailableError(Exception):
+    """Raised without contacting ABS while its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing ABS server. After failure_threshold consecutive failures (connection errors
+    or 5xx) the circuit opens and calls fail fast. After reset_timeout one probe request is let through,
+    success closes the circuit again, failure re-opens it.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_started = None
+        self.counters = defaultdict(int)
+        self.last_failure = None
+
+    def allow_request(self) -> bool:
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.reset_timeout:
+                self.counters['short_circuited'] += 1
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_started = None
+
+        if self.state == self.HALF_OPEN:
+            # One probe at a time, a probe that never reported back is replaced after reset_timeout
+            if self.probe_started is not None and now - self.probe_started < self.reset_timeout:
+                self.counters['short_circuited'] += 1
+                return False
+            self.probe_started = now
+            self.counters['probes'] += 1
+
+        return True
+
+    def record_success(self):
+        self.counters['successes'] += 1
+        self.consecutive_failures = 0
+        if self.state != self.CLOSED:
+            logger.info(f"ABS server {self.name} recovered, closing circuit breaker")
+        self.state = self.CLOSED
+        self.probe_started = None
+
+    def record_failure(self, reason: str = ''):
+        self.counters['failures'] += 1
+        self.consecutive_failures += 1
+        self.last_failure = reason
+        self.probe_started = None
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.counters['opened'] += 1
+                logger.warning(f"ABS server {self.name} is failing ({reason}), opening circuit breaker "
+                               f"for {self.reset_timeout}s")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "last_failure": self.last_failure,
+            **{key: self.counters[key] for key in ('successes', 'failures', 'retries', 'short_circuited',
+                                                   'opened', 'probes')}
+        }
+
+
+# One breaker per ABS server
+_breakers = {}
+
+
+def _get_breaker(link: str) -> CircuitBreaker:
+    name = urlsplit(link).netloc
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+    return breaker
+
+
+def get_breaker_stats() -> dict:
+    """:return: circuit breaker state and counters for each ABS server contacted by this process"""
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
+
+
+async def _send_with_policy(method: str, link: str, req_headers: dict, Data=None, retry: bool = False):
+    """
+    Send a request through the circuit breaker. Idempotent requests (retry=True) are retried on
+    connection errors and 502/503/504 with exponential backoff and full jitter.
+    :return: httpx response
+    """
+    breaker = _get_breaker(link)
+    attempts = max(1, RETRY_ATTEMPTS) if retry else 1
+
+    for attempt in range(attempts):
+        if not breaker.allow_request():
+            raise ABSUnavailableError(f"Audiobookshelf server {breaker.name} is unavailable (circuit open)")
+
+        try:
+            async with http_client() as client:
+                if method == 'GET':
+                    if req_headers:
+                        r = await client.get(link, headers=req_headers)
+                    else:
+                        r = await client.get(link)
+                elif Data is not None and req_headers:
+                    r = await client.post(link, headers=req_headers, json=Data)
+                elif Data is not None:
+                    r = await client.post(link, json=Data)
+                elif req_headers:
+                    r = await client.post(link, headers=req_headers)
+                else:
+                    r = await client.post(link)
+        except httpx.TransportError as e:
+            breaker.record_failure(type(e).__name__)
+            if attempt + 1 >= attempts:
+                raise
+            reason = type(e).__name__
+        except asyncio.CancelledError:
+            # Cancelled probes must not leave the breaker waiting on them
+            breaker.probe_started = None
+            raise
+        else:
+            if r.status_code >= 500:
+                breaker.record_failure(f"HTTP {r.status_code}")
+            else:
+                breaker.record_success()
+            if r.status_code not in RETRY_STATUS_CODES or attempt + 1 >= attempts:
+                return r
+            reason = f"HTTP {r.status_code}"
+
+        breaker.counters['retries'] += 1
+        delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** attempt)))
+        logger.warning(f"{method} {urlsplit(link).path} failed ({reason}), retry {attempt + 1}/{attempts - 1} "
+                       f"in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+
+# Identical GETs currently in flight, keyed by (event loop, url, headers)
+_inflight_gets = {}
+single_flight_stats = {"requests": 0, "coalesced": 0}
+
+
+async def _single_flight_get(link: str, req_headers: dict):
+    """
+    Send a GET, sharing one in-flight request between concurrent callers asking for the same
+    url with the same headers (the token is part of both, so users never share responses).
+    :return: httpx response
+    """
+    key = (id(asyncio.get_running_loop()), link, tuple(sorted(req_headers.items())))
+    pending = _inflight_gets.get(key)
+    if pending is not None:
+        single_flight_stats["coalesced"] += 1
+        return await asyncio.shield(pending)
+
+    task = asyncio.ensure_future(_send_with_policy('GET', link, req_headers, retry=True))
+    _inflight_gets[key] = task
+    task.add_done_callback(lambda t: _inflight_gets.pop(key, None) if _inflight_gets.get(key) is t else None)
+    single_flight_stats["requests"] += 1
+    # Shielded so a cancelled caller does not cancel the request for everyone else
+    return await asyncio.shield(task)
+
 
 def time_converter(time_sec: int) -> str:
     """
@@ -57,7 +575,7 @@ def successMSG(endpoint, status):
 
 
 async def bookshelf_conn(endpoint: str, Headers=None, Data=None, Token=True, GET=False,
-                         POST=False, params=None):
+                         POST=False, params=None, client: ABSClient = None):
     """
     :param endpoint:
     :param Headers:
@@ -66,11 +584,11 @@ async def bookshelf_conn(endpoint: str, Headers=None, Data=None, Token=True, GET
     :param GET:
     :param POST:
     :param params:
+    :param client: ABSClient to authenticate as, defaults to the active client or the environment
     :return: r -> requests or httpx object if status 200.
     """
-    bookshelfURL = (os.environ.get("bookshelfURL") or SERVER_URL or "").rstrip("/")
+    bookshelfURL, bookshelfToken = (client or current_client()).key
     API_URL = bookshelfURL + "/api" if not bookshelfURL.endswith("/api") else bookshelfURL
-    bookshelfToken = os.environ.get("bookshelfToken", "")
 
     req_headers = dict(Headers) if Headers is not None else {}
     if Token and bookshelfToken and "Authorization" not in req_headers:
@@ -101,84 +619,89 @@ async def bookshelf_conn(endpoint: str, Headers=None, Data=None, Token=True, GET
     link = f"{API_URL}{endpoint}{tokenInsert}{additional_params}"
     if __name__ == '__main__':
         print(link)
-    # Create an HTTPX client
-    async with httpx.AsyncClient(timeout=HTTPX_TIMEOUT) as client:
-        if GET:
-            if req_headers:
-                r = await client.get(link, headers=req_headers)
-            else:
-                r = await client.get(link)
-
-            if r.status_code == 404:
-                logger.warning(f"404: GET {link} returned 404")
-
-            return r
-        elif POST:
-            if Data is not None and req_headers:
-                r = await client.post(link, headers=req_headers, json=Data)
-            elif Data is not None:
-                r = await client.post(link, json=Data)
-            elif req_headers:
-                r = await client.post(link, headers=req_headers)
-            else:
-                r = await client.post(link)
 
-            if r.status_code == 404:
-                logger.warning(f"404: POST {link} returned 404")
+    cache_resource = None
+    if GET and CACHE_ENABLED and Headers is None:
+        cache_resource = _cache_resource(endpoint)
+        if cache_resource:
+            cached = metadata_cache.get(link, cache_resource[0])
+            if cached is not None:
+                return cached
 
-            return r
-        else:
-            logger.warning('Must include GET, POST or PATCH in arguments')
-            raise Exception
+    if GET:
+        r = await _single_flight_get(link, req_headers)
+
+        if r.status_code == 404:
+            logger.warning(f"404: GET {link} returned 404")
+        elif r.status_code == 200 and cache_resource:
+            metadata_cache.set(link, r, *cache_resource)
+
+        return r
+
+    if POST:
+        # Writes are not retried, a timed out POST may still have been applied
+        r = await _send_with_policy('POST', link, req_headers, Data=Data)
+
+        if r.status_code == 404:
+            logger.warning(f"404: POST {link} returned 404")
+        elif r.status_code < 400:
+            _invalidate_for_write(endpoint)
+
+        return r
+    else:
+        logger.warning('Must include GET, POST or PATCH in arguments')
+        raise Exception
 
 
 # Test initial Connection to Bookshelf Server
-def bookshelf_test_connection():
-    bookshelfURL = os.environ.get("bookshelfURL")
+async def bookshelf_test_connection(max_attempts: int = None, exit_on_failure: bool = True):
+    """
+    Poll /healthcheck until the server answers, without blocking the event loop.
+    :param max_attempts: reconnect attempts, defaults to MAX_CONN_ATTEMPT
+    :param exit_on_failure: quit the process once all attempts failed, otherwise return None
+    :return: status code
+    """
+    bookshelfURL = current_client().url
     logger.info("Testing Server Connection")
-    connected = False
     errorCount = 0
-    maxCount = int(os.getenv('MAX_CONN_ATTEMPT', 10))
+    maxCount = max_attempts if max_attempts is not None else int(os.getenv('MAX_CONN_ATTEMPT', 10))
 
-    while not connected:
+    if not bookshelfURL:
+        logger.error("No URL PROVIDED!")
+        if exit_on_failure:
+            sys.exit(1)
+        return None
 
+    while True:
         try:
             # Using /healthcheck to avoid domain mismatch, since this is an api endpoint in bookshelf
-            r = requests.get(f'{bookshelfURL}/healthcheck', timeout=5)
+            async with http_client() as client:
+                r = await client.get(f'{bookshelfURL}/healthcheck', timeout=5)
             status = r.status_code
             if status == 200:
-                connected = True
                 logger.info("Connection Established!")
                 return status
+            reason = f"Server responded with status {status}"
 
-        except requests.exceptions.ConnectTimeout:
-            errorCount += 1
-            if errorCount <= maxCount:
-                logger.warning(
-                    f"Attempt {errorCount}: Connection time out occured!, attempting to reconnect in 5 seconds...")
-                time.sleep(5)
-
-            else:
-                logger.error("Max reconnect retries reached, aborting!")
-                sys.exit('Connection Timed Out')
+        except httpx.TimeoutException:
+            reason = "Connection time out occured!"
 
-        except requests.RequestException:
-            errorCount += 1
-            if errorCount <= maxCount:
-                logger.error(
-                    f"Attempt {errorCount}: Error occured while testing server connection, attempting to reconnect in 5 seconds...")
-                time.sleep(5)
-            else:
-                logger.error("Max reconnect retries reached, aborting!")
-                sys.exit('Request Exception')
+        except httpx.HTTPError:
+            reason = "Error occured while testing server connection"
 
-        except UnboundLocalError:
-            logger.error("No URL PROVIDED!")
-            sys.exit(1)
+        errorCount += 1
+        if errorCount < maxCount:
+            logger.warning(f"Attempt {errorCount}: {reason}, attempting to reconnect in 5 seconds...")
+            await asyncio.sleep(5)
+        else:
+            logger.error(f"{reason} Max reconnect retries reached, aborting!")
+            if exit_on_failure:
+                sys.exit('Connection Failed')
+            return None
 
 
 # Used to retrieve the token for the user logging in
-def bookshelf_user_login(username='', password='', token=''):
+async def bookshelf_user_login(username='', password='', token=''):
     """
     :param username:
     :param password:
@@ -186,35 +709,32 @@ def bookshelf_user_login(username='', password='', token=''):
     :return: user_info(dict) -> keys: username, token, type
     """
     endpoint = "/login"
-    token_endpoint = f"/api/authorize?token={token}"
-    bookshelfURL = os.environ.get("bookshelfURL")
+    token_endpoint = "/api/authorize"
+    bookshelfURL = current_client().url
     url = f"{bookshelfURL}{endpoint}"
     headers = {'Content-Type': 'application/json'}
     d = {"username": username, "password": str(password)}
-    user_info = {}
-    if token != '':
-        r = requests.post(f"{bookshelfURL}{token_endpoint}")
-    elif username != '' and password != '':
-        r = requests.post(url=f"{url}", json=d, headers=headers)
-    else:
-        return print("invalid user arguments")
+    user_info = {"username": "", "type": None, "token": ""}
+
+    try:
+        async with http_client() as client:
+            if token != '':
+                r = await client.post(f"{bookshelfURL}{token_endpoint}", params={"token": token})
+            elif username != '' and password != '':
+                r = await client.post(url, json=d, headers=headers)
+            else:
+                logger.warning("invalid user arguments")
+                return user_info
+    except httpx.HTTPError as e:
+        logger.warning(f"Login request failed: {e}")
+        return user_info
 
     if r.status_code == 200:
         data = r.json()
 
-        abs_token = data['user']['token']
-        abs_username = data['user']['username']
-        user_type = data['user']['type']
-
-    else:
-
-        abs_token = ""
-        abs_username = ""
-        user_type = None
-
-    user_info["username"] = abs_username
-    user_info["type"] = user_type
-    user_info["token"] = abs_token
+        user_info["token"] = data['user']['token']
+        user_info["username"] = data['user']['username']
+        user_info["type"] = data['user']['type']
 
     return user_info
 
@@ -240,31 +760,15 @@ async def bookshelf_auth_test():
             logger.info("Quitting!")
             sys.exit(1)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logger.warning("Could not establish connection: ", e)
 
 
-async def bookshelf_get_item_details(book_id) -> dict:
+def _format_item_details(data: dict) -> dict:
     """
-    Fetch book/podcast details from Bookshelf API.
-    :param book_id:
-    :return: formatted_data(dict) -> keys: title, author, narrator, series, publisher, genres, 
-                                           publishedYear, description, language, duration, addedDate, mediaType
+    :param data: library item json from /items/{id} or /items/batch/get
+    :return: formatted_data(dict), empty on invalid data
     """
-    _url = f"/items/{book_id}"
-    r = await bookshelf_conn(GET=True, endpoint=_url)
-
-    # Check if response is valid
-    if r.status_code != 200:
-        logger.error(f"Failed to fetch book details. Status: {r.status_code}, Response: {r.text}")
-        return {}
-
-    try:
-        data = r.json()
-    except Exception as e:
-        logger.error(f"Error parsing JSON response: {e}. Raw response: {r.text}")
-        return {}
-
     # Validate required fields
     if not data or "media" not in data or "metadata" not in data["media"]:
         logger.error(f"Invalid response structure: {data}")
@@ -334,12 +838,86 @@ async def bookshelf_get_item_details(book_id) -> dict:
         return {}
 
 
+async def bookshelf_get_item_details(book_id) -> dict:
+    """
+    Fetch book/podcast details from Bookshelf API.
+    :param book_id:
+    :return: formatted_data(dict) -> keys: title, author, narrator, series, publisher, genres, 
+                                           publishedYear, description, language, duration, addedDate, mediaType
+    """
+    _url = f"/items/{book_id}"
+    r = await bookshelf_conn(GET=True, endpoint=_url)
+
+    # Check if response is valid
+    if r.status_code != 200:
+        logger.error(f"Failed to fetch book details. Status: {r.status_code}, Response: {r.text}")
+        return {}
+
+    try:
+        data = r.json()
+    except Exception as e:
+        logger.error(f"Error parsing JSON response: {e}. Raw response: {r.text}")
+        return {}
+
+    return _format_item_details(data)
+
+
+async def bookshelf_get_items_details(item_ids: list, concurrency: int = ITEM_DETAILS_CONCURRENCY) -> dict:
+    """
+    Fetch details for many items, using POST /items/batch/get (one request per ITEM_BATCH_SIZE ids).
+    Servers without the batch endpoint fall back to bookshelf_get_item_details with bounded concurrency.
+    :param item_ids: library item ids
+    :param concurrency: max parallel requests for the fallback
+    :return: dict -> item_id: formatted_data (same keys as bookshelf_get_item_details), missing items are left out
+    """
+    unique_ids = list(dict.fromkeys(item_id for item_id in item_ids if item_id))
+    details = {}
+    fallback_ids = []
+
+    for i in range(0, len(unique_ids), ITEM_BATCH_SIZE):
+        chunk = unique_ids[i:i + ITEM_BATCH_SIZE]
+        if fallback_ids:
+            fallback_ids.extend(chunk)
+            continue
+        try:
+            r = await bookshelf_conn(POST=True, endpoint="/items/batch/get", Data={"libraryItemIds": chunk})
+            if r.status_code != 200:
+                logger.warning(f"Batch item fetch returned status {r.status_code}, fetching items individually")
+                fallback_ids.extend(chunk)
+                continue
+
+            for item in r.json().get('libraryItems', []):
+                formatted = _format_item_details(item)
+                if formatted and item.get('id'):
+                    details[item['id']] = formatted
+        except Exception as e:
+            logger.warning(f"Batch item fetch failed, fetching items individually: {e}")
+            fallback_ids.extend(chunk)
+
+    if fallback_ids:
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch(item_id):
+            async with semaphore:
+                return item_id, await bookshelf_get_item_details(item_id)
+
+        for result in await asyncio.gather(*(fetch(item_id) for item_id in fallback_ids), return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error(f"Error fetching item details: {result}")
+                continue
+            item_id, formatted = result
+            if formatted:
+                details[item_id] = formatted
+
+    return details
+
+
 async def bookshelf_listening_stats():
     """
     Gets the 10 most recent sessions for the logged in ABS user.
     :return: formatted_session_info, data
     """
-    bookshelfToken = os.environ.get("bookshelfToken")
+    bookshelfToken = current_client().token
     endpoint = "/me/listening-stats"
     formatted_sessions = []
 
@@ -445,6 +1023,72 @@ async def bookshelf_libraries():
         return library_data
 
 
+def _progress_map_key() -> tuple:
+    return current_client().key
+
+
+async def bookshelf_progress_map(force: bool = False) -> dict:
+    """
+    Progress of every item for the current user, loaded from /me mediaProgress in one request.
+    Cached per server/token for ABS_PROGRESS_MAP_TTL seconds and kept current by our own session syncs.
+    :param force: reload even if the cached map is still fresh
+    :return: dict -> (item_id, episode_id or None): {isFinished, progress, currentTime, duration, lastUpdate}
+    """
+    key = _progress_map_key()
+    entry = _progress_maps.get(key)
+    if entry and not force and time.monotonic() - entry['loaded'] < PROGRESS_MAP_TTL:
+        return entry['items']
+
+    r = await bookshelf_conn(GET=True, endpoint="/me")
+    if r.status_code != 200:
+        logger.warning(f"Could not load progress map, status {r.status_code}")
+        return entry['items'] if entry else {}
+
+    items = {}
+    for media in r.json().get('mediaProgress', []):
+        item_id = media.get('libraryItemId')
+        if not item_id:
+            continue
+        items[(item_id, media.get('episodeId') or None)] = {
+            'isFinished': bool(media.get('isFinished', False)),
+            'progress': media.get('progress', 0),
+            'currentTime': media.get('currentTime', 0),
+            'duration': media.get('duration', 0),
+            'lastUpdate': media.get('lastUpdate', 0)
+        }
+
+    _progress_maps[key] = {'loaded': time.monotonic(), 'items': items}
+    logger.debug(f"Loaded progress map with {len(items)} entries")
+    return items
+
+
+def update_progress_map(item_id: str, episode_id: str = None, current_time: float = None,
+                        duration: float = None, is_finished: bool = None):
+    """
+    Apply a progress change we made ourselves to the current user's cached progress map.
+    Does nothing if the map hasn't been loaded yet.
+    """
+    entry = _progress_maps.get(_progress_map_key())
+    if entry is None:
+        return
+
+    progress = entry['items'].setdefault((item_id, episode_id or None), {
+        'isFinished': False, 'progress': 0, 'currentTime': 0, 'duration': 0, 'lastUpdate': 0})
+    if current_time is not None:
+        progress['currentTime'] = current_time
+    if duration:
+        progress['duration'] = duration
+        progress['progress'] = min(progress['currentTime'] / duration, 1.0)
+    if is_finished is not None:
+        progress['isFinished'] = is_finished
+    progress['lastUpdate'] = int(time.time() * 1000)
+
+
+def is_item_finished(progress_map: dict, item_id: str, episode_id: str = None) -> bool:
+    progress = progress_map.get((item_id, episode_id or None))
+    return bool(progress and progress['isFinished'])
+
+
 async def bookshelf_item_progress(item_id, episode_id=None):
     if episode_id:
         endpoint = f"/me/progress/{item_id}/{episode_id}"
@@ -559,15 +1203,17 @@ async def bookshelf_mark_book_finished(item_id: str, session_id: str, episode_id
         }
 
         # Use PATCH method for progress update
-        async with httpx.AsyncClient() as client:
-            bookshelfURL = os.environ.get("bookshelfURL")
-            bookshelfToken = os.environ.get("bookshelfToken")
+        async with http_client() as client:
+            bookshelfURL, bookshelfToken = current_client().key
             api_url = f"{bookshelfURL}/api{progress_endpoint}?token={bookshelfToken}"
 
             progress_response = await client.patch(api_url, json=progress_update,
                                                    headers={'Content-Type': 'application/json'})
+            invalidate_progress(item_id)
 
             if progress_response.status_code == 200:
+                update_progress_map(item_id, episode_id, current_time=float(total_duration),
+                                    duration=float(total_duration), is_finished=True)
                 logger.info(
                     f"Successfully marked {media_type} {'episode ' + episode_id if episode_id else item_id} as finished")
                 return True
@@ -623,15 +1269,16 @@ async def bookshelf_mark_book_unfinished(item_id: str, episode_id: str = None):
         }
 
         # Use PATCH method for progress update
-        async with httpx.AsyncClient() as client:
-            bookshelfURL = os.environ.get("bookshelfURL")
-            bookshelfToken = os.environ.get("bookshelfToken")
+        async with http_client() as client:
+            bookshelfURL, bookshelfToken = current_client().key
             api_url = f"{bookshelfURL}/api{progress_endpoint}?token={bookshelfToken}"
 
             progress_response = await client.patch(api_url, json=progress_update,
                                                    headers={'Content-Type': 'application/json'})
+            invalidate_progress(item_id)
 
             if progress_response.status_code == 200:
+                update_progress_map(item_id, episode_id, current_time=0.0, is_finished=False)
                 media_name = f"podcast episode {episode_id}" if episode_id else f"book {item_id}"
                 logger.info(f"Successfully marked {media_name} as not finished")
                 return True
@@ -646,70 +1293,132 @@ async def bookshelf_mark_book_unfinished(item_id: str, episode_id: str = None):
         return False
 
 
-async def bookshelf_title_search(display_title: str) -> list:
+def _search_result_rank(query: str, title: str, position: int) -> float:
     """
-    :param display_title:
-    :return: found_titles(list)
+    Score a search hit, ABS already orders each library's results so position is the base rank,
+    exact and prefix title matches are boosted so they win across libraries.
     """
-    libraries = await bookshelf_libraries()
-    valid_media_types = ['book', 'podcast']
-
-    valid_libraries = []
-    valid_library_count = 0
-    found_titles = []
+    q = query.casefold().strip()
+    t = (title or '').casefold()
+    score = 1.0 / (position + 1)
+    if t == q:
+        score += 3.0
+    elif t.startswith(q):
+        score += 2.0
+    elif q in t:
+        score += 1.0
+    return score
+
+
+async def _search_library(library_id: str, query: str, limit: int) -> list:
+    """
+    :return: hits from one library as dicts with id, title, author, mediaType, libraryId, position
+    """
+    endpoint = f"/libraries/{library_id}/search"
+    params = f"&q={quote(query)}&limit={limit}"
+    r = await bookshelf_conn(endpoint=endpoint, GET=True, params=params)
+    if r.status_code != 200:
+        logger.warning(f"Search in library {library_id} returned status {r.status_code}")
+        return []
 
-    # Get valid libraries
-    for name, (library_id, audiobooks_only) in libraries.items():
-        # Parse for the library that is only audio
-        valid_libraries.append({"id": library_id, "name": name})
-        valid_library_count += 1
-        logger.debug(f"Valid Libraries Found: {valid_library_count} | Name: {name}\n")
-
-    if valid_library_count > 0:
-
-        # Search the libraries for the title name
-        for lib_id in valid_libraries:
-            library_iD = lib_id.get('id')
-            logger.debug(f"Beginning to search libraries: {lib_id.get('name')} | {library_iD}\n")
-            # Search for the title name using endpoint
+    data = r.json()
+    hits = []
+    for media_type in ('book', 'podcast'):
+        for position, result in enumerate(data.get(media_type, [])):
             try:
-                limit = 10
-                endpoint = f"/libraries/{library_iD}/search"
-                params = f"&q={display_title}&limit={limit}"
-                r = await bookshelf_conn(endpoint=endpoint, GET=True, params=params)
-                logger.debug(f"status code: {r.status_code}")
-                if r.status_code == 200:
-                    data = r.json()
+                item = result['libraryItem']
+                metadata = item['media']['metadata']
+                if media_type == 'podcast':
+                    author = metadata.get('author') or metadata.get('feedAuthor') or 'Unknown Author'
+                else:
+                    names = [a.get('name') for a in metadata.get('authors', []) if a.get('name')]
+                    author = ', '.join(names) if names else 'Unknown Author'
+                hits.append({'id': item['id'], 'title': metadata['title'], 'author': author,
+                             'mediaType': item.get('mediaType', media_type), 'libraryId': library_id,
+                             'position': position})
+            except (KeyError, TypeError) as e:
+                logger.warning(f"Error processing {media_type} search result: {e}")
+    return hits
+
+
+async def bookshelf_federated_search(query: str, limit: int = 10, media_types=('book', 'podcast'),
+                                     deadline: float = None, library_timeout: float = None) -> list:
+    """
+    Search every library concurrently and merge the results.
+    Libraries that fail or miss their timeout are skipped, so a slow library only costs its own results.
+    :param query: search text
+    :param limit: max results returned (top-k across libraries)
+    :param media_types: media types to keep
+    :param deadline: overall time budget in seconds
+    :param library_timeout: time budget per library in seconds (capped by the deadline)
+    :return: list of dicts -> id, title, author, mediaType, libraryId
+    """
+    deadline = SEARCH_DEADLINE if deadline is None else deadline
+    library_timeout = min(SEARCH_LIBRARY_TIMEOUT if library_timeout is None else library_timeout, deadline)
+    started = time.monotonic()
 
-                    successMSG(endpoint, r.status_code)
-                    dataset = data.get('book', [])
-                    for book in dataset:
-                        authors_list = []
-                        title = book['libraryItem']['media']['metadata']['title']
-                        authors_raw = book['libraryItem']['media']['metadata']['authors']
+    libraries = await bookshelf_libraries() or {}
+    if not libraries:
+        return []
 
-                        for author in authors_raw:
-                            name = author.get('name')
-                            authors_list.append(name)
+    remaining = max(deadline - (time.monotonic() - started), 0.01)
+    names = {library_id: name for name, (library_id, _) in libraries.items()}
+    tasks = {asyncio.create_task(asyncio.wait_for(_search_library(library_id, query, limit),
+                                                  timeout=min(library_timeout, remaining))): library_id
+             for library_id in names}
 
-                        authors = ', '.join(authors_list)
+    done, pending = await asyncio.wait(tasks, timeout=remaining)
+    for task in pending:
+        task.cancel()
+        logger.warning(f"Search in library {names[tasks[task]]} missed the deadline, returning partial results")
 
-                        book_id = book['libraryItem']['id']
-                        media_type = book['libraryItem']['mediaType']
-                        # Add to dict
-                        if media_type in valid_media_types:
-                            logger.debug(f'accepted: {title} | media type: {media_type}')
-                            found_titles.append({'id': book_id, 'title': title, 'author': authors})
-                        else:
-                            logger.warning(f'rejected: {title}, reason: media-type {media_type} rejected')
+    best = {}
+    for task in done:
+        library_id = tasks[task]
+        try:
+            hits = task.result()
+        except asyncio.TimeoutError:
+            logger.warning(f"Search in library {names[library_id]} timed out, returning partial results")
+            continue
+        except Exception as e:
+            logger.error(f"Error searching library {names[library_id]}: {e}")
+            continue
 
-                    # Append None to book_titles if nothing is found
-                    logger.debug(found_titles)
-                    return found_titles
+        for hit in hits:
+            if hit['mediaType'] not in media_types:
+                continue
+            score = _search_result_rank(query, hit['title'], hit.pop('position'))
+            # Dedup by id, keeping the best scoring hit
+            if hit['id'] not in best or score > best[hit['id']][0]:
+                best[hit['id']] = (score, hit)
 
-            except Exception as e:
-                logger.error(f'Error occured: {e}')
-                logger.error(traceback.print_exc())
+    top = heapq.nlargest(limit, best.values(), key=lambda pair: pair[0])
+    logger.debug(f"Federated search for '{query}' returned {len(top)} results "
+                 f"in {time.monotonic() - started:.2f}s")
+    return [hit for _, hit in top]
+
+
+async def bookshelf_title_search(display_title: str) -> list:
+    """
+    :param display_title:
+    :return: found_titles(list)
+    """
+    # Answer from the local catalog index when it has been built
+    import catalog_index
+    indexed = await catalog_index.search_catalog(display_title, limit=10)
+    if indexed is not None:
+        return [{'id': item['id'], 'title': item['title'], 'author': item['author']} for item in indexed]
+
+    try:
+        results = await bookshelf_federated_search(display_title, limit=10)
+        found_titles = [{'id': item['id'], 'title': item['title'], 'author': item['author']} for item in results]
+        logger.debug(found_titles)
+        return found_titles
+
+    except Exception as e:
+        logger.error(f'Error occured: {e}')
+        logger.error(traceback.print_exc())
+        return []
 
 
 async def bookshelf_search_users(name):
@@ -884,7 +1593,7 @@ async def bookshelf_create_user(username: str, password, user_type: str, email=N
 
 
 async def bookshelf_library_csv(library_id: str, file_name='books.csv'):
-    bookshelfToken = os.getenv('bookshelfToken')
+    bookshelfToken = current_client().token
     endpoint = f'/libraries/{library_id}'
     headers = {'Authorization': f'Bearer {bookshelfToken}'}
     params = '?sort=media.metadata.authorName'
@@ -918,9 +1627,9 @@ async def bookshelf_cover_image(item_id: str):
     if optional_image_url != '':
         bookshelfURL = optional_image_url
     else:
-        bookshelfURL = os.environ.get("bookshelfURL")
+        bookshelfURL = current_client().url
     defaultAPIURL = bookshelfURL + '/api'
-    bookshelfToken = os.environ.get("bookshelfToken")
+    bookshelfToken = current_client().token
     tokenInsert = "?token=" + bookshelfToken
 
     # Generates Cover Link
@@ -930,6 +1639,27 @@ async def bookshelf_cover_image(item_id: str):
     return link
 
 
+def _format_library_item(items: dict):
+    """
+    :param items: library item from /libraries/{id}/items
+    :return: dict -> id, title, author, asin, addedTime, mediaType. None for ebooks.
+    """
+    if 'ebookFormat' in items['media']:
+        return None
+
+    book_title = items['media']['metadata']['title']
+    author = items['media']['metadata'].get('authorName')
+    asin = items['media']['metadata'].get('asin')
+    media_type = items['mediaType']
+    item_id = items['id']
+
+    # Added time is in linux
+    addedTime = items['addedAt']
+
+    return {'id': item_id, 'title': book_title, 'author': author, 'asin': asin, 'addedTime': addedTime,
+            "mediaType": media_type}
+
+
 async def bookshelf_all_library_items(library_id, params=''):
     found_titles = []
     endpoint = f"/libraries/{library_id}/items"
@@ -943,21 +1673,62 @@ async def bookshelf_all_library_items(library_id, params=''):
 
         dataset = data.get('results', [])
         for items in dataset:
-            book_title = items['media']['metadata']['title']
-            author = items['media']['metadata'].get('authorName')
-            media_type = items['mediaType']
-            item_id = items['id']
+            item = _format_library_item(items)
+            if item is not None:
+                found_titles.append(item)
 
-            # Added time is in linux
-            addedTime = items['addedAt']
+        return found_titles
 
-            try:
-                ebook = items['media']['ebookFormat']
-            except KeyError:
-                found_titles.append({'id': item_id, 'title': book_title, 'author': author, 'addedTime': addedTime,
-                                     "mediaType": media_type})
 
-        return found_titles
+async def bookshelf_iter_library_pages(library_id, params='', page_size=LIBRARY_PAGE_SIZE):
+    """
+    Page through /libraries/{id}/items using limit/page, one request per page.
+    Stop iterating (break) to skip the remaining pages.
+    :param library_id:
+    :param params: extra query params, ex: sort=addedAt&desc=1. Defaults to sorting by title.
+    :param page_size: items per page
+    :return: async generator of raw item lists, one per page
+    """
+    endpoint = f"/libraries/{library_id}/items"
+    params = params.lstrip('&?') if params else 'sort=media.metadata.title'
+    page = 0
+
+    while True:
+        r = await bookshelf_conn(GET=True, endpoint=endpoint, params=f"&{params}&limit={page_size}&page={page}")
+        if r.status_code != 200:
+            # Raise instead of ending quietly, callers must not mistake a failed page for the end of the library
+            raise Exception(f"Failed to fetch page {page} of library {library_id}, status {r.status_code}")
+
+        data = r.json()
+        results = data.get('results', [])
+        if results:
+            yield results
+
+        page += 1
+        total = data.get('total')
+        if len(results) < page_size or (total is not None and page * page_size >= total):
+            return
+
+
+async def bookshelf_iter_library_items(library_id, params='', page_size=LIBRARY_PAGE_SIZE, limit=None):
+    """
+    Streaming variant of bookshelf_all_library_items, items are fetched page by page as they are consumed.
+    :param library_id:
+    :param params: extra query params, ex: sort=addedAt&desc=1
+    :param page_size: items per request
+    :param limit: stop after this many items
+    :return: async generator of dicts -> id, title, author, asin, addedTime, mediaType
+    """
+    count = 0
+    async for page in bookshelf_iter_library_pages(library_id, params, page_size):
+        for items in page:
+            item = _format_library_item(items)
+            if item is None:
+                continue
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                return
 
 
 # NOT CURRENTLY IN USE
@@ -1050,8 +1821,7 @@ async def bookshelf_audio_obj(item_id: str, episode_index: int = 0):
     :return: For books: (onlineURL, currentTime, session_id, title, duration, episode_id)
              For podcasts: (onlineURL, currentTime, session_id, title, duration, episode_id, episode_info)
     """
-    bookshelfURL = os.environ.get("bookshelfURL", "")
-    bookshelfToken = os.environ.get("bookshelfToken", "")
+    bookshelfURL, bookshelfToken = current_client().key
 
     if not bookshelfURL or not bookshelfToken:
         logger.error("Missing Bookshelf URL or Token in environment variables.")
@@ -1194,6 +1964,35 @@ async def bookshelf_audio_obj(item_id: str, episode_index: int = 0):
         return onlineURL, currentTime, session_id, bookTitle, bookDuration, episode_id
 
 
+async def bookshelf_audio_file_url(item_id: str, episode_index: int = 0) -> Optional[str]:
+    """
+    File URL bookshelf_audio_obj would stream, without opening a playback session.
+
+    :param item_id: Book/Podcast item ID
+    :param episode_index: Episode index for podcasts ONLY, same ordering as bookshelf_audio_obj
+    :return: onlineURL, None when the item has no audio file
+    """
+    bookshelfURL, bookshelfToken = current_client().key
+    item_response = await bookshelf_conn(GET=True, endpoint=f"/items/{item_id}")
+    if item_response.status_code != 200:
+        return None
+
+    item_data = item_response.json()
+    if item_data.get("mediaType") == "podcast":
+        episodes = await bookshelf_get_podcast_episodes(item_id)
+        if not episodes or not 0 <= episode_index < len(episodes):
+            return None
+        episode = episodes[episode_index]
+        ino = (episode.get('audioFile') or episode.get('audioTrack') or {}).get('ino', '')
+    else:
+        audiofiles = item_data.get("media", {}).get("audioFiles", [])
+        ino = audiofiles[0].get('ino', '') if audiofiles else ''
+
+    if not ino:
+        return None
+    return f"{bookshelfURL}/api/items/{item_id}/file/{ino}?token={bookshelfToken}"
+
+
 async def bookshelf_session_update(session_id: str, item_id: str, current_time: float, next_time=None,
                                    mark_finished=False, episode_id=None):
     """
@@ -1273,6 +2072,8 @@ async def bookshelf_session_update(session_id: str, item_id: str, current_time:
 
                 if r_session_update.status_code == 200:
                     logger.debug(f'bookshelf session sync successful. {updatedTime}')
+                    update_progress_map(item_id, episode_id, current_time=float(updatedTime),
+                                        duration=float(duration), is_finished=True if finished_book else None)
 
                     # If we're marking as finished, make sure to explicitly mark it
                     if finished_book and mark_finished:
@@ -1305,7 +2106,7 @@ async def bookshelf_close_session(session_id: str):
         else:
             logger.warning(r.status_code)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Failed to close session {session_id}")
         logger.warning(f"Failed to close session: {session_id}, {e}")
         print(f"{e}")
@@ -1365,8 +2166,7 @@ async def bookshelf_search_books(title: str, provider=DEFAULT_PROVIDER, author='
     :returns: data -> item object from ABS api.
     """
     endpoint = '/search/books'
-    bookshelfToken = os.environ.get("bookshelfToken")
-    bookshelfURL = os.getenv('bookshelfURL')
+    bookshelfURL, bookshelfToken = current_client().key
     bookshelfURL = bookshelfURL + "/api" + endpoint
 
     logger.info(f'Initializing book search for title {title} using ABS providers.')
@@ -1391,7 +2191,7 @@ async def bookshelf_search_books(title: str, provider=DEFAULT_PROVIDER, author='
         params = {"title": title, "author": author, "provider": provider}
 
     # GET Request for book title
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.get(url=bookshelfURL, params=params, headers=tokenHeaders)
 
         if response.status_code == 200:
@@ -1410,8 +2210,7 @@ async def bookshelf_get_valid_books() -> list:
     # Get libraries
     found_books = []
     for name, (library_id, audiobooks_only) in libraries.items():
-        books = await bookshelf_all_library_items(library_id)
-        for book in books:
+        async for book in bookshelf_iter_library_items(library_id):
             book_title = book.get('title')
             book_id = book.get('id')
             book_authors = book.get('author')
@@ -0,0 +1,439 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from difflib import SequenceMatcher
+from typing import Optional, List
+
+import bookshelfAPI as c
+
+logger = logging.getLogger("bot")
+
+# Catalog index configuration
+CATALOG_ENABLED = os.getenv('ABS_CATALOG_ENABLED', 'True').lower() in ('true', '1', 't')
+# Seconds between incremental syncs (items sorted by updatedAt, stops at the last seen value)
+CATALOG_SYNC_INTERVAL = float(os.getenv('ABS_CATALOG_SYNC_INTERVAL', '300'))
+# Seconds between full syncs, these also drop items removed from the server
+CATALOG_FULL_SYNC_INTERVAL = float(os.getenv('ABS_CATALOG_FULL_SYNC_INTERVAL', '3600'))
+CATALOG_PAGE_SIZE = c.LIBRARY_PAGE_SIZE
+
+# Minimum similarity for typo tolerant matches
+FUZZY_THRESHOLD = 0.6
+
+
+def normalize_text(value) -> str:
+    """Casefold and collapse punctuation/whitespace so 'Harry Potter: Book 1' ~ 'harry potter book 1'."""
+    if not value:
+        return ""
+    return " ".join(re.split(r"[\W_]+", str(value).casefold())).strip()
+
+
+def _fts_phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _trigrams(text: str) -> set:
+    grams = set()
+    for word in text.split():
+        for i in range(len(word) - 2):
+            grams.add(word[i:i + 3])
+    return grams
+
+
+def _similarity(query: str, text: str) -> float:
+    """
+    Word level fuzzy score: every query word is matched with its closest word in text.
+    :return: 0.0 - 1.0
+    """
+    q_words = query.split()
+    t_words = text.split()
+    if not q_words or not t_words:
+        return 0.0
+
+    total = 0.0
+    for q_word in q_words:
+        best = 0.0
+        for t_word in t_words:
+            if t_word.startswith(q_word):
+                best = 1.0
+                break
+            best = max(best, SequenceMatcher(None, q_word, t_word).ratio())
+        total += best
+    return total / len(q_words)
+
+
+def _parse_item(item: dict) -> Optional[dict]:
+    """Flatten a (minified) library item into an index row, None for ebook only items."""
+    media = item.get('media') or {}
+    metadata = media.get('metadata') or {}
+    media_type = item.get('mediaType', 'book')
+
+    # Same rule as bookshelf_all_library_items, ebooks can't be played
+    if 'ebookFormat' in media:
+        return None
+
+    if media_type == 'podcast':
+        author = metadata.get('author') or metadata.get('feedAuthor') or ''
+    else:
+        author = metadata.get('authorName') or ', '.join(
+            a.get('name', '') for a in metadata.get('authors', []) if isinstance(a, dict))
+
+    genres = metadata.get('genres') or []
+    return {
+        'item_id': item.get('id'),
+        'library_id': item.get('libraryId', ''),
+        'media_type': media_type,
+        'title': metadata.get('title') or '',
+        'subtitle': metadata.get('subtitle') or '',
+        'author': author or '',
+        'narrator': metadata.get('narratorName') or '',
+        'series': metadata.get('seriesName') or '',
+        'genres': ', '.join(genres) if isinstance(genres, list) else str(genres),
+        'added_at': int(item.get('addedAt') or 0),
+        'updated_at': int(item.get('updatedAt') or item.get('addedAt') or 0),
+    }
+
+
+# SQLite FTS5 catalog index
+class SQLiteCatalogIndex:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = None
+        self.fts_enabled = False
+        self._sync_lock: Optional[asyncio.Lock] = None
+        self._sync_task: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        import aiosqlite
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = await aiosqlite.connect(self.db_path)
+        self._sync_lock = asyncio.Lock()
+        logger.info(f"Connected to SQLite database: {self.db_path}")
+
+    async def close(self):
+        if self._sync_task and not self._sync_task.done():
+            self._sync_task.cancel()
+        if self.conn:
+            await self.conn.close()
+
+    async def create_catalog_tables(self):
+        await self.conn.execute('''
+CREATE TABLE IF NOT EXISTS catalog_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id TEXT NOT NULL UNIQUE,
+    library_id TEXT NOT NULL,
+    media_type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    subtitle TEXT,
+    author TEXT,
+    narrator TEXT,
+    series TEXT,
+    genres TEXT,
+    added_at INTEGER NOT NULL DEFAULT 0,
+    updated_at INTEGER NOT NULL DEFAULT 0,
+    synced_at REAL NOT NULL DEFAULT 0
+)
+        ''')
+        await self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_catalog_library ON catalog_items(library_id)')
+        await self.conn.execute('''
+CREATE TABLE IF NOT EXISTS catalog_sync (
+    library_id TEXT PRIMARY KEY,
+    server TEXT NOT NULL,
+    watermark INTEGER NOT NULL DEFAULT 0,
+    last_sync REAL NOT NULL DEFAULT 0,
+    last_full_sync REAL NOT NULL DEFAULT 0
+)
+        ''')
+
+        # Trigram tokenizer gives substring matches and lets us rank by shared trigrams for typos
+        try:
+            await self.conn.execute('''
+CREATE VIRTUAL TABLE IF NOT EXISTS catalog_fts USING fts5(
+    title, subtitle, author, narrator, series, genres,
+    content='catalog_items', content_rowid='id', tokenize='trigram'
+)
+            ''')
+            for trigger in (
+                '''CREATE TRIGGER IF NOT EXISTS catalog_items_ai AFTER INSERT ON catalog_items BEGIN
+    INSERT INTO catalog_fts(rowid, title, subtitle, author, narrator, series, genres)
+    VALUES (new.id, new.title, new.subtitle, new.author, new.narrator, new.series, new.genres);
+END''',
+                '''CREATE TRIGGER IF NOT EXISTS catalog_items_ad AFTER DELETE ON catalog_items BEGIN
+    INSERT INTO catalog_fts(catalog_fts, rowid, title, subtitle, author, narrator, series, genres)
+    VALUES ('delete', old.id, old.title, old.subtitle, old.author, old.narrator, old.series, old.genres);
+END''',
+                '''CREATE TRIGGER IF NOT EXISTS catalog_items_au AFTER UPDATE ON catalog_items BEGIN
+    INSERT INTO catalog_fts(catalog_fts, rowid, title, subtitle, author, narrator, series, genres)
+    VALUES ('delete', old.id, old.title, old.subtitle, old.author, old.narrator, old.series, old.genres);
+    INSERT INTO catalog_fts(rowid, title, subtitle, author, narrator, series, genres)
+    VALUES (new.id, new.title, new.subtitle, new.author, new.narrator, new.series, new.genres);
+END''',
+            ):
+                await self.conn.execute(trigger)
+            self.fts_enabled = True
+        except Exception as e:
+            logger.warning(f"SQLite FTS5 trigram tokenizer unavailable, catalog search will use LIKE: {e}")
+            self.fts_enabled = False
+
+        await self.conn.commit()
+
+    # Sync ----------------------------------------------------------------------
+
+    async def get_sync_state(self, library_id: str) -> Optional[tuple]:
+        async with self.conn.execute(
+                'SELECT server, watermark, last_sync, last_full_sync FROM catalog_sync WHERE library_id = ?',
+                (library_id,)) as cursor:
+            return await cursor.fetchone()
+
+    async def upsert_items(self, rows: List[dict], synced_at: float):
+        await self.conn.executemany('''
+INSERT INTO catalog_items (item_id, library_id, media_type, title, subtitle, author, narrator, series, genres,
+                           added_at, updated_at, synced_at)
+VALUES (:item_id, :library_id, :media_type, :title, :subtitle, :author, :narrator, :series, :genres,
+        :added_at, :updated_at, :synced_at)
+ON CONFLICT(item_id) DO UPDATE SET
+    library_id = excluded.library_id, media_type = excluded.media_type, title = excluded.title,
+    subtitle = excluded.subtitle, author = excluded.author, narrator = excluded.narrator,
+    series = excluded.series, genres = excluded.genres, added_at = excluded.added_at,
+    updated_at = excluded.updated_at, synced_at = excluded.synced_at''',
+                                    [dict(row, synced_at=synced_at) for row in rows])
+
+    async def sync_library(self, library_id: str, full: bool = False) -> int:
+        """
+        Pull items from ABS into the index.
+        Incremental syncs walk items newest updatedAt first and stop at the stored watermark.
+        :return: number of items written
+        """
+        server = c.current_client().url
+        state = await self.get_sync_state(library_id)
+
+        if state and state[0] != server:
+            logger.info(f"ABS server changed, rebuilding catalog index for library {library_id}")
+            await self.conn.execute('DELETE FROM catalog_items WHERE library_id = ?', (library_id,))
+            state = None
+
+        watermark = 0 if (full or not state) else state[1]
+        full = full or not state
+        started = time.time()
+        new_watermark = watermark
+        written = 0
+
+        params = "sort=updatedAt&desc=1&minified=1"
+        async for results in c.bookshelf_iter_library_pages(library_id, params, CATALOG_PAGE_SIZE):
+            rows = []
+            reached_watermark = False
+            for item in results:
+                row = _parse_item(item)
+                if row is None:
+                    continue
+                row['library_id'] = row['library_id'] or library_id
+                if not full and row['updated_at'] <= watermark:
+                    reached_watermark = True
+                    continue
+                new_watermark = max(new_watermark, row['updated_at'])
+                rows.append(row)
+
+            if rows:
+                await self.upsert_items(rows, started)
+                written += len(rows)
+
+            if reached_watermark:
+                break
+
+        if full:
+            # Anything not seen during a full pass was removed from the library
+            await self.conn.execute('DELETE FROM catalog_items WHERE library_id = ? AND synced_at < ?',
+                                    (library_id, started))
+
+        await self.conn.execute('''
+INSERT INTO catalog_sync (library_id, server, watermark, last_sync, last_full_sync)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(library_id) DO UPDATE SET
+    server = excluded.server, watermark = excluded.watermark, last_sync = excluded.last_sync,
+    last_full_sync = CASE WHEN ? THEN excluded.last_full_sync ELSE catalog_sync.last_full_sync END''',
+                                (library_id, server, new_watermark, started, started if full else 0, full))
+        await self.conn.commit()
+
+        logger.debug(f"Catalog sync for library {library_id} wrote {written} items (full={full})")
+        return written
+
+    async def sync(self, library_ids: List[str] = None, force: bool = False):
+        """Sync libraries whose index is older than the configured intervals."""
+        async with self._sync_lock:
+            if library_ids is None:
+                libraries = await c.bookshelf_libraries() or {}
+                library_ids = [library_id for library_id, _ in libraries.values()]
+
+            now = time.time()
+            for library_id in library_ids:
+                try:
+                    state = await self.get_sync_state(library_id)
+                    if state is None:
+                        await self.sync_library(library_id, full=True)
+                    elif force or now - state[3] >= CATALOG_FULL_SYNC_INTERVAL:
+                        await self.sync_library(library_id, full=True)
+                    elif now - state[2] >= CATALOG_SYNC_INTERVAL:
+                        await self.sync_library(library_id)
+                except Exception as e:
+                    logger.error(f"Error syncing catalog for library {library_id}: {e}")
+
+    def schedule_sync(self, library_ids: List[str] = None, force: bool = False):
+        """Start a background sync unless one is already running."""
+        if self._sync_task and not self._sync_task.done():
+            return self._sync_task
+        self._sync_task = asyncio.create_task(self._sync_as_bot(library_ids, force))
+        return self._sync_task
+
+    async def _sync_as_bot(self, library_ids: List[str] = None, force: bool = False):
+        # The index is shared by every user, fill it with the bot's own token rather than the one of
+        # whoever's search triggered the sync. Searches still filter by the caller's libraries.
+        c.use_client(None)
+        await self.sync(library_ids, force)
+
+    async def is_stale(self, library_ids: List[str]) -> bool:
+        now = time.time()
+        for library_id in library_ids:
+            state = await self.get_sync_state(library_id)
+            if state is None or now - state[2] >= CATALOG_SYNC_INTERVAL:
+                return True
+        return False
+
+    async def indexed_libraries(self, library_ids: List[str]) -> List[str]:
+        placeholders = ','.join('?' * len(library_ids))
+        async with self.conn.execute(
+                f'SELECT library_id FROM catalog_sync WHERE library_id IN ({placeholders})',
+                library_ids) as cursor:
+            return [row[0] for row in await cursor.fetchall()]
+
+    # Search --------------------------------------------------------------------
+
+    async def _match(self, match: str, library_ids: List[str], limit: int) -> List[tuple]:
+        placeholders = ','.join('?' * len(library_ids))
+        # Column weights: title, subtitle, author, narrator, series, genres
+        async with self.conn.execute(f'''
+SELECT i.item_id, i.title, i.subtitle, i.author, i.narrator, i.series, i.media_type, i.library_id
+FROM catalog_fts JOIN catalog_items i ON i.id = catalog_fts.rowid
+WHERE catalog_fts MATCH ? AND i.library_id IN ({placeholders})
+ORDER BY bm25(catalog_fts, 10.0, 3.0, 6.0, 2.0, 4.0, 1.0)
+LIMIT ?''', (match, *library_ids, limit)) as cursor:
+            return await cursor.fetchall()
+
+    async def _like(self, text: str, library_ids: List[str], limit: int) -> List[tuple]:
+        placeholders = ','.join('?' * len(library_ids))
+        pattern = f"%{text}%"
+        async with self.conn.execute(f'''
+SELECT item_id, title, subtitle, author, narrator, series, media_type, library_id
+FROM catalog_items
+WHERE library_id IN ({placeholders})
+  AND (title LIKE ? OR subtitle LIKE ? OR author LIKE ? OR narrator LIKE ? OR series LIKE ?)
+ORDER BY CASE WHEN title LIKE ? THEN 0 ELSE 1 END, title
+LIMIT ?''', (*library_ids, pattern, pattern, pattern, pattern, pattern, f"{text}%", limit)) as cursor:
+            return await cursor.fetchall()
+
+    async def search(self, query: str, library_ids: List[str], limit: int = 10) -> List[dict]:
+        """
+        Ranked local search: substring matches on every word first, then typo tolerant
+        matches (shared trigrams re-ranked by word similarity) to fill the remaining slots.
+        """
+        text = normalize_text(query)
+        if not text or not library_ids:
+            return []
+
+        words = text.split()
+        long_words = [w for w in words if len(w) >= 3]
+        rows = []
+
+        if self.fts_enabled and long_words:
+            candidates = await self._match(' AND '.join(_fts_phrase(w) for w in long_words), library_ids,
+                                           limit * 4)
+            # Words shorter than a trigram can't be matched by FTS, filter them here
+            short_words = [w for w in words if len(w) < 3]
+            for row in candidates:
+                haystack = normalize_text(' '.join(str(v) for v in row[1:6] if v))
+                if all(w in haystack for w in short_words):
+                    rows.append(row)
+        else:
+            rows = await self._like(query.strip(), library_ids, limit)
+
+        rows = rows[:limit]
+
+        if self.fts_enabled and len(rows) < limit:
+            grams = _trigrams(text)
+            if grams:
+                seen = {row[0] for row in rows}
+                candidates = await self._match(' OR '.join(_fts_phrase(g) for g in grams), library_ids, 100)
+                scored = []
+                for row in candidates:
+                    if row[0] in seen:
+                        continue
+                    score = max(_similarity(text, normalize_text(row[1])),
+                                _similarity(text, normalize_text(f"{row[1]} {row[3]}")),
+                                _similarity(text, normalize_text(row[5])))
+                    if score >= FUZZY_THRESHOLD:
+                        scored.append((score, row))
+                scored.sort(key=lambda pair: pair[0], reverse=True)
+                rows.extend(row for _, row in scored[:limit - len(rows)])
+
+        return [{'id': row[0], 'title': row[1], 'subtitle': row[2], 'author': row[3], 'narrator': row[4],
+                 'series': row[5], 'mediaType': row[6], 'libraryId': row[7]} for row in rows]
+
+
+# Database Factory
+def create_catalog_index() -> SQLiteCatalogIndex:
+    db_path = 'db/catalog.db'
+    return SQLiteCatalogIndex(db_path)
+
+
+# Global index instance
+catalog_db: Optional[SQLiteCatalogIndex] = None
+
+
+async def initialize_catalog_index():
+    global catalog_db
+    if not CATALOG_ENABLED:
+        logger.info("Catalog index disabled, searches will query ABS directly")
+        return
+    catalog_db = create_catalog_index()
+    await catalog_db.connect()
+    await catalog_db.create_catalog_tables()
+    catalog_db.schedule_sync()
+    logger.info("Initialized catalog index using SQLite")
+
+
+async def close_catalog_index():
+    global catalog_db
+    if catalog_db:
+        await catalog_db.close()
+        catalog_db = None
+
+
+async def search_catalog(query: str, limit: int = 10) -> Optional[List[dict]]:
+    """
+    Search the local catalog index, limited to the libraries visible to the current token.
+    Triggers a background sync when the index is stale.
+    :return: list of item dicts, or None when the index can't answer (disabled or not built yet)
+    """
+    if catalog_db is None:
+        return None
+
+    try:
+        libraries = await c.bookshelf_libraries() or {}
+        library_ids = [library_id for library_id, _ in libraries.values()]
+        if not library_ids:
+            return None
+
+        if await catalog_db.is_stale(library_ids):
+            catalog_db.schedule_sync(library_ids)
+
+        indexed = await catalog_db.indexed_libraries(library_ids)
+        if len(indexed) < len(library_ids):
+            # Not fully built yet, let the caller query ABS
+            return None
+
+        return await catalog_db.search(query, library_ids, limit)
+
+    except Exception as e:
+        logger.error(f"Catalog search failed, falling back to ABS search: {e}")
+        return None
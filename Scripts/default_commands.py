@@ -477,49 +477,51 @@ class PrimaryCommands(Extension):
             await ctx.defer(ephemeral=self.ephemeral_output)
         
             # Get all books from specified library or all libraries
+            import random
             all_books = []
             libraries = await c.bookshelf_libraries()
 
-
-
             if library:
                 # Use specific library
                 if library in [lib_id for name, (lib_id, audiobooks_only) in libraries.items()]:
-                    books = await c.bookshelf_all_library_items(library)
-                    all_books.extend(books)
+                    library_ids = [library]
                 else:
                     await ctx.send("Invalid library selected.", ephemeral=True)
                     return
             else:
                 # Get books from all libraries
-                for name, (lib_id, audiobooks_only) in libraries.items():
-                    books = await c.bookshelf_all_library_items(lib_id)
-                    all_books.extend(books)
-        
+                library_ids = [lib_id for name, (lib_id, audiobooks_only) in libraries.items()]
+
+            # Stream items page by page. Without a genre filter only a random sample of 10
+            # is kept (reservoir sampling), so the full library never sits in memory
+            seen_count = 0
+            for lib_id in library_ids:
+                async for book in c.bookshelf_iter_library_items(lib_id):
+                    seen_count += 1
+                    if genre or len(all_books) < 10:
+                        all_books.append(book)
+                    else:
+                        index = random.randrange(seen_count)
+                        if index < 10:
+                            all_books[index] = book
+
             if not all_books:
                 await ctx.send("No books found in your library.", ephemeral=True)
                 return
         
             # Filter by genre if specified
             if genre:
-                filtered_books = []
-                for book in all_books:
-                    try:
-                        book_details = await c.bookshelf_get_item_details(book['id'])
-                        book_genres = book_details.get('genres', '').lower()
-                        if genre.lower() in book_genres:
-                            filtered_books.append(book)
-                    except:
-                        continue
-                all_books = filtered_books
+                all_details = await c.bookshelf_get_items_details([book['id'] for book in all_books])
+                all_books = [book for book in all_books
+                             if genre.lower() in all_details.get(book['id'], {}).get('genres', '').lower()]
             
                 if not all_books:
                     await ctx.send(f"No books found with genre '{genre}'.", ephemeral=True)
                     return
         
             # Randomly select up to 10 books
-            import random
             random_books = random.sample(all_books, min(10, len(all_books)))
+            random_details = await c.bookshelf_get_items_details([book.get('id') for book in random_books])
         
             # Create embeds for each book
             embeds = []
@@ -533,7 +535,7 @@ class PrimaryCommands(Extension):
             
                 try:
                     # Get detailed book information
-                    book_details = await c.bookshelf_get_item_details(book_id)
+                    book_details = random_details.get(book_id, {})
                     series = book_details.get('series', '')
                     narrator = book_details.get('narrator', '')
                     duration_seconds = book_details.get('duration', 0)
@@ -876,7 +878,7 @@ class PrimaryCommands(Extension):
                                 choices.append({"name": f"{subtitle}", "value": f"{book_id}"})
 
                 # Add progress indicators
-                choices, timed_out = await self.add_progress_indicators(choices)
+                choices, timed_out = await add_progress_indicators(choices)
                 if timed_out:
                     logger.warning("Autocomplete progress check timed out for search results")
 
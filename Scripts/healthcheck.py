@@ -34,9 +34,9 @@ async def main():
         try:
             # Check Audiobookshelf connection
             user_token = os.getenv('bookshelfToken')
-            result = bookshelf_user_login(token=user_token)
+            result = await bookshelf_user_login(token=user_token)
 
-            if not result:
+            if not result or not result.get('username'):
                 print('HEALTHCHECK FAILED: Audiobookshelf connection failed', file=None)
                 sys.exit(1)
 
@@ -17,6 +17,11 @@ import db_additions
 import settings
 from subscription_task import conn_test, initialize_task_database, close_task_database
 from wishlist import initialize_database as initialize_wishlist_database, close_database as close_wishlist_database
+from catalog_index import initialize_catalog_index, close_catalog_index
+from audio_cache import audio_cache, start_audio_cache, close_audio_cache
+import runtime_metrics
+from scheduler import scheduler
+from outbound import outbound
 from interactions.api.events import *
 from settings_watcher import SettingsWatcher, reload_bot_components
 
@@ -72,7 +77,7 @@ for key, value in settings.current_config.items():
         logger.info(f"{key}: {value}")
 
 # Start Server Connection Prior to Running Bot
-server_status_code = c.bookshelf_test_connection()
+server_status_code = asyncio.run(c.bookshelf_test_connection())
 
 # Quit if server does not respond
 if server_status_code != 200:
@@ -87,6 +92,8 @@ else:
 
 # Bot basic setup
 bot = Client(intents=Intents.DEFAULT, logger=logger)
+# Background notifications go through the rate limited outbound queue
+outbound.bind(bot)
 
 # Settings watcher for auto-reload
 settings_watcher = None
@@ -146,6 +153,31 @@ async def on_startup(event: Startup):
         logger.error(f"Failed to initialize task database: {e}")
         raise
 
+    # Open the pooled ABS HTTP client on the bot's event loop
+    await c.open_http_client()
+
+    try:
+        await initialize_catalog_index()
+    except Exception as e:
+        # Searches fall back to ABS when the index is unavailable
+        logger.error(f"Failed to initialize catalog index: {e}")
+
+    try:
+        await start_audio_cache()
+    except Exception as e:
+        # Playback streams straight from ABS when the cache is unavailable
+        logger.error(f"Failed to start audio cache: {e}")
+
+    # Publish cache and circuit breaker counters for the web UI
+    runtime_metrics.register_provider("cache", c.get_cache_stats)
+    runtime_metrics.register_provider("breakers", c.get_breaker_stats)
+    runtime_metrics.register_provider("outbound", outbound.stats)
+    runtime_metrics.register_provider("audio_cache", audio_cache.stats)
+    try:
+        await runtime_metrics.start_metrics_publisher()
+    except Exception as e:
+        logger.error(f"Failed to start metrics publisher: {e}")
+
     # Start settings watcher for auto-reload
     global settings_watcher
     env_file = os.path.join(os.path.dirname(__file__), ".env")
@@ -166,7 +198,7 @@ async def on_startup(event: Startup):
     if MULTI_USER:
         import multi_user as mu
         user_token = os.getenv('bookshelfToken')
-        user_info = c.bookshelf_user_login(token=user_token)
+        user_info = await c.bookshelf_user_login(token=user_token)
         username = user_info['username']
         if username != '':
             # Check if multi_user also needs async conversion
@@ -195,6 +227,9 @@ async def on_startup(event: Startup):
 async def on_disconnect(event):
     """Handle bot shutdown and cleanup"""
     logger.info("Bot is shutting down, closing database connections...")
+    # Stop background jobs before their resources are closed
+    scheduler.stop_all()
+
     try:
         await close_wishlist_database()
         logger.info("Wishlist database closed successfully")
@@ -207,6 +242,27 @@ async def on_disconnect(event):
     except Exception as e:
         logger.error(f"Error closing task database: {e}")
 
+    try:
+        await close_catalog_index()
+        logger.info("Catalog index closed successfully")
+    except Exception as e:
+        logger.error(f"Error closing catalog index: {e}")
+
+    try:
+        await close_audio_cache()
+    except Exception as e:
+        logger.error(f"Error closing audio cache: {e}")
+
+    try:
+        await runtime_metrics.stop_metrics_publisher()
+    except Exception as e:
+        logger.error(f"Error stopping metrics publisher: {e}")
+
+    try:
+        await c.close_http_client()
+    except Exception as e:
+        logger.error(f"Error closing HTTP client: {e}")
+
     # Stop settings watcher
     global settings_watcher
     if settings_watcher:
@@ -1,6 +1,8 @@
 import os
 import logging
 import sqlite3
+from typing import Dict, Optional
+
 from interactions import *
 
 import bookshelfAPI as c
@@ -108,9 +110,28 @@ def remove_user_db(user: str):
         return False
 
 
+# discord id -> ABS identity the user logged in as, users without one use the bookshelfToken from the environment
+user_clients: Dict[int, c.ABSClient] = {}
+
+
+def login_user(discord_id: int, token: str):
+    user_clients[int(discord_id)] = c.ABSClient(token)
+
+
+def client_for_user(discord_id: int) -> Optional[c.ABSClient]:
+    return user_clients.get(int(discord_id))
+
+
+async def activate_user_client(ctx, *args, **kwargs):
+    """Global pre-run, every interaction talks to ABS as the user who triggered it."""
+    author = getattr(ctx, 'author', None)
+    c.use_client(client_for_user(author.id) if author else None)
+
+
 class MultiUser(Extension):
     def __init__(self, bot):
-        pass
+        # Runs before every command, component and autocomplete callback, in the interaction's own task
+        bot.pre_run_callback = activate_user_client
 
     @check(ownership_check)
     @slash_command(name="login", description="Login into ABS", dm_permission=True)
@@ -135,7 +156,7 @@ class MultiUser(Extension):
         username_response = modal_ctx.responses["modal_username"]
         password_response = modal_ctx.responses["modal_password"]
 
-        user_info = c.bookshelf_user_login(username_response, password_response)
+        user_info = await c.bookshelf_user_login(username_response, password_response)
 
         abs_token = user_info["token"]
         abs_username = user_info["username"]
@@ -165,17 +186,16 @@ class MultiUser(Extension):
                                          ephemeral=True)
                     logger.warning(
                         f'user {ctx.author} logged in to ABS, changing token to assigned user: {abs_username}')
-                    os.environ['bookshelfToken'] = abs_token
+                    login_user(author_discord_id, abs_token)
 
             else:
                 await modal_ctx.send("Invalid username or password", ephemeral=True)
 
         else:
-            logger.info("SQLite found associated token, proceeding to update ENV VARS...")
-            retrieved_token = [0][0]
-            retrieved_token = str(retrieved_token)
+            logger.info("SQLite found associated token, proceeding to switch the user's ABS client...")
+            retrieved_token = str(user_result[0])
 
-            abs_stored_token = os.environ.get('bookshelfToken')
+            abs_stored_token = c.current_client().token
 
             if retrieved_token == abs_stored_token:
                 logger.info("Option 1 executed")
@@ -184,7 +204,7 @@ class MultiUser(Extension):
 
             elif retrieved_token != abs_stored_token:
                 logger.info("Option 2 executed")
-                os.environ['bookshelfToken'] = retrieved_token
+                login_user(author_discord_id, retrieved_token)
                 logger.warning(f'user {ctx.author} logged in to ABS, changing token to assigned user: {abs_username}')
                 await modal_ctx.send(content=f"Successfully logged in as {abs_username}.",
                                      ephemeral=True)
@@ -204,7 +224,7 @@ class MultiUser(Extension):
 
             else:
                 logger.info('Option 4 executed')
-                os.environ['bookshelfToken'] = retrieved_token
+                login_user(author_discord_id, retrieved_token)
                 info = search_user_db(int(author_discord_id))
                 retrieved_user = info[0][1]
                 logger.warning(f'user {ctx.author} logged in to ABS, changing token to assigned user: {retrieved_user}')
@@ -234,12 +254,12 @@ class MultiUser(Extension):
             return await ctx.send("Cannot perform login during playback, please use the /stop command and try again.",
                                   ephemeral=True)
 
-        abs_stored_token = os.getenv('bookshelfToken')
+        abs_stored_token = c.current_client().token
         user_result = search_user_db(user=user)
 
         if user_result:
             token = user_result[0]
-            user_info = c.bookshelf_user_login(token=token)
+            user_info = await c.bookshelf_user_login(token=token)
             username = user_info['username']
             user_type = user_info['type']
             admin_user = False
@@ -251,7 +271,7 @@ class MultiUser(Extension):
                 await ctx.send(content=f"user: {username} already logged in.", ephemeral=True)
                 return
             elif username == user:
-                os.environ['bookshelfToken'] = token
+                login_user(ctx.author.id, token)
                 logger.warning(f'user {ctx.author} logged in to ABS, changing token to assigned user: {username}')
                 await ctx.send(content=f'Successfully logged in as user {username}', ephemeral=True)
                 if admin_user:
@@ -284,14 +304,14 @@ class MultiUser(Extension):
 
     @slash_command(name='user', description="Display the currently logged in ABS user", dm_permission=False)
     async def user_check(self, ctx: SlashContext):
-        abs_stored_token = os.getenv('bookshelfToken')
+        abs_stored_token = c.current_client().token
         discord_id = ctx.author.id
         result = search_user_db(token=abs_stored_token)
         if result:
             username = result[0]
             await ctx.send(content=f"user **{username}** is currently logged in.", ephemeral=True)
         else:
-            user_call = c.bookshelf_user_login(token=abs_stored_token)
+            user_call = await c.bookshelf_user_login(token=abs_stored_token)
             username = user_call['username']
             if username != '':
                 user_insert = insert_data(discord_id=discord_id, token=abs_stored_token, user=username)
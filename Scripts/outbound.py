@@ -0,0 +1,269 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("bot")
+
+# Discord accepts at most 10 embeds in a single message
+MAX_EMBEDS_PER_MESSAGE = 10
+# Messages sent per route (channel or DM) within OUTBOUND_ROUTE_WINDOW seconds, mirrors Discord's message bucket
+OUTBOUND_ROUTE_LIMIT = int(os.getenv('OUTBOUND_ROUTE_LIMIT', '5'))
+OUTBOUND_ROUTE_WINDOW = float(os.getenv('OUTBOUND_ROUTE_WINDOW', '5'))
+# Seconds fetched users and channels are reused before asking Discord again
+OUTBOUND_CACHE_TTL = int(os.getenv('OUTBOUND_CACHE_TTL', '600'))
+# Times a message is retried after Discord answered 429
+OUTBOUND_MAX_RETRIES = 3
+
+
+def pack_embeds(embeds: list, content: str = None) -> List[dict]:
+    """
+    Split embeds into as few messages as possible, the content is sent with the first one.
+    :param embeds: list of Embed
+    :param content: optional message text
+    :return: list of send() keyword arguments
+    """
+    embeds = list(embeds or [])
+    if not embeds:
+        return [{"content": content}] if content else []
+
+    messages = []
+    for start in range(0, len(embeds), MAX_EMBEDS_PER_MESSAGE):
+        message = {"embeds": embeds[start:start + MAX_EMBEDS_PER_MESSAGE]}
+        if start == 0 and content:
+            message["content"] = content
+        messages.append(message)
+    return messages
+
+
+class RouteBucket:
+    """
+    Token bucket for one Discord route, holds sends back before Discord has to answer 429.
+    """
+
+    def __init__(self, limit: int = OUTBOUND_ROUTE_LIMIT, window: float = OUTBOUND_ROUTE_WINDOW):
+        self.limit = max(1, limit)
+        self.window = window
+        self.tokens = float(self.limit)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        rate = self.limit / self.window if self.window > 0 else float('inf')
+        self.tokens = min(self.limit, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """:return: seconds until the next send is allowed, 0 when it can go now"""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * self.window / self.limit
+
+    async def acquire(self) -> float:
+        """
+        Wait for a free slot and take it.
+        :return: seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            delay = self.wait_time()
+            if delay <= 0:
+                self.tokens -= 1
+                return waited
+            waited += delay
+            await asyncio.sleep(delay)
+
+    def block(self, retry_after: float):
+        """Pause the route after Discord reported a rate limit."""
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+
+class OutboundQueue:
+    """
+    Outbound Discord messages for background tasks. Every route (channel or DM) has its own FIFO and
+    rate limit bucket so a burst to one channel doesn't hold back the others, embeds are packed 10 per
+    message and fetched users/channels are cached.
+    """
+
+    def __init__(self, bot=None, route_limit: int = OUTBOUND_ROUTE_LIMIT,
+                 route_window: float = OUTBOUND_ROUTE_WINDOW, cache_ttl: int = OUTBOUND_CACHE_TTL):
+        self.bot = bot
+        self.route_limit = route_limit
+        self.route_window = route_window
+        self.cache_ttl = cache_ttl
+
+        self._queues: Dict[str, deque] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._buckets: Dict[str, RouteBucket] = {}
+        self._cache: Dict[Tuple[str, int], Tuple[float, object]] = {}
+
+        self.sent = 0
+        self.embeds_sent = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.wait_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def bind(self, bot):
+        self.bot = bot
+
+    # Lookups -------------------------------------------------------
+
+    async def _cached(self, kind: str, object_id: int, fetch):
+        key = (kind, int(object_id))
+        entry = self._cache.get(key)
+        if entry and time.monotonic() - entry[0] < self.cache_ttl:
+            self.cache_hits += 1
+            return entry[1]
+
+        self.cache_misses += 1
+        obj = await fetch(int(object_id))
+        if obj:
+            self._cache[key] = (time.monotonic(), obj)
+        return obj
+
+    async def get_user(self, user_id: int):
+        """:return: the Discord user, fetched at most once per cache TTL"""
+        return await self._cached('user', user_id, self.bot.fetch_user)
+
+    async def get_channel(self, channel_id: int):
+        """:return: the Discord channel, fetched at most once per cache TTL"""
+        return await self._cached('channel', channel_id, self.bot.fetch_channel)
+
+    def invalidate(self, kind: str, object_id: int):
+        self._cache.pop((kind, int(object_id)), None)
+
+    # Sending -------------------------------------------------------
+
+    async def send_to_channel(self, channel_id: int, embeds: list = None, content: str = None) -> Optional[list]:
+        """
+        Queue a notification for a channel.
+        :return: list of sent messages, None when the channel couldn't be fetched
+        """
+        channel = await self.get_channel(channel_id)
+        if not channel:
+            logger.warning(f"Could not fetch channel {channel_id}")
+            return None
+        return await self.send(f"channel:{channel_id}", channel, embeds=embeds, content=content)
+
+    async def send_to_user(self, user_id: int, embeds: list = None, content: str = None) -> Optional[list]:
+        """
+        Queue a direct message for a user.
+        :return: list of sent messages, None when the user couldn't be fetched
+        """
+        user = await self.get_user(user_id)
+        if not user:
+            logger.warning(f"Could not fetch user {user_id}")
+            return None
+        return await self.send(f"dm:{user_id}", user, embeds=embeds, content=content)
+
+    async def send(self, route: str, target, embeds: list = None, content: str = None) -> list:
+        """
+        Queue packed messages for a target and wait until they are delivered.
+        :param route: rate limit bucket key, one per channel or DM
+        :param target: object with an async send(**kwargs), e.g. a channel or user
+        :return: list of sent messages
+        """
+        messages = pack_embeds(embeds, content)
+        if not messages:
+            return []
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        queue = self._queues.setdefault(route, deque())
+        for message in messages:
+            future = loop.create_future()
+            queue.append([target, message, future, 0])
+            futures.append(future)
+
+        worker = self._workers.get(route)
+        if worker is None or worker.done():
+            self._workers[route] = asyncio.create_task(self._drain(route), name=f"outbound-{route}")
+
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return list(results)
+
+    async def _drain(self, route: str):
+        queue = self._queues[route]
+        bucket = self._buckets.setdefault(route, RouteBucket(self.route_limit, self.route_window))
+        try:
+            while queue:
+                self.wait_seconds += await bucket.acquire()
+                entry = queue[0]
+                target, message, future, attempts = entry
+                try:
+                    result = await target.send(**message)
+                except Exception as e:
+                    retry_after = _retry_after(e)
+                    if retry_after is not None and attempts < OUTBOUND_MAX_RETRIES:
+                        # Keep the message at the front so the route stays in order
+                        self.rate_limited += 1
+                        entry[3] += 1
+                        bucket.block(retry_after)
+                        logger.warning(f"Rate limited on {route}, retrying in {retry_after:.2f}s")
+                        continue
+                    queue.popleft()
+                    self.failed += 1
+                    if not future.done():
+                        future.set_exception(e)
+                    continue
+
+                queue.popleft()
+                self.sent += 1
+                self.embeds_sent += len(message.get("embeds", []))
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            if not queue:
+                self._queues.pop(route, None)
+            self._workers.pop(route, None)
+
+    def depth(self) -> int:
+        """:return: messages waiting to be sent across all routes"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self) -> dict:
+        busiest = sorted(((route, len(queue)) for route, queue in self._queues.items()),
+                         key=lambda pair: pair[1], reverse=True)
+        return {
+            "depth": self.depth(),
+            "active_routes": len(self._workers),
+            "busiest_routes": dict(busiest[:5]),
+            "sent": self.sent,
+            "embeds_sent": self.embeds_sent,
+            "failed": self.failed,
+            "rate_limited": self.rate_limited,
+            "wait_seconds": round(self.wait_seconds, 2),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """:return: seconds to wait when the error is a Discord 429, None otherwise"""
+    if getattr(error, 'status', None) != 429:
+        return None
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is None:
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        retry_after = headers.get('Retry-After')
+    try:
+        return max(0.0, float(retry_after))
+    except (TypeError, ValueError):
+        return OUTBOUND_ROUTE_WINDOW
+
+
+# Global queue, bound to the bot in main.py
+outbound = OutboundQueue()
@@ -0,0 +1,241 @@
+import logging
+import os
+import resource
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger("bot")
+
+# Guild whose playback session the current task works on, set per interaction and per session task
+_active_guild: ContextVar[Optional[int]] = ContextVar('playback_guild', default=None)
+
+
+def current_guild_id() -> Optional[int]:
+    return _active_guild.get()
+
+
+def bind_guild(guild_id: Optional[int]):
+    """
+    Point the current task at a guild's playback session. Every interaction and session task runs in its
+    own asyncio task, so the binding never leaks into other guilds' work.
+    """
+    _active_guild.set(guild_id)
+
+
+def bind_guild_of(ctx):
+    guild = getattr(ctx, 'guild', None)
+    bind_guild(guild.id if guild else None)
+
+
+class PlaybackSession:
+    """
+    Playback state of one guild. AudioPlayBack routes its session attributes to the session of the
+    guild bound to the current task, so every guild streams independently.
+    """
+
+    def __init__(self, guild_id: Optional[int]):
+        self.guild_id = guild_id
+        # Background tasks, attached by AudioPlayBack
+        self.session_update = None
+        self.auto_kill_session = None
+        self.auto_kill_message = None
+        # bookshelfAPI.ABSClient of the user who started playback
+        self.abs_client = None
+        # ABS Variables
+        self.cover_image = ''
+        self.bookItemID = ''
+        self.bookTitle = ''
+        self.bookDuration = None
+        self.bookFinished = False
+        self.episodeInfo = None
+        self.episodeId = None
+        # User Variables
+        self.username = ''
+        self.user_type = ''
+        self.current_channel = None
+        self.active_guild_id = None
+        # Session Variables
+        self.sessionID = ''
+        self.currentTime = 0.0
+        self.nextTime = None
+        self.activeSessions = 0
+        self.stream_started = False
+        self.sessionOwner = None
+        self.announcement_message = None
+        self.repeat_enabled = False
+        self.needs_restart = False
+        self._last_patch_timestamps = {}
+        # Autoplay Variables, the next item is prepared in the last minutes of the current one
+        self.next_plan = None
+        self.prewarm_task = None
+        self.transitioning = False
+        self.stream_ended_at = None
+        # Stall Variables, see AudioPlayBack.check_stream
+        self.stall_watchdog = None
+        self.watch_source = None
+        self.watch_frames = 0
+        self.watch_since = None
+        self.stall_started_at = None
+        self.stall_retries = 0
+        # Audio Variables
+        self.voice_state = None
+        self.audioObj = None
+        self.audio_source = None          # discord.FFmpegOpusAudio or discord.PCMVolumeTransformer
+        self.stream_url = None
+        self.context_voice_channel = None
+        self.current_playback_time = 0
+        self.audio_context = None
+        self.bitrate = 128000
+        self.volume = 0.5
+        self.placeholder = None
+        self.playbackSpeed = 1.0
+        self.updateFreqMulti = None
+        self.play_state = 'stopped'
+        self.audio_message = None
+        self.needs_encoder = True
+        # Chapter Variables
+        self.currentChapter = None
+        self.chapterArray = None
+        self.currentChapterTitle = ''
+        self.newChapterTitle = ''
+        self.found_next_chapter = False
+        # Series Variables
+        self.currentSeries = None  # Series metadata
+        self.seriesAutoplay = True  # Auto-progression for book series
+        self.seriesList = []  # List of book IDs in series order
+        self.seriesIndex = None  # Current position in series
+        self.previousBookID = None
+        self.previousBookTime = None
+        self.isLastBookInSeries = False
+        self.isFirstBookInSeries = False
+        self.seriesBookCache = {}
+        # Podcast Variables
+        self.isPodcast = False
+        self.podcastAutoplay = True  # Auto-progression for podcast episodes
+        self.podcastEpisodes = []
+        self.currentEpisodeIndex = None
+        self.totalEpisodes = 0
+        self.isFirstEpisode = False
+        self.isLastEpisode = False
+        self.currentEpisodeTitle = ''
+
+    @property
+    def active(self) -> bool:
+        return self.activeSessions > 0
+
+    def stats(self) -> dict:
+        return {
+            "state": self.play_state,
+            "item": self.bookItemID,
+            "position": round(self.currentTime or 0, 1),
+            "owner": self.sessionOwner,
+        }
+
+
+def next_book_start_time(progress: Optional[dict]) -> Optional[float]:
+    """
+    :param progress: bookshelf_item_progress result, None when the book was never started
+    :return: 0.0 to restart a finished book, None to let ABS resume at its saved position
+    """
+    if progress and progress.get('finished', 'False') == 'True':
+        return 0.0
+    return None
+
+
+# Attribute names AudioPlayBack stores per guild
+SESSION_ATTRIBUTES = frozenset(vars(PlaybackSession(None)))
+
+
+class ResourceSampler:
+    """
+    CPU and memory of the bot process per active stream, sampled on every metrics publish.
+    """
+
+    def __init__(self):
+        self._last_wall = time.monotonic()
+        self._last_cpu = time.process_time()
+
+    @staticmethod
+    def rss_bytes() -> int:
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            # Peak instead of current usage, reported in KiB on Linux
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def sample(self, active_streams: int) -> dict:
+        wall, cpu = time.monotonic(), time.process_time()
+        elapsed = wall - self._last_wall
+        cpu_percent = (cpu - self._last_cpu) / elapsed * 100 if elapsed > 0 else 0.0
+        self._last_wall, self._last_cpu = wall, cpu
+
+        rss_mb = self.rss_bytes() / (1024 * 1024)
+        return {
+            "active_streams": active_streams,
+            "cpu_percent": round(cpu_percent, 2),
+            "rss_mb": round(rss_mb, 1),
+            "cpu_percent_per_stream": round(cpu_percent / active_streams, 2) if active_streams else None,
+            "rss_mb_per_stream": round(rss_mb / active_streams, 1) if active_streams else None,
+        }
+
+
+class StreamHealth:
+    """
+    Stalls of all streams and how long recovering from them took, published with the playback metrics.
+    """
+
+    def __init__(self, history: int = 100):
+        self.stalls = 0
+        self.recoveries = 0
+        self.failures = 0
+        self.recovery_times = deque(maxlen=history)
+
+    def record_stall(self):
+        self.stalls += 1
+
+    def record_recovery(self, seconds: float):
+        """:param seconds: from detecting the stall to the first frame of the restarted stream"""
+        self.recoveries += 1
+        self.recovery_times.append(seconds)
+
+    def record_failure(self):
+        self.failures += 1
+
+    def stats(self) -> dict:
+        return {
+            "stalls": self.stalls,
+            "recoveries": self.recoveries,
+            "failures": self.failures,
+            "recovery_time": gap_stats(self.recovery_times),
+        }
+
+
+def gap_stats(gaps: Iterable[float]) -> dict:
+    """:return: count, last, average and maximum of durations in seconds, e.g. autoplay transition gaps"""
+    gaps = list(gaps)
+    if not gaps:
+        return {"count": 0, "last": None, "avg": None, "max": None}
+    return {
+        "count": len(gaps),
+        "last": round(gaps[-1], 3),
+        "avg": round(sum(gaps) / len(gaps), 3),
+        "max": round(max(gaps), 3),
+    }
+
+
+def playback_stats(sessions: Dict[Optional[int], PlaybackSession], sampler: ResourceSampler,
+                   transition_gaps: Iterable[float] = (), stream_health: StreamHealth = None) -> dict:
+    """
+    :return: per guild session state, process CPU/memory per active stream, autoplay transition gaps
+             and stream stalls
+    """
+    active = {guild_id: session for guild_id, session in sessions.items() if session.active}
+    return {
+        **sampler.sample(len(active)),
+        "sessions": {str(guild_id): session.stats() for guild_id, session in active.items()},
+        "transition_gap": gap_stats(transition_gaps),
+        "streams": (stream_health or StreamHealth()).stats(),
+    }
@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional
+
+from scheduler import scheduler
+
+logger = logging.getLogger("bot")
+
+# Seconds between snapshots written by the bot process
+METRICS_PUBLISH_INTERVAL = float(os.getenv('METRICS_PUBLISH_INTERVAL', '15'))
+
+# name -> callable returning a JSON serializable dict
+_providers: Dict[str, Callable[[], dict]] = {}
+
+
+def register_provider(name: str, provider: Callable[[], dict]):
+    """
+    Register a metrics source. Providers are called on every publish and must be cheap.
+    :param name: key the snapshot is stored under
+    :param provider: callable returning a JSON serializable dict
+    """
+    _providers[name] = provider
+
+
+def collect() -> dict:
+    snapshot = {}
+    for name, provider in _providers.items():
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            logger.debug(f"Metrics provider {name} failed: {e}")
+    return snapshot
+
+
+class SQLiteMetricsStore:
+    """
+    The bot and the web UI run in separate processes, the bot publishes its in-memory counters
+    here so the web UI can show them.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = None
+
+    async def connect(self):
+        import aiosqlite
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = await aiosqlite.connect(self.db_path)
+        logger.debug(f"Connected to SQLite database: {self.db_path}")
+
+    async def close(self):
+        if self.conn:
+            await self.conn.close()
+
+    async def create_metrics_table(self):
+        await self.conn.execute('''
+CREATE TABLE IF NOT EXISTS runtime_metrics (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)''')
+        await self.conn.commit()
+
+    async def publish(self, snapshot: dict):
+        now = time.time()
+        await self.conn.executemany(
+            'INSERT OR REPLACE INTO runtime_metrics (name, data, updated_at) VALUES (?, ?, ?)',
+            [(name, json.dumps(data, default=str), now) for name, data in snapshot.items()])
+        await self.conn.commit()
+
+    async def read(self) -> dict:
+        async with self.conn.execute('SELECT name, data, updated_at FROM runtime_metrics') as cursor:
+            rows = await cursor.fetchall()
+        return {name: {"data": json.loads(data), "updated_at": updated_at} for name, data, updated_at in rows}
+
+
+def create_metrics_store() -> SQLiteMetricsStore:
+    db_path = 'db/metrics.db'
+    return SQLiteMetricsStore(db_path)
+
+
+# Global publisher state (bot process)
+metrics_db: Optional[SQLiteMetricsStore] = None
+# Reader connection, opened on the first read (web UI process)
+_reader: Optional[SQLiteMetricsStore] = None
+
+
+async def _publish():
+    await metrics_db.publish(collect())
+
+
+async def start_metrics_publisher():
+    global metrics_db
+    metrics_db = create_metrics_store()
+    await metrics_db.connect()
+    await metrics_db.create_metrics_table()
+    register_provider("scheduler", scheduler.stats)
+    scheduler.add_job('metrics-publish', _publish, interval=METRICS_PUBLISH_INTERVAL, jitter=0).start(delay=0)
+
+
+async def stop_metrics_publisher():
+    global metrics_db
+    job = scheduler.jobs.get('metrics-publish')
+    if job:
+        job.stop()
+    if metrics_db:
+        await metrics_db.close()
+        metrics_db = None
+
+
+async def read_metrics() -> dict:
+    """
+    Read the last snapshot published by the bot (web UI process).
+    :return: dict of provider name -> {"data": metrics, "updated_at": publish time},
+             empty when the bot hasn't published yet
+    """
+    global _reader
+    if _reader is None:
+        store = create_metrics_store()
+        if not os.path.exists(store.db_path):
+            return {}
+        await store.connect()
+        await store.create_metrics_table()
+        _reader = store
+    try:
+        return await _reader.read()
+    except Exception:
+        # Reconnect on the next poll
+        await close_metrics_reader()
+        raise
+
+
+async def close_metrics_reader():
+    global _reader
+    if _reader:
+        await _reader.close()
+        _reader = None
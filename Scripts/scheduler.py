@@ -0,0 +1,236 @@
+import asyncio
+import bisect
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger("bot")
+
+# Upper bounds (seconds) of the run duration histogram buckets, the last bucket is open ended
+DURATION_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300)
+
+
+class Lease(ABC):
+    """
+    Exclusive right to run a job, shared between bot instances (e.g. a row in a database).
+    Jobs with a lease only run when acquire() succeeds and renew it while running.
+    """
+    duration: float = 120
+
+    @abstractmethod
+    async def acquire(self) -> bool:
+        ...
+
+    @abstractmethod
+    async def renew(self) -> bool:
+        ...
+
+    @abstractmethod
+    async def release(self):
+        ...
+
+
+class Job:
+    """
+    A recurring coroutine. Runs every interval (+/- jitter), a run that is still in progress when the
+    next one is due causes that tick to be skipped instead of piling up.
+    start(), stop() and running mirror interactions' Task so extensions can swap one for the other.
+    """
+
+    def __init__(self, name: str, func: Callable[[], Awaitable], interval: float, jitter: float = 0.1,
+                 lease: Optional[Lease] = None):
+        """
+        :param name: unique job name, used in logs and metrics
+        :param func: coroutine function called with no arguments
+        :param interval: seconds between runs
+        :param jitter: fraction of the interval each delay is randomly moved by
+        :param lease: optional Lease held for the duration of every run
+        """
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.lease = lease
+
+        self._loop_task: Optional[asyncio.Task] = None
+        self._run_task: Optional[asyncio.Task] = None
+        self._next_delay: Optional[float] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.lease_lost = 0
+        self.last_status = None
+        self.last_error = None
+        self.last_started = None
+        self.last_duration = None
+        self.histogram = [0] * (len(DURATION_BUCKETS) + 1)
+
+    @property
+    def running(self) -> bool:
+        return self._loop_task is not None and not self._loop_task.done()
+
+    @property
+    def in_progress(self) -> bool:
+        return self._run_task is not None and not self._run_task.done()
+
+    def start(self, delay: float = None):
+        """Start the schedule, the first run happens after delay (defaults to one jittered interval)."""
+        if self.running:
+            return
+        self._next_delay = delay
+        self._wakeup = asyncio.Event()
+        self._loop_task = asyncio.create_task(self._schedule(), name=f"job-{self.name}")
+
+    def stop(self):
+        """Stop scheduling further runs. A run in progress, including the caller's own, is not interrupted."""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+        self._loop_task = None
+
+    def defer(self, seconds: float):
+        """Run next after the given number of seconds instead of the regular interval."""
+        self._next_delay = seconds
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _delay(self) -> float:
+        if self._next_delay is not None:
+            delay, self._next_delay = self._next_delay, None
+            return max(0.0, delay)
+        spread = self.interval * self.jitter
+        return max(0.0, self.interval + random.uniform(-spread, spread))
+
+    async def _schedule(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._delay())
+                # defer() was called, recompute the delay
+                continue
+            except asyncio.TimeoutError:
+                pass
+
+            if self.in_progress:
+                self.skipped += 1
+                logger.warning(f"Job {self.name} is still running, skipping this run")
+                continue
+
+            self._run_task = asyncio.create_task(self.run_once(), name=f"job-{self.name}-run")
+
+    async def run_once(self):
+        """Run the job now, respecting its lease. Exceptions are recorded, not raised."""
+        if self.lease is not None and not await self.lease.acquire():
+            self.skipped += 1
+            logger.debug(f"Another instance is already running {self.name}, skipping...")
+            return
+
+        lease_lost = asyncio.Event()
+        renewer = None
+        if self.lease is not None:
+            renewer = asyncio.create_task(self._renew_lease(asyncio.current_task(), lease_lost))
+
+        started = time.monotonic()
+        self.last_started = datetime.now().isoformat(timespec='seconds')
+        status, error = 'ok', None
+        try:
+            await self.func()
+        except asyncio.CancelledError:
+            if not lease_lost.is_set():
+                status = 'cancelled'
+                raise
+            status, error = 'lease_lost', 'Lease taken over by another instance'
+        except Exception as e:
+            status, error = 'error', str(e)
+            logger.error(f"Job {self.name} failed: {e}", exc_info=True)
+        finally:
+            self._record(time.monotonic() - started, status, error)
+            if renewer is not None:
+                renewer.cancel()
+                try:
+                    await self.lease.release()
+                except Exception as e:
+                    logger.warning(f"Failed to release lease for job {self.name}: {e}")
+
+    async def _renew_lease(self, run_task: asyncio.Task, lease_lost: asyncio.Event):
+        while True:
+            await asyncio.sleep(self.lease.duration / 3)
+            try:
+                renewed = await self.lease.renew()
+            except Exception as e:
+                logger.warning(f"Failed to renew lease for job {self.name}: {e}")
+                continue
+            if not renewed:
+                # Another instance took over, stop so the job doesn't run twice
+                self.lease_lost += 1
+                lease_lost.set()
+                logger.error(f"Lost lease for job {self.name}, cancelling run")
+                run_task.cancel()
+                return
+
+    def _record(self, duration: float, status: str, error: Optional[str]):
+        self.runs += 1
+        if status != 'ok':
+            self.failures += 1
+        self.last_status = status
+        self.last_error = error
+        self.last_duration = round(duration, 3)
+        self.histogram[bisect.bisect_left(DURATION_BUCKETS, duration)] += 1
+
+    def stats(self) -> dict:
+        buckets = {f"le_{bound}": count for bound, count in zip(DURATION_BUCKETS, self.histogram)}
+        buckets["inf"] = self.histogram[-1]
+        return {
+            "interval": self.interval,
+            "scheduled": self.running,
+            "in_progress": self.in_progress,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "lease_lost": self.lease_lost,
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+            "last_started": self.last_started,
+            "last_duration": self.last_duration,
+            "duration_histogram": buckets,
+        }
+
+
+class Scheduler:
+    """Registry of background jobs, exposes their metrics to the web UI."""
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+
+    def add_job(self, name: str, func: Callable[[], Awaitable], interval: float, jitter: float = 0.1,
+                lease: Optional[Lease] = None) -> Job:
+        """
+        Register a job, it is not scheduled until job.start() is called.
+        :return: Job
+        """
+        if name in self.jobs:
+            self.jobs[name].stop()
+        job = Job(name, func, interval, jitter=jitter, lease=lease)
+        self.jobs[name] = job
+        return job
+
+    def remove_job(self, name: str):
+        """Stop a job and drop it from the registry."""
+        job = self.jobs.pop(name, None)
+        if job:
+            job.stop()
+
+    def stop_all(self):
+        for job in self.jobs.values():
+            job.stop()
+
+    def stats(self) -> dict:
+        return {name: job.stats() for name, job in self.jobs.items()}
+
+
+# Global scheduler instance
+scheduler = Scheduler()
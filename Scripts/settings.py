@@ -39,6 +39,9 @@ AUDIO_ENABLED = str2bool(os.getenv('AUDIO_ENABLED', "True"))
 # FFmpeg Debug Logging
 FFMPEG_DEBUG = str2bool(os.getenv('FFMPEG_DEBUG', "False"))
 
+# Audio pipeline, 'opus' lets FFmpeg apply volume and encode Opus, 'pcm' decodes and scales frames in Python
+AUDIO_PIPELINE = os.getenv('AUDIO_PIPELINE', 'opus').lower()
+
 # Multi-user functionality, will remove token from admin and all admin functions
 MULTI_USER = str2bool(os.environ.get('MULTI_USER', "True"))
 
@@ -3,14 +3,17 @@ import time
 import logging
 import sys
 import asyncio
+import hashlib
 import uuid
 from typing import Optional, List, Tuple
 from abc import ABC, abstractmethod
 
 import bookshelfAPI as c
 import settings as s
+from scheduler import scheduler, Lease
+from outbound import outbound
 from multi_user import search_user_db
-from wishlist import search_wishlist_db, mark_book_as_downloaded
+from wishlist import match_wishlist, mark_book_as_downloaded
 
 from interactions import *
 from interactions.api.events import Startup
@@ -26,6 +29,16 @@ logger = logging.getLogger("bot")
 
 # Task configuration
 TASK_FREQUENCY = 5  # Task execution interval in minutes
+# Fraction of the interval each run is randomly moved by, keeps jobs from aligning
+TASK_JITTER = float(os.getenv('TASK_JITTER', '0.1'))
+# Seconds a task lock is held before it has to be renewed by the running instance
+TASK_LEASE_DURATION = int(os.getenv('TASK_LEASE_DURATION', '120'))
+# Channels processed at the same time by a subscription task
+SUBSCRIPTION_CONCURRENCY = int(os.getenv('SUBSCRIPTION_CONCURRENCY', '4'))
+# Items per page when checking libraries for new books, a quiet library costs a single page
+NEW_BOOK_PAGE_SIZE = int(os.getenv('NEW_BOOK_PAGE_SIZE', '25'))
+# ABS users fetched at the same time by the finished book check
+FINISHED_BOOK_USER_CONCURRENCY = int(os.getenv('FINISHED_BOOK_USER_CONCURRENCY', '8'))
 
 # Generate unique instance ID for distributed locking
 INSTANCE_ID = str(uuid.uuid4())
@@ -110,26 +123,83 @@ class SQLiteTaskDatabase:
         ''')
         await self.conn.commit()
 
+    async def create_library_watermarks_table(self):
+        """Create table storing the newest addedAt seen per library, used by the new book check"""
+        await self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS library_watermarks (
+                scope TEXT NOT NULL,
+                library_id TEXT NOT NULL,
+                added_at INTEGER NOT NULL,
+                updated_at INTEGER NOT NULL,
+                PRIMARY KEY(scope, library_id)
+            )
+        ''')
+        await self.conn.commit()
+
+    async def get_library_watermark(self, scope: str, library_id: str) -> Optional[int]:
+        async with self.conn.execute(
+                'SELECT added_at FROM library_watermarks WHERE scope = ? AND library_id = ?',
+                (scope, library_id)) as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def set_library_watermark(self, scope: str, library_id: str, added_at: int):
+        now = int(datetime.now().timestamp())
+        await self.conn.execute('''
+            INSERT INTO library_watermarks (scope, library_id, added_at, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(scope, library_id) DO UPDATE SET
+                added_at = MAX(added_at, excluded.added_at), updated_at = excluded.updated_at
+        ''', (scope, library_id, int(added_at), now))
+        await self.conn.commit()
+
+    async def create_progress_watermarks_table(self):
+        """Create table storing the newest finishedAt seen per ABS user, used by the finished book check"""
+        await self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS progress_watermarks (
+                scope TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                finished_at INTEGER NOT NULL,
+                updated_at INTEGER NOT NULL,
+                PRIMARY KEY(scope, user_id)
+            )
+        ''')
+        await self.conn.commit()
+
+    async def get_progress_watermarks(self, scope: str) -> dict:
+        async with self.conn.execute('SELECT user_id, finished_at FROM progress_watermarks WHERE scope = ?',
+                                     (scope,)) as cursor:
+            rows = await cursor.fetchall()
+        return {user_id: finished_at for user_id, finished_at in rows}
+
+    async def set_progress_watermark(self, scope: str, user_id: str, finished_at: int):
+        now = int(datetime.now().timestamp())
+        await self.conn.execute('''
+            INSERT INTO progress_watermarks (scope, user_id, finished_at, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(scope, user_id) DO UPDATE SET
+                finished_at = MAX(finished_at, excluded.finished_at), updated_at = excluded.updated_at
+        ''', (scope, user_id, int(finished_at), now))
+        await self.conn.commit()
+
     async def has_message_been_sent(self, channel_id: int, book_id: str, message_type: str) -> bool:
         """Check if a message has already been sent for this book in this channel"""
         # Clean up old tracking records (older than 7 days)
         seven_days_ago = int((datetime.now() - timedelta(days=7)).timestamp())
-        await self.cursor.execute('DELETE FROM message_tracking WHERE sent_at < ?', (seven_days_ago,))
+        await self.conn.execute('DELETE FROM message_tracking WHERE sent_at < ?', (seven_days_ago,))
         await self.conn.commit()
 
-        # Check if message exists
-        await self.cursor.execute('''
+        # Check if message exists, own cursor since channels are checked concurrently
+        async with self.conn.execute('''
             SELECT 1 FROM message_tracking 
             WHERE channel_id = ? AND book_id = ? AND message_type = ?
-        ''', (channel_id, book_id, message_type))
-        result = await self.cursor.fetchone()
+        ''', (channel_id, book_id, message_type)) as cursor:
+            result = await cursor.fetchone()
         return result is not None
 
     async def mark_message_as_sent(self, channel_id: int, book_id: str, message_type: str):
         """Mark a message as sent to prevent duplicates"""
         now = int(datetime.now().timestamp())
         try:
-            await self.cursor.execute('''
+            await self.conn.execute('''
                 INSERT INTO message_tracking (channel_id, book_id, message_type, sent_at)
                 VALUES (?, ?, ?, ?)
             ''', (channel_id, book_id, message_type, now))
@@ -163,6 +233,16 @@ class SQLiteTaskDatabase:
             logger.debug(f"Could not acquire lock for {task_name}: {e}")
             return False
 
+    async def renew_lock(self, task_name: str, lock_duration_seconds: int = 30) -> bool:
+        """Extend a lock held by this instance, False when it expired and was taken over"""
+        expires_at = int(datetime.now().timestamp()) + lock_duration_seconds
+        async with self.conn.execute(
+                'UPDATE task_locks SET expires_at = ? WHERE task_name = ? AND instance_id = ?',
+                (expires_at, task_name, INSTANCE_ID)) as cursor:
+            renewed = cursor.rowcount > 0
+        await self.conn.commit()
+        return renewed
+
     async def release_lock(self, task_name: str):
         """Release a lock held by this instance"""
         await self.cursor.execute(
@@ -310,6 +390,8 @@ async def initialize_task_database():
     await task_db.create_version_table()
     await task_db.create_task_locks_table()
     await task_db.create_message_tracking_table()
+    await task_db.create_library_watermarks_table()
+    await task_db.create_progress_watermarks_table()
     logger.info("Initialized tasks database using SQLite")
     logger.info(f"Instance ID: {INSTANCE_ID}")
 
@@ -347,6 +429,29 @@ async def acquire_task_lock(task_name: str, lock_duration_seconds: int = 30) ->
     return await task_db.acquire_lock(task_name, lock_duration_seconds)
 
 
+async def renew_task_lock(task_name: str, lock_duration_seconds: int = 30) -> bool:
+    """Extend a distributed lock held by this instance"""
+    return await task_db.renew_lock(task_name, lock_duration_seconds)
+
+
+class TaskLockLease(Lease):
+    """Scheduler lease backed by the task_locks table"""
+
+    def __init__(self, task_name: str, duration: int = None):
+        self.task_name = task_name
+        self.duration = duration or TASK_LEASE_DURATION
+
+    async def acquire(self) -> bool:
+        return await acquire_task_lock(self.task_name, self.duration)
+
+    async def renew(self) -> bool:
+        return await renew_task_lock(self.task_name, self.duration)
+
+    async def release(self):
+        await release_task_lock(self.task_name)
+        logger.debug(f"Released lock for {self.task_name}")
+
+
 async def release_task_lock(task_name: str):
     """Release a distributed lock for a task"""
     await task_db.release_lock(task_name)
@@ -367,6 +472,26 @@ async def mark_message_as_sent(channel_id: int, book_id: str, message_type: str)
     await task_db.mark_message_as_sent(channel_id, book_id, message_type)
 
 
+async def get_library_watermark(scope: str, library_id: str) -> Optional[int]:
+    """Get the newest addedAt (ms) already checked for a library"""
+    return await task_db.get_library_watermark(scope, library_id)
+
+
+async def set_library_watermark(scope: str, library_id: str, added_at: int):
+    """Advance the addedAt watermark of a library, never moves backwards"""
+    await task_db.set_library_watermark(scope, library_id, added_at)
+
+
+async def get_progress_watermarks(scope: str) -> dict:
+    """Get the newest finishedAt (ms) already reported, per ABS user id"""
+    return await task_db.get_progress_watermarks(scope)
+
+
+async def set_progress_watermark(scope: str, user_id: str, finished_at: int):
+    """Advance the finishedAt watermark of an ABS user, never moves backwards"""
+    await task_db.set_progress_watermark(scope, user_id, finished_at)
+
+
 async def conn_test():
     """
     Test Audiobookshelf connection and verify user permissions.
@@ -392,58 +517,103 @@ async def conn_test():
     return ADMIN_USER
 
 
-async def newBookList(task_frequency=TASK_FREQUENCY) -> list:
+def _watermark_scope() -> str:
+    """Watermarks are kept per ABS server and token, every user only sees their own libraries."""
+    url, token = c.current_client().key
+    return hashlib.sha256(f"{url}|{token}".encode()).hexdigest()[:32]
+
+
+def _format_new_book(item: dict) -> dict:
+    title = item.get('title') or ''
+    if "(Abridged)" in title:
+        title = title.replace("(Abridged)", '').strip()
+    if "(Unabridged)" in title:
+        title = title.replace("(Unabridged)", '').strip()
+
+    formatted_time = datetime.fromtimestamp(int(item.get('addedTime')) / 1000).strftime('%Y/%m/%d %H:%M')
+
+    return {"title": title, "addedTime": formatted_time, "author": item.get('author'), "id": item.get('id'),
+            "provider_id": item.get('asin') or ''}
+
+
+async def _library_new_books(library_id: str, cutoff: int) -> Tuple[list, Optional[int]]:
     """
-    Retrieve books added within the specified time period.
+    Page through a library newest first and stop at the first item added at or before cutoff.
+    :return: (new book items, newest addedAt seen or None)
+    """
+    items = []
+    newest = None
+    async for item in c.bookshelf_iter_library_items(library_id, params="sort=addedAt&desc=1",
+                                                     page_size=NEW_BOOK_PAGE_SIZE):
+        added_at = int(item.get('addedTime') or 0)
+        if added_at <= cutoff:
+            break
+
+        newest = added_at if newest is None else max(newest, added_at)
+        if item.get('mediaType') == 'book':
+            items.append(_format_new_book(item))
+
+    return items, newest
+
+
+async def newBookList(task_frequency=TASK_FREQUENCY, use_watermark=False) -> list:
+    """
+    Retrieve books added within the specified time period, all libraries are checked concurrently.
 
     Args:
         task_frequency: Lookback period in minutes (default: TASK_FREQUENCY)
+        use_watermark: Return books added since the last call instead (persisted per library),
+                       the lookback period is only used for libraries without a watermark yet
 
     Returns:
         list: Books added within the time period with metadata
     """
     logger.debug("Initializing NewBookList function")
-    items_added = []
-    current_time = datetime.now()
 
-    libraries = await c.bookshelf_libraries()
-    library_count = len(libraries)
-    logger.debug(f'Found {library_count} libraries')
+    libraries = await c.bookshelf_libraries() or {}
+    logger.debug(f'Found {len(libraries)} libraries')
 
-    time_minus_delta = current_time - timedelta(minutes=task_frequency)
+    time_minus_delta = datetime.now() - timedelta(minutes=task_frequency)
     timestamp_minus_delta = int(time.mktime(time_minus_delta.timetuple()) * 1000)
+    scope = _watermark_scope() if use_watermark else None
 
-    for name, (library_id, audiobooks_only) in libraries.items():
-        library_items = await c.bookshelf_all_library_items(library_id, params="sort=addedAt&desc=1")
+    async def check_library(name: str, library_id: str) -> list:
+        cutoff = timestamp_minus_delta
+        if use_watermark:
+            watermark = await get_library_watermark(scope, library_id)
+            if watermark is not None:
+                cutoff = watermark
 
-        for item in library_items:
-            latest_item_time_added = int(item.get('addedTime'))
-            latest_item_title = item.get('title')
-            latest_item_type = item.get('mediaType')
-            latest_item_author = item.get('author')
-            latest_item_bookID = item.get('id')
-            try:
-                latest_item_provider_id = item.get('asin')
-            except Exception as e:
-                latest_item_provider_id = ''
-                logger.debug("Couldn't fetch asin from item. Likely was not set with metadata.")
-                logger.debug(f"Error: {e}")
-
-            if "(Abridged)" in latest_item_title:
-                latest_item_title = latest_item_title.replace("(Abridged)", '').strip()
-            if "(Unabridged)" in latest_item_title:
-                latest_item_title = latest_item_title.replace("(Unabridged)", '').strip()
-
-            formatted_time = latest_item_time_added / 1000
-            formatted_time = datetime.fromtimestamp(formatted_time)
-            formatted_time = formatted_time.strftime('%Y/%m/%d %H:%M')
+        try:
+            items, newest = await _library_new_books(library_id, cutoff)
+        except Exception as e:
+            # Watermark is left untouched, the next run picks these items up
+            logger.error(f"Failed to check library {name} for new books: {e}")
+            return []
+
+        if use_watermark:
+            await set_library_watermark(scope, library_id, newest if newest is not None else cutoff)
+
+        return items
+
+    results = await asyncio.gather(*(check_library(name, library_id)
+                                     for name, (library_id, audiobooks_only) in libraries.items()))
 
-            if latest_item_time_added >= timestamp_minus_delta and latest_item_type == 'book':
-                items_added.append({"title": latest_item_title, "addedTime": formatted_time,
-                                    "author": latest_item_author, "id": latest_item_bookID,
-                                    "provider_id": latest_item_provider_id})
+    return [item for items in results for item in items]
 
-        return items_added
+
+async def abs_user_key(token: str) -> str:
+    """
+    Resolve a token to its ABS user, so different tokens of the same user share task results.
+    :return: ABS user id, or the token itself when it can't be resolved
+    """
+    try:
+        r = await c.bookshelf_conn('/me', GET=True, client=c.ABSClient(token))
+        if r.status_code == 200:
+            return r.json().get('id') or token
+    except Exception as e:
+        logger.debug(f"Could not resolve ABS user for token: {e}")
+    return token
 
 
 class SubscriptionTask(Extension):
@@ -453,10 +623,16 @@ class SubscriptionTask(Extension):
         self.TaskChannelID = None
         self.ServerNickName = ''
         self.embedColor = None
-        self.admin_token = None
-        self.previous_token = None
         self.bot.admin_token = None
 
+        # Background jobs, leases keep several bot instances from running the same check
+        self.newBookTask = scheduler.add_job(
+            'new-book-check', self.run_new_book_check, interval=TASK_FREQUENCY * 60,
+            jitter=TASK_JITTER, lease=TaskLockLease('new-book-check-execution'))
+        self.finishedBookTask = scheduler.add_job(
+            'finished-book-check', self.run_finished_book_check, interval=TASK_FREQUENCY * 60,
+            jitter=TASK_JITTER, lease=TaskLockLease('finished-book-check-execution'))
+
     async def get_server_name_db(self, discord_id: int, task: str = "new-book-check") -> str:
         server_name = os.getenv("DEFAULT_SERVER_NAME", "Audiobookshelf")
 
@@ -483,17 +659,22 @@ class SubscriptionTask(Extension):
         self.ServerNickName = server_name
         return server_name
 
-    async def send_user_wishlist(self, discord_id: int, title: str, author: str, embed: list):
+    async def send_user_wishlist(self, discord_id: int, books: list) -> bool:
         """
-        Send wishlist notification to user when their requested book becomes available.
+        Send one wishlist notification to a user for all of their requested books that became available,
+        the embeds are packed into as few DMs as possible.
 
         Args:
             discord_id: Discord user ID to notify
-            title: Book title
-            author: Book author
-            embed: Discord embed message
+            books: (title, author, embed) for every available book
+
+        Returns:
+            bool: True once the notification was delivered
         """
-        user = await self.bot.fetch_user(discord_id)
+        user = await outbound.get_user(discord_id)
+        if not user:
+            logger.warning(f"Could not fetch wishlist user {discord_id}")
+            return False
         result = await search_task_db(discord_id=discord_id, task='new-book-check')
         name = ''
 
@@ -505,39 +686,46 @@ class SubscriptionTask(Extension):
                 name = "Audiobookshelf"
 
         # Compose wishlist notification message
-        msg = f"Hello **{user.display_name}**, one of your wishlisted books has become available! **{title}** by author **{author}** is now available on your Audiobookshelf server: **{name}**!"
-        if len(embed) > 10:
-            for emb in embed:
-                await user.send(content=msg, embed=emb)
+        if len(books) == 1:
+            title, author, _ = books[0]
+            msg = f"Hello **{user.display_name}**, one of your wishlisted books has become available! **{title}** by author **{author}** is now available on your Audiobookshelf server: **{name}**!"
         else:
-            await user.send(content=msg, embeds=embed)
+            msg = f"Hello **{user.display_name}**, {len(books)} of your wishlisted books have become available on your Audiobookshelf server: **{name}**!"
+        await outbound.send(f"dm:{discord_id}", user, embeds=[embed for _, _, embed in books], content=msg)
+        return True
 
-    async def NewBookCheckEmbed(self, task_frequency=TASK_FREQUENCY, enable_notifications=False):
+    async def NewBookCheckEmbed(self, task_frequency=TASK_FREQUENCY, enable_notifications=False, items_added=None):
         """
         Create embed messages for newly added books.
 
         Args:
             task_frequency: Lookback period in minutes
             enable_notifications: Whether to send wishlist notifications
+            items_added: Books from newBookList, fetched when not provided
 
         Returns:
             list: Discord embed messages for new books
         """
-        bookshelfURL = os.getenv("bookshelfURL", "http://127.0.0.1")
+        bookshelfURL = c.current_client().url or "http://127.0.0.1"
         img_url = os.getenv('OPT_IMAGE_URL')
 
         if not self.ServerNickName:
             self.ServerNickName = "Audiobookshelf"
 
-        items_added = await newBookList(task_frequency) or []
+        if items_added is None:
+            items_added = await newBookList(task_frequency) or []
 
         if items_added:
             count = 0
             total_item_count = len(items_added)
             embeds = []
             wishlist_titles = []
+            # discord id -> [(title, author, wishlisted title, embed)]
+            notifications = {}
             logger.info(f'{total_item_count} New books found, executing Task!')
 
+            wishlist_matches = await match_wishlist(items_added)
+
             for item in items_added:
                 count += 1
                 title = item.get('title', 'Unknown Title')
@@ -550,7 +738,7 @@ class SubscriptionTask(Extension):
                 wishlisted = False
                 cover_link = await c.bookshelf_cover_image(bookID) or "https://your-default-cover-url.com"
 
-                wl_search = await search_wishlist_db(title=title)
+                wl_search = wishlist_matches.get(bookID)
                 if wl_search:
                     wishlisted = True
                     wishlist_titles.append(title)
@@ -581,68 +769,99 @@ class SubscriptionTask(Extension):
                     for user in wl_search:
                         discord_id = user[0]
                         search_title = user[2]
-                        if enable_notifications:
-                            # Send notification and update database
-                            await self.send_user_wishlist(discord_id=discord_id, title=title, author=author,
-                                                          embed=embeds)
-                            await mark_book_as_downloaded(discord_id=discord_id, title=search_title)
+                        notifications.setdefault(discord_id, []).append((title, author, search_title, embed_message))
+
+            if enable_notifications and notifications:
+                await asyncio.gather(*(self.notify_wishlist_user(discord_id, books)
+                                       for discord_id, books in notifications.items()))
 
             return embeds
 
+    async def notify_wishlist_user(self, discord_id: int, books: list):
+        """
+        Send one notification for all of a user's matched books, then mark them as downloaded.
+        Nothing is marked when the DM fails, the entries stay pending on the wishlist.
+        """
+        try:
+            sent = await self.send_user_wishlist(discord_id=discord_id,
+                                                 books=[(title, author, embed) for title, author, _, embed in books])
+        except Exception as e:
+            logger.error(f"Failed to send wishlist notification to {discord_id}: {e}")
+            return
+
+        if sent:
+            for _, _, search_title, _ in books:
+                await mark_book_as_downloaded(discord_id=discord_id, title=search_title)
+
     @staticmethod
     async def getFinishedBooks():
         """
-        Retrieve books that users have finished within the task frequency period.
+        Retrieve books that users have finished since the last check.
+        Every user's newest reported finishedAt is persisted, users are fetched concurrently
+        and the first check of a user looks back TASK_FREQUENCY minutes.
 
         Returns:
             list: Finished books with user and completion information
         """
-        current_time = datetime.now()
         book_list = []
         try:
-            books = await c.bookshelf_get_valid_books()
             users = await c.get_users()
+            if not users:
+                return book_list
 
-            time_minus_delta = current_time - timedelta(minutes=TASK_FREQUENCY)
+            time_minus_delta = datetime.now() - timedelta(minutes=TASK_FREQUENCY)
             timestamp_minus_delta = int(time.mktime(time_minus_delta.timetuple()) * 1000)
 
-            count = 0
-            if users and books:
-
-                for user in users['users']:
-                    user_id = user.get('id')
-                    username = user.get('username')
-
-                    endpoint = f'/users/{user_id}'
-                    r = await c.bookshelf_conn(endpoint=endpoint, GET=True)
-                    if r.status_code == 200:
-                        user_data = r.json()
-
-                        for media in user_data['mediaProgress']:
+            scope = _watermark_scope()
+            watermarks = await get_progress_watermarks(scope)
+            semaphore = asyncio.Semaphore(max(1, FINISHED_BOOK_USER_CONCURRENCY))
+
+            async def check_user(user: dict) -> list:
+                user_id = user.get('id')
+                username = user.get('username')
+                cutoff = watermarks.get(user_id, timestamp_minus_delta)
+
+                media_progress = user.get('mediaProgress')
+                if media_progress is None:
+                    async with semaphore:
+                        r = await c.bookshelf_conn(endpoint=f'/users/{user_id}', GET=True)
+                    if r.status_code != 200:
+                        logger.warning(f"Could not fetch progress for user {username}: {r.status_code}")
+                        return []
+                    media_progress = r.json().get('mediaProgress') or []
+
+                finished = []
+                newest = cutoff
+                for media in media_progress:
+                    # Only process finished books (not podcasts)
+                    if media.get('mediaItemType') != 'book' or not media.get('isFinished'):
+                        continue
 
-                            media_type = media['mediaItemType']
-                            libraryItemId = media['libraryItemId']
-                            displayTitle = media.get('displayTitle')
-                            finished = bool(media.get('isFinished'))
+                    finishedAtTime = int(media.get('finishedAt') or 0)
+                    if finishedAtTime <= cutoff:
+                        continue
 
-                            # Only process finished books (not podcasts)
-                            if media_type == 'book' and finished:
+                    newest = max(newest, finishedAtTime)
+                    media['username'] = username
+                    finished.append(media)
 
-                                finishedAtTime = int(media.get('finishedAt'))
+                    formatted_time = datetime.fromtimestamp(finishedAtTime / 1000).strftime('%Y/%m/%d %H:%M')
+                    logger.info(f"User {username}, finished Book: {media.get('displayTitle')} with  ID: "
+                                f"{media.get('libraryItemId')} at {formatted_time}")
 
-                                # Format timestamp for display
-                                formatted_time = finishedAtTime / 1000
-                                formatted_time = datetime.fromtimestamp(formatted_time)
-                                formatted_time = formatted_time.strftime('%Y/%m/%d %H:%M')
+                if newest != watermarks.get(user_id):
+                    await set_progress_watermark(scope, user_id, newest)
+                return finished
 
-                                if finishedAtTime >= timestamp_minus_delta:
-                                    count += 1
-                                    media['username'] = username
-                                    book_list.append(media)
-                                    logger.info(
-                                        f'User {username}, finished Book: {displayTitle} with  ID: {libraryItemId} at {formatted_time}')
+            results = await asyncio.gather(*(check_user(user) for user in users.get('users', [])),
+                                           return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"Error occurred while checking a user's finished books: {result}")
+                else:
+                    book_list.extend(result)
 
-                logger.info(f"Total Found Books: {count}")
+            logger.info(f"Total Found Books: {len(book_list)}")
 
         except Exception as e:
             logger.error(f"Error occurred while attempting to get finished book: {e}")
@@ -661,7 +880,7 @@ class SubscriptionTask(Extension):
         """
         count = 0
         embeds = []
-        serverURL = os.getenv("bookshelfURL", "http://127.0.0.1")
+        serverURL = c.current_client().url or "http://127.0.0.1"
         img_url = os.getenv('OPT_IMAGE_URL')
         for book in book_list:
             count += 1
@@ -727,218 +946,220 @@ class SubscriptionTask(Extension):
 
         return selected_color
 
-    @Task.create(trigger=IntervalTrigger(minutes=TASK_FREQUENCY))
-    async def newBookTask(self):
-        task_name = "new-book-check-execution"
+    async def _run_channels(self, search_result, collect, send, prepare=None):
+        """
+        Run a subscription task in stages: one discovery per ABS user, an optional shared preparation
+        step, then delivery to every channel concurrently (bounded by SUBSCRIPTION_CONCURRENCY).
+        :param search_result: rows from search_task_db(task=...), (task, channel_id, id, token)
+        :param collect: coroutine function returning the discovered data, run under each user's token
+        :param send: coroutine function(channel_id, data) delivering the data to one channel
+        :param prepare: optional coroutine function({user_key: data}) -> {user_key: data}, run once
+        """
+        semaphore = asyncio.Semaphore(max(1, SUBSCRIPTION_CONCURRENCY))
+        channels = [(int(result[1]), result[3]) for result in search_result]
+        tokens = list(dict.fromkeys(token for _, token in channels))
+
+        # Discovery, channels whose tokens resolve to the same user share one scan
+        user_keys = dict(zip(tokens, await asyncio.gather(*(abs_user_key(token) for token in tokens))))
+        user_tokens = {}
+        for token in tokens:
+            user_tokens.setdefault(user_keys[token], token)
+
+        async def discover(token):
+            async with semaphore:
+                async with c.ABSClient(token):
+                    return await collect()
+
+        discovered = await asyncio.gather(*(discover(token) for token in user_tokens.values()),
+                                          return_exceptions=True)
+        results = {}
+        for user_key, result in zip(user_tokens, discovered):
+            if isinstance(result, Exception):
+                logger.error(f"Subscription task discovery failed: {result}", exc_info=result)
+            else:
+                results[user_key] = result
 
-        # Acquire lock
-        lock_acquired = await acquire_task_lock(task_name, lock_duration_seconds=30)
-        if not lock_acquired:
-            logger.debug(f"Another instance is already running {task_name}, skipping...")
-            return
+        if prepare and results:
+            results = await prepare(results)
 
-        try:
-            logger.info("Initializing new-book-check task!")
+        # Fan out
+        async def deliver(channel_id, token):
+            async with semaphore:
+                async with c.ABSClient(token):
+                    await send(channel_id, results[user_keys[token]])
 
-            search_result = await search_task_db(task="new-book-check")
-            if not search_result:
-                logger.warning("Task 'new-book-check' is active but setup returned no results. Stopping task.")
-                self.newBookTask.stop()
-                return
+        targets = [(channel_id, token) for channel_id, token in channels if user_keys[token] in results]
+        delivered = await asyncio.gather(*(deliver(channel_id, token) for channel_id, token in targets),
+                                         return_exceptions=True)
 
-            # Load server nickname
-            if not self.ServerNickName:
-                await self.get_server_name_db()
+        for (channel_id, _), result in zip(targets, delivered):
+            if isinstance(result, Exception):
+                logger.error(f"Subscription task failed for channel {channel_id}: {result}", exc_info=result)
 
-            logger.debug(f"Search result: {search_result}")
+    @staticmethod
+    async def _collect_new_books():
+        """:return: books added since the last run, for the active token"""
+        return await newBookList(use_watermark=True)
 
-            previous_token = os.getenv("bookshelfToken")
+    async def _prepare_new_books(self, results: dict) -> dict:
+        """
+        Build embeds and send wishlist notifications once for all books found this run,
+        books visible to several users are only processed once.
+        :param results: {user_key: new_titles}
+        :return: {user_key: (new_titles, embeds)}
+        """
+        unique_books = {}
+        for new_titles in results.values():
+            for item in new_titles:
+                unique_books.setdefault(item.get("id"), item)
+
+        if not unique_books:
+            return {user_key: ([], []) for user_key in results}
+
+        if len(unique_books) > 10:
+            logger.warning("Found more than 10 titles")
+
+        books = list(unique_books.values())
+        embeds = await self.NewBookCheckEmbed(enable_notifications=True, items_added=books) or []
+        embed_by_id = {item.get("id"): embed for item, embed in zip(books, embeds)}
+
+        prepared = {}
+        for user_key, new_titles in results.items():
+            titles = [item for item in new_titles if item.get("id") in embed_by_id]
+            prepared[user_key] = (titles, [embed_by_id[item.get("id")] for item in titles])
+        return prepared
+
+    async def _send_new_books(self, channel_id: int, data: tuple):
+        new_titles, embeds = data
+        if not new_titles:
+            logger.info(f"No new books found for channel {channel_id}")
+            return
 
-            for result in search_result:
-                channel_id = int(result[1])
-                self.admin_token = result[3]
+        if not embeds:
+            logger.warning("New books exist but no embeds were generated.")
+            return
 
-                logger.debug(f"Applying active admin token ({len(self.admin_token)} chars)")
-                os.environ["bookshelfToken"] = self.admin_token
+        # Assert correct alignment
+        if len(new_titles) != len(embeds):
+            logger.error("Mismatch between new_titles and embeds. Duplicate prevention disabled for this run.")
+            return
 
-                # --- Fetch list of new books
-                new_titles = await newBookList()
-                if not new_titles:
-                    logger.info(f"No new books found for channel {channel_id}")
-                    continue
+        logger.debug(f"Attempting to send messages to channel: {channel_id}")
 
-                if len(new_titles) > 10:
-                    logger.warning("Found more than 10 titles")
+        books_to_send = []
+        embeds_to_send = []
 
-                # --- Generate embeds (must match titles)
-                embeds = await self.NewBookCheckEmbed(enable_notifications=True)
-                if not embeds:
-                    logger.warning("New books exist but no embeds were generated.")
-                    continue
+        for idx, item in enumerate(new_titles):
+            book_id = item.get("id")
 
-                # Assert correct alignment
-                if len(new_titles) != len(embeds):
-                    logger.error("Mismatch between new_titles and embeds. Duplicate prevention disabled for this run.")
-                    continue
+            already_sent = await has_message_been_sent(channel_id, book_id, "new-book")
 
-                # --- Fetch the channel
-                channel_query = await self.bot.fetch_channel(channel_id=channel_id, force=True)
-                if not channel_query:
-                    logger.warning(f"Could not fetch channel {channel_id}")
-                    continue
+            if not already_sent:
+                books_to_send.append(book_id)
+                embeds_to_send.append(embeds[idx])
+            else:
+                logger.debug(f"Skipping duplicate for book {book_id} in channel {channel_id}")
 
-                logger.debug(f"Found Channel: {channel_id}")
-                logger.debug(f"Attempting to send messages to channel: {channel_id}")
+        if not books_to_send:
+            logger.info(f"All new books already sent for channel {channel_id}")
+            return
 
-                # ==========================
-                #   DEDUP FIX STARTS HERE
-                # ==========================
+        # --- Send notifications, packed 10 embeds per message
+        sent = await outbound.send_to_channel(channel_id, embeds_to_send,
+                                              content="New books have been added to your library!")
+        if sent is None:
+            return
 
-                books_to_send = []
-                embeds_to_send = []
+        logger.info(f"Sent {len(embeds_to_send)} new book notifications to channel {channel_id}")
 
-                for idx, item in enumerate(new_titles):
-                    book_id = item.get("id")
+        # Mark books as sent **after** successful send
+        for book_id in books_to_send:
+            await mark_message_as_sent(channel_id, book_id, "new-book")
 
-                    already_sent = await has_message_been_sent(channel_id, book_id, "new-book")
+    async def _collect_finished_books(self):
+        """:return: (book_list, embeds)"""
+        book_list = await self.getFinishedBooks()
+        if not book_list:
+            return [], []
 
-                    if not already_sent:
-                        books_to_send.append(book_id)
-                        embeds_to_send.append(embeds[idx])
-                    else:
-                        logger.debug(f"Skipping duplicate for book {book_id} in channel {channel_id}")
+        embeds = await self.FinishedBookEmbeds(book_list)
+        return book_list, embeds
 
-                if not books_to_send:
-                    logger.info(f"All new books already sent for channel {channel_id}")
-                    continue
+    async def _send_finished_books(self, channel_id: int, data: tuple):
+        book_list, embeds = data
+        if not book_list:
+            logger.info('No finished books found for this channel.')
+            return
 
-                # --- Send notifications
-                if len(embeds_to_send) < 10:
-                    msg = await channel_query.send(content="New books have been added to your library!")
-                    await msg.edit(embeds=embeds_to_send)
-                else:
-                    await channel_query.send(content="New books have been added to your library!")
-                    for embed in embeds_to_send:
-                        await channel_query.send(embed=embed)
+        if not embeds:
+            logger.warning("No embeds created despite having finished books")
+            return
 
-                logger.info(f"Sent {len(embeds_to_send)} new book notifications to channel {channel_id}")
+        channel_query = await outbound.get_channel(channel_id)
+        if not channel_query:
+            logger.warning(f"Could not fetch channel {channel_id}")
+            return
 
-                # Mark books as sent **after** successful send
-                for book_id in books_to_send:
-                    await mark_message_as_sent(channel_id, book_id, "new-book")
+        logger.debug(f"Found Channel: {channel_id}")
+        logger.debug(f"Bot will now attempt to send a message to channel id: {channel_id}")
 
-            # Restore token
-            os.environ["bookshelfToken"] = previous_token or ""
-            self.previous_token = None
-            self.admin_token = None
-            logger.debug(f"Restored previous bookshelfToken ({len(previous_token)} chars)" if previous_token else "Restored empty bookshelfToken")
+        # Check message tracking to prevent duplicate notifications
+        books_to_send = []
+        for idx, item in enumerate(book_list):
+            book_id = item.get('libraryItemId')
+            already_sent = await has_message_been_sent(channel_id, book_id, 'finished-book')
 
-            logger.info("Successfully completed new-book-check task!")
+            if not already_sent:
+                books_to_send.append(idx)
+                await mark_message_as_sent(channel_id, book_id, 'finished-book')
+            else:
+                logger.debug(
+                    f"Skipping duplicate message for finished book {book_id} in channel {channel_id}")
 
-        except Exception as e:
-            logger.error(f"Error in newBookTask: {e}", exc_info=True)
+        # Send only unsent finished book notifications
+        if books_to_send:
+            embeds_to_send = [embeds[i] for i in books_to_send if i < len(embeds)]
 
-        finally:
-            await release_task_lock(task_name)
-            logger.debug(f"Released lock for {task_name}")
+            await outbound.send(f"channel:{channel_id}", channel_query, embeds=embeds_to_send,
+                                content="These books have been recently finished in your library!")
 
-    @Task.create(trigger=IntervalTrigger(minutes=TASK_FREQUENCY))
-    async def finishedBookTask(self):
-        task_name = 'finished-book-check-execution'
+            logger.info(f"Sent {len(embeds_to_send)} finished book notifications to channel {channel_id}")
+        else:
+            logger.info(f"All finished books already sent to channel {channel_id}, skipping message")
 
-        # Try to acquire lock
-        lock_acquired = await acquire_task_lock(task_name, lock_duration_seconds=30)
+    async def run_new_book_check(self):
+        """Scheduled as the new-book-check job, see self.newBookTask"""
+        logger.info("Initializing new-book-check task!")
 
-        if not lock_acquired:
-            logger.debug(f"Another instance is already running {task_name}, skipping...")
+        search_result = await search_task_db(task="new-book-check")
+        if not search_result:
+            logger.warning("Task 'new-book-check' is active but setup returned no results. Stopping task.")
+            self.newBookTask.stop()
             return
 
-        try:
-            logger.info('Initializing Finished Book Task!')
-            search_result = await search_task_db(task='finished-book-check')
-
-            if search_result:
-                self.previous_token = os.getenv('bookshelfToken')
-
-                for result in search_result:
-                    channel_id = int(result[1])
-                    logger.info(f'Channel ID: {channel_id}')
-                    self.admin_token = result[3]
-                    logger.debug(f"Applying active admin token ({len(self.admin_token)} chars)")
-                    os.environ['bookshelfToken'] = self.admin_token
-
-                    # Fetch finished books
-                    book_list = await self.getFinishedBooks()
-                    if not book_list:
-                        logger.info('No finished books found for this channel.')
-                        continue
-
-                    embeds = await self.FinishedBookEmbeds(book_list)
-                    if not embeds:
-                        logger.warning("No embeds created despite having finished books")
-                        continue
-
-                    channel_query = await self.bot.fetch_channel(channel_id=channel_id, force=True)
-                    if not channel_query:
-                        logger.warning(f"Could not fetch channel {channel_id}")
-                        continue
-
-                    logger.debug(f"Found Channel: {channel_id}")
-                    logger.debug(f"Bot will now attempt to send a message to channel id: {channel_id}")
-
-                    # Check message tracking to prevent duplicate notifications
-                    books_to_send = []
-                    for idx, item in enumerate(book_list):
-                        book_id = item.get('libraryItemId')
-                        already_sent = await has_message_been_sent(channel_id, book_id, 'finished-book')
-
-                        if not already_sent:
-                            books_to_send.append(idx)
-                            await mark_message_as_sent(channel_id, book_id, 'finished-book')
-                        else:
-                            logger.debug(
-                                f"Skipping duplicate message for finished book {book_id} in channel {channel_id}")
-
-                    # Send only unsent finished book notifications
-                    if books_to_send:
-                        embeds_to_send = [embeds[i] for i in books_to_send if i < len(embeds)]
-
-                        if len(embeds_to_send) < 10:
-                            msg = await channel_query.send(
-                                content="These books have been recently finished in your library!")
-                            await msg.edit(embeds=embeds_to_send)
-                        else:
-                            await channel_query.send(
-                                content="These books have been recently finished in your library!")
-                            for embed in embeds_to_send:
-                                await channel_query.send(embed=embed)
+        # Load server nickname
+        if not self.ServerNickName:
+            await self.get_server_name_db()
 
-                        logger.info(f"Sent {len(embeds_to_send)} finished book notifications to channel {channel_id}")
-                    else:
-                        logger.info(f"All finished books already sent to channel {channel_id}, skipping message")
+        logger.debug(f"Search result: {search_result}")
 
-                # Reset Vars - moved outside the loop with None check
-                if self.previous_token is not None:
-                    os.environ['bookshelfToken'] = self.previous_token
-                    logger.debug(f'Restored previous bookshelfToken ({len(self.previous_token)} chars)')
-                else:
-                    logger.warning("Previous token was None, skipping token restoration")
+        await self._run_channels(search_result, self._collect_new_books, self._send_new_books,
+                                 prepare=self._prepare_new_books)
 
-                self.previous_token = None
-                self.admin_token = None
-                logger.info("Successfully completed finished-book-check task!")
+        logger.info("Successfully completed new-book-check task!")
 
-            else:
-                logger.warning("Task 'finished-book-check' was active, but setup check failed.")
-                self.finishedBookTask.stop()
+    async def run_finished_book_check(self):
+        """Scheduled as the finished-book-check job, see self.finishedBookTask"""
+        logger.info('Initializing Finished Book Task!')
+        search_result = await search_task_db(task='finished-book-check')
 
-        except Exception as e:
-            logger.error(f"Error in finishedBookTask: {e}", exc_info=True)
+        if search_result:
+            await self._run_channels(search_result, self._collect_finished_books, self._send_finished_books)
+            logger.info("Successfully completed finished-book-check task!")
 
-        finally:
-            # Always release the lock
-            await release_task_lock(task_name)
-            logger.debug(f"Released lock for {task_name}")
+        else:
+            logger.warning("Task 'finished-book-check' was active, but setup check failed.")
+            self.finishedBookTask.stop()
 
     # Slash Commands ----------------------------------------------------
 
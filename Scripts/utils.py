@@ -1,4 +1,4 @@
-import time
+import asyncio
 import logging
 from functools import wraps
 
@@ -128,27 +128,25 @@ def check_session_control(action="control"):
 async def add_progress_indicators(choices, timeout_seconds=2.5):
     """
     Add ✅ to finished books in autocomplete choices.
+    Uses the cached per-user progress map, so at most one request is made for all choices.
     Returns (updated_choices, timed_out)
     """
     if not choices:
         return choices, False
 
-    start_time = time.time()
+    try:
+        progress_map = await asyncio.wait_for(c.bookshelf_progress_map(), timeout=timeout_seconds)
+    except asyncio.TimeoutError:
+        logger.warning(f"Progress map load timed out after {timeout_seconds}s, skipping finished markers")
+        return choices, True
+    except Exception as e:
+        logger.debug(f"Error loading progress map: {e}")
+        return choices, False
+
     updated_choices = []
-    timed_out = False
-    completed_checks = 0
     finished_count = 0
 
-    for i, choice in enumerate(choices):
-        # Check timeout
-        elapsed = time.time() - start_time
-        if elapsed > timeout_seconds:
-            logger.warning(
-                f"Progress check timeout after {elapsed:.2f}s - processed {completed_checks}/{len(choices)} items")
-            timed_out = True
-            updated_choices.extend(choices[i:])  # Add remaining without checkmarks
-            break
-
+    for choice in choices:
         item_id = choice.get('value')
         original_name = choice.get('name', '')
         episode_id = choice.get('episode_id')
@@ -158,40 +156,28 @@ async def add_progress_indicators(choices, timeout_seconds=2.5):
             updated_choices.append(choice)
             continue
 
-        try:
-            progress_data = await c.bookshelf_item_progress(item_id, episode_id)
-            is_finished = progress_data.get('finished', 'False') == 'True'
-
-            if is_finished:
-                new_name = f"✅ {original_name}"
-
-                # If too long, truncate to fit
-                if len(new_name) > 100:
-                    # "✅ " = 2 chars, so we have 98 chars left for the name
-                    new_name = f"✅ {original_name[:98]}"
+        if c.is_item_finished(progress_map, item_id, episode_id):
+            new_name = f"✅ {original_name}"
 
-                # Preserve episode_id if it exists
-                updated_choice = {"name": new_name, "value": item_id}
-                if episode_id:
-                    updated_choice["episode_id"] = episode_id
-                choice = updated_choice
-                finished_count += 1
+            # If too long, truncate to fit
+            if len(new_name) > 100:
+                # "✅ " = 2 chars, so we have 98 chars left for the name
+                new_name = f"✅ {original_name[:98]}"
 
-            updated_choices.append(choice)
-            completed_checks += 1
+            # Preserve episode_id if it exists
+            updated_choice = {"name": new_name, "value": item_id}
+            if episode_id:
+                updated_choice["episode_id"] = episode_id
+            choice = updated_choice
+            finished_count += 1
 
-        except Exception as e:
-            logger.debug(f"Error checking progress for {item_id}: {e}")
-            updated_choices.append(choice)
-            completed_checks += 1
+        updated_choices.append(choice)
 
-    # Only log if we found finished books or had issues
+    # Only log if we found finished books
     if finished_count > 0:
         logger.info(f"Found {finished_count} finished books in autocomplete")
-    elif timed_out:
-        pass  # Already logged the timeout above
 
-    return updated_choices, timed_out
+    return updated_choices, False
 
 
 def get_extension_instance(bot, name: str):
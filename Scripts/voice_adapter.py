@@ -15,6 +15,8 @@ class VoiceAdapter:
         self.client = discord_client
         self.voice_clients: dict[int, discord.VoiceClient] = {}
         self.connected_events: dict[int, threading.Event] = {}
+        # Called as on_end(guild_id, source, error) from the player thread when a source stops playing
+        self.on_end = None
 
     def _call(self, fn, *args, **kwargs):
         loop = getattr(self.client, "loop", None)
@@ -98,17 +100,20 @@ class VoiceAdapter:
             try:
                 if vc.is_playing() or vc.is_paused():
                     vc.stop()
-                vc.play(
-                    source,
-                    after=lambda err: logger.info(
-                        f"[VOICE] Playback ended (guild {guild_id}) err={err}"
-                    )
-                )
+                vc.play(source, after=lambda err: self._ended(guild_id, source, err))
             except Exception as e:
                 logger.exception(f"[VOICE] Play failed: {e}")
 
         self._call(_do)
 
+    def _ended(self, guild_id: int, source, err):
+        logger.info(f"[VOICE] Playback ended (guild {guild_id}) err={err}")
+        if self.on_end is not None:
+            try:
+                self.on_end(guild_id, source, err)
+            except Exception as e:
+                logger.exception(f"[VOICE] Playback end handler failed: {e}")
+
     def pause(self, guild_id: int):
         def _do():
             vc = self.voice_clients.get(guild_id)
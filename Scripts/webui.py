@@ -22,6 +22,7 @@ from interactions import File, Embed, FlatUIColors
 from interactions.api.http.http_client import HTTPClient
 
 import bookshelfAPI as c
+import runtime_metrics
 import settings as s
 
 # Logger Config
@@ -213,9 +214,14 @@ async def lifespan(app: FastAPI):
     await db_instance.connect()
     await load_settings_to_env()
 
+    # Pooled HTTP client for ABS requests
+    await c.open_http_client()
+
     yield
 
     # Cleanup
+    await c.close_http_client()
+    await runtime_metrics.close_metrics_reader()
     if db_instance:
         await db_instance.close()
     logger.info("Shutting down Web UI...")
@@ -455,6 +461,22 @@ def get_dashboard_html() -> str:
             justify-content: space-between;
         }
 
+        .jobs-table {
+            width: 100%;
+            border-collapse: collapse;
+            font-size: 0.85rem;
+        }
+
+        .jobs-table th, .jobs-table td {
+            text-align: left;
+            padding: 0.4rem 0.5rem;
+            border-bottom: 1px solid var(--border-color);
+        }
+
+        .jobs-table th { color: var(--text-muted); font-weight: 500; }
+        .jobs-table .online { color: var(--success); }
+        .jobs-table .offline { color: var(--error); }
+
         .form-group {
             margin-bottom: 1.25rem;
         }
@@ -979,12 +1001,33 @@ def get_dashboard_html() -> str:
                     <div class="label">Type</div>
                     <div class="value" id="abs-type">--</div>
                 </div>
+                <div class="status-item">
+                    <div class="label">Circuit</div>
+                    <div class="value" id="abs-breaker">--</div>
+                </div>
+                <div class="status-item">
+                    <div class="label">Outbound Queue</div>
+                    <div class="value" id="outbound-depth">--</div>
+                </div>
                 <div class="status-item">
                     <div class="label">Uptime</div>
                     <div class="value" id="uptime">--</div>
                 </div>
             </section>
 
+            <!-- Background Jobs -->
+            <div class="card">
+                <h2 class="card-title">Background Jobs</h2>
+                <table class="jobs-table">
+                    <thead>
+                        <tr><th>Job</th><th>Last Run</th><th>Status</th><th>Duration</th><th>Runs</th><th>Skipped</th></tr>
+                    </thead>
+                    <tbody id="jobs-body">
+                        <tr><td colspan="6">No data yet</td></tr>
+                    </tbody>
+                </table>
+            </div>
+
             <!-- Server Config -->
             <div class="card">
                 <h2 class="card-title">Audiobookshelf Server</h2>
@@ -1283,6 +1326,52 @@ def get_dashboard_html() -> str:
             document.getElementById('recap-end').value = formatDateISO(end);
         }
 
+        async function fetchJobs() {
+            try {
+                const response = await fetch('/api/metrics');
+                const metrics = await response.json();
+                const outbound = (metrics.outbound || {}).data;
+                if (outbound) {
+                    const depthEl = document.getElementById('outbound-depth');
+                    depthEl.textContent = `${outbound.depth} queued`;
+                    depthEl.title = `Sent: ${outbound.sent}, rate limited: ${outbound.rate_limited}`;
+                }
+                const jobs = Object.entries((metrics.scheduler || {}).data || {});
+                const body = document.getElementById('jobs-body');
+                if (!jobs.length) return;
+
+                body.innerHTML = '';
+                for (const [name, job] of jobs) {
+                    const row = document.createElement('tr');
+                    const histogram = Object.entries(job.duration_histogram || {})
+                        .filter(([, count]) => count > 0)
+                        .map(([bucket, count]) => `${bucket.replace('le_', '≤')}s: ${count}`)
+                        .join(', ');
+                    const cells = [
+                        name,
+                        job.last_started || '--',
+                        job.in_progress ? 'running' : (job.last_status || (job.scheduled ? 'scheduled' : 'idle')),
+                        job.last_duration != null ? `${job.last_duration}s` : '--',
+                        job.runs,
+                        job.skipped,
+                    ];
+                    cells.forEach((value, idx) => {
+                        const cell = document.createElement('td');
+                        cell.textContent = value;
+                        if (idx === 2) {
+                            cell.className = job.last_status && job.last_status !== 'ok' ? 'offline' : 'online';
+                            cell.title = job.last_error || '';
+                        }
+                        if (idx === 3) cell.title = histogram;
+                        row.appendChild(cell);
+                    });
+                    body.appendChild(row);
+                }
+            } catch (e) {
+                console.error('Failed to fetch job metrics:', e);
+            }
+        }
+
         async function fetchStatus() {
             try {
                 const response = await fetch('/api/status');
@@ -1292,6 +1381,19 @@ def get_dashboard_html() -> str:
                 document.getElementById('abs-user').textContent = status.abs_user || '--';
                 document.getElementById('abs-type').textContent = status.abs_user_type || '--';
                 document.getElementById('uptime').textContent = status.uptime || '--';
+
+                const breakers = Object.values(status.breakers || {});
+                const breakerEl = document.getElementById('abs-breaker');
+                if (breakers.length) {
+                    const open = breakers.some(b => b.state !== 'closed');
+                    const retries = breakers.reduce((sum, b) => sum + (b.retries || 0), 0);
+                    const shorted = breakers.reduce((sum, b) => sum + (b.short_circuited || 0), 0);
+                    breakerEl.textContent = open ? 'Open' : 'Closed';
+                    breakerEl.className = open ? 'value offline' : 'value online';
+                    breakerEl.title = `Retries: ${retries}, short-circuited: ${shorted}`;
+                } else {
+                    breakerEl.textContent = '--';
+                }
                 
                 const statusEl = document.getElementById('abs-status');
                 if (status.abs_connected) {
@@ -2361,6 +2463,8 @@ def get_dashboard_html() -> str:
             fetchConfig();
             fetchStatus();
             setInterval(fetchStatus, 30000);
+            fetchJobs();
+            setInterval(fetchJobs, 30000);
         });
     </script>
 </body>
@@ -2391,6 +2495,13 @@ async def get_status():
     except Exception as e:
         logger.warning(f"Failed to get ABS status: {e}")
 
+    # Circuit breaker state as last published by the bot process
+    try:
+        breakers = (await runtime_metrics.read_metrics()).get("breakers", {}).get("data", {})
+    except Exception as e:
+        logger.warning(f"Failed to read runtime metrics: {e}")
+        breakers = {}
+
     uptime_delta = datetime.now() - startup_time
     days = uptime_delta.days
     hours, remainder = divmod(uptime_delta.seconds, 3600)
@@ -2403,10 +2514,23 @@ async def get_status():
         "abs_user": abs_user,
         "abs_user_type": abs_user_type,
         "version": settings.versionNumber,
-        "uptime": uptime_str
+        "uptime": uptime_str,
+        "breakers": breakers
     }
 
 
+@app.get("/api/cache-stats")
+async def get_cache_stats():
+    """Get metadata cache hit/miss counters as last published by the bot process"""
+    return (await runtime_metrics.read_metrics()).get("cache", {}).get("data", {})
+
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Get runtime metrics published by the bot process"""
+    return await runtime_metrics.read_metrics()
+
+
 @app.get("/api/config")
 async def get_config():
     """Get current configuration"""
@@ -2559,7 +2683,6 @@ async def cover_proxy(item_id: str):
     """
     Proxy Audiobookshelf cover images to allow client-side canvas rendering without CORS issues.
     """
-    import httpx
     from fastapi.responses import Response
 
     server_url = os.getenv("bookshelfURL", "").rstrip("/")
@@ -2570,8 +2693,8 @@ async def cover_proxy(item_id: str):
     url = f"{server_url}/api/items/{item_id}/cover?token={token}"
     headers = {"Authorization": f"Bearer {token}"} if token else {}
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            r = await client.get(url, headers=headers)
+        async with c.http_client() as client:
+            r = await client.get(url, headers=headers, timeout=10)
             if r.status_code == 200:
                 content_type = r.headers.get("content-type", "image/jpeg")
                 return Response(
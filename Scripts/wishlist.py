@@ -2,22 +2,128 @@ import json
 import json5
 import logging
 import os
-from typing import Optional, List, Tuple
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Optional, List, Tuple, Dict, Iterable
 from abc import ABC, abstractmethod
 
 from interactions.ext.paginators import Paginator
 import bookshelfAPI as c
 from interactions import *
 from settings import DEBUG_MODE, DEFAULT_PROVIDER, bookshelf_traveller_footer
+from catalog_index import normalize_text
+from outbound import outbound
 
 logger = logging.getLogger("bot")
 
+# Minimum title similarity for fuzzy wishlist matches
+WISHLIST_FUZZY_THRESHOLD = float(os.getenv('WISHLIST_FUZZY_THRESHOLD', '0.88'))
+
+# Edition markers that providers and ABS add inconsistently
+_EDITION_MARKERS = re.compile(r"[(\[](un)?abridged( edition)?[)\]]|\b(un)?abridged edition\b", re.IGNORECASE)
+
+
+def normalize_title(title) -> str:
+    """'The Hobbit (Unabridged)' -> 'the hobbit'"""
+    return normalize_text(_EDITION_MARKERS.sub(" ", str(title or "")))
+
+
+def normalize_provider_id(provider_id) -> str:
+    return str(provider_id or "").strip().upper()
+
+
+class WishlistMatcher:
+    """
+    In-memory index of pending wishlist entries, keyed by normalized title and provider id (ASIN).
+    Exact keys are checked first, then a fuzzy title match that also requires the author to agree.
+    """
+
+    def __init__(self, rows: Iterable[Tuple] = ()):
+        """
+        :param rows: (title, author, provider_id, discord_id, book_data) for every pending entry
+        """
+        self.by_title: Dict[str, list] = defaultdict(list)
+        self.by_provider_id: Dict[str, list] = defaultdict(list)
+        self.by_word: Dict[str, set] = defaultdict(set)
+        self.authors: Dict[str, set] = defaultdict(set)
+        self.size = 0
+
+        for title, author, provider_id, discord_id, book_data in rows:
+            entry = (discord_id, book_data, title)
+            key = normalize_title(title)
+            self.by_title[key].append(entry)
+            self.authors[key].add(normalize_text(author))
+            for word in key.split():
+                self.by_word[word].add(key)
+            if normalize_provider_id(provider_id):
+                self.by_provider_id[normalize_provider_id(provider_id)].append(entry)
+            self.size += 1
+
+    def _author_matches(self, key: str, author: str) -> bool:
+        author = normalize_text(author)
+        if not author:
+            return True
+        for wished in self.authors[key]:
+            if not wished or set(wished.split()) & set(author.split()):
+                return True
+        return False
+
+    def match(self, title: str, author: str = "", provider_id: str = "") -> List[Tuple]:
+        """
+        :return: wishlist entries (discord_id, book_data, wishlisted title) matching the book
+        """
+        matches = {}
+        if normalize_provider_id(provider_id):
+            for entry in self.by_provider_id.get(normalize_provider_id(provider_id), []):
+                matches[(entry[0], entry[2])] = entry
+
+        key = normalize_title(title)
+        # Subtitles are often only present on one side, 'Dune: Book One' ~ 'Dune'
+        main_key = normalize_title(re.split(r":| - ", str(title or ""), maxsplit=1)[0])
+        if key in self.by_title:
+            candidates = [key]
+        elif main_key in self.by_title and self._author_matches(main_key, author):
+            candidates = [main_key]
+        else:
+            # Fuzzy fallback, only against titles sharing at least one word
+            candidates = []
+            shared = set()
+            for word in key.split():
+                shared |= self.by_word.get(word, set())
+            for candidate in shared:
+                if SequenceMatcher(None, key, candidate).ratio() >= WISHLIST_FUZZY_THRESHOLD \
+                        and self._author_matches(candidate, author):
+                    candidates.append(candidate)
+
+        for candidate in candidates:
+            for entry in self.by_title[candidate]:
+                matches[(entry[0], entry[2])] = entry
+
+        return list(matches.values())
+
+    def match_books(self, books: Iterable[dict]) -> Dict[str, List[Tuple]]:
+        """
+        Match a batch of new books in one pass.
+        :param books: dicts with id, title, author and provider_id/asin
+        :return: {book id: wishlist entries}, books without matches are left out
+        """
+        results = {}
+        if not self.size:
+            return results
+        for book in books:
+            found = self.match(book.get('title'), book.get('author'), book.get('provider_id') or book.get('asin'))
+            if found:
+                results[book.get('id')] = found
+        return results
+
 # SQLite Database Implementation
 class SQLiteDatabase:
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.conn = None
         self.cursor = None
+        self._matcher: Optional[WishlistMatcher] = None
 
     async def connect(self):
         import aiosqlite
@@ -57,6 +163,7 @@ VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
                                       (str(title), str(author), str(description), str(cover), str(provider),
                                        str(provider_id), int(discord_id), str(data)))
             await self.conn.commit()
+            self._matcher = None
             logger.info(f"Inserted: {title} by author {author}")
             return True
         except Exception as e:
@@ -90,6 +197,18 @@ VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
             (downloaded, title, discord_id)
         )
         await self.conn.commit()
+        self._matcher = None
+
+    async def get_matcher(self) -> WishlistMatcher:
+        """:return: index of pending entries, rebuilt after inserts and updates"""
+        if self._matcher is None:
+            async with self.conn.execute(
+                    'SELECT title, author, provider_id, discord_id, book_data FROM wishlist WHERE downloaded = 0'
+            ) as cursor:
+                rows = await cursor.fetchall()
+            self._matcher = WishlistMatcher(rows)
+            logger.debug(f"Loaded {self._matcher.size} pending wishlist entries into matcher")
+        return self._matcher
 
     async def search_all_wishlists(self) -> List[Tuple]:
         await self.cursor.execute('''
@@ -141,6 +260,15 @@ async def search_all_wishlists() -> List[Tuple]:
     return await db.search_all_wishlists()
 
 
+async def match_wishlist(books: Iterable[dict]) -> Dict[str, List[Tuple]]:
+    """
+    Match newly added books against all pending wishlist entries.
+    :return: {book id: [(discord_id, book_data, wishlisted title), ...]}
+    """
+    matcher = await db.get_matcher()
+    return matcher.match_books(books)
+
+
 async def wishlist_search_embed(title: str, title_desc: str, author: str, cover: str, additional_info: str,
                                 footer='', requested_by=''):
     embed_message = Embed(title=title, description=title_desc)
@@ -239,7 +367,7 @@ class WishList(Extension):
 
                     add_info = f"Downloaded: **{download_status}**\nPublisher: **{publisher}**\nYear Published: **{published}**\nProvided by: **{provider}**\nNarrator: **{narrators}**\n"
 
-                    requestor = await self.bot.fetch_user(discord_id)
+                    requestor = await outbound.get_user(discord_id)
                     requestor_user = requestor.username
                     embed_message = await wishlist_search_embed(title=title, author=author, cover=cover,
                                                                 additional_info=add_info, title_desc=subtitle,
@@ -442,7 +570,7 @@ class WishList(Extension):
 
                     if user != 0 and user not in found_users:
                         found_users.append(user)
-                        user_obj = await self.bot.fetch_user(user)
+                        user_obj = await outbound.get_user(user)
                         choices.append({"name": user_obj.display_name, "value": str(user_obj.id)})
         else:
             logger.info(
@@ -0,0 +1,101 @@
+import asyncio
+import shutil
+import tempfile
+import unittest
+import os
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Scripts')))
+
+from audio_cache import AudioCache, _parse_range
+
+AUDIO = bytes(range(256)) * 40  # 10240 bytes
+
+
+class FakeUpstreamCache(AudioCache):
+    """Serves AUDIO instead of asking ABS."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requests = []
+
+    async def _fetch_range(self, key, start, end):
+        self.requests.append((start, end))
+        data = AUDIO[start:end + 1]
+        self.bytes_fetched += len(data)
+        return data, len(AUDIO)
+
+
+class TestAudioCache(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = FakeUpstreamCache(self.directory, max_bytes=8192, chunk_size=1024, read_ahead=0)
+        await self.cache.start()
+        self.url = self.cache.local_url('http://abs/api/items/li_1/file/123?token=abc')
+
+    async def asyncTearDown(self):
+        await self.cache.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    async def get(self, headers=None):
+        async with httpx.AsyncClient() as client:
+            return await client.get(self.url, headers=headers or {})
+
+    def test_parse_range(self):
+        self.assertEqual(_parse_range(None, 100), (0, 99))
+        self.assertEqual(_parse_range('bytes=10-', 100), (10, 99))
+        self.assertEqual(_parse_range('bytes=10-19', 100), (10, 19))
+        self.assertEqual(_parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(_parse_range('bytes=200-', 100), (None, None))
+
+    async def test_ranges_are_served_from_disk_after_first_read(self):
+        self.assertTrue(self.url.startswith('http://127.0.0.1:'))
+
+        r = await self.get({'Range': 'bytes=1500-3000'})
+        self.assertEqual(r.status_code, 206)
+        self.assertEqual(r.headers['content-range'], f'bytes 1500-3000/{len(AUDIO)}')
+        self.assertEqual(r.content, AUDIO[1500:3001])
+
+        fetched = len(self.cache.requests)
+        r = await self.get({'Range': 'bytes=1024-2047'})
+        self.assertEqual(r.content, AUDIO[1024:2048])
+        self.assertEqual(len(self.cache.requests), fetched)
+        self.assertGreater(self.cache.hits, 0)
+
+    async def test_lru_is_bounded(self):
+        r = await self.get()
+        self.assertEqual(r.content, AUDIO)
+
+        stats = self.cache.stats()
+        self.assertLessEqual(stats['size_mb'] * 1024 * 1024, 8192)
+        self.assertGreater(stats['evictions'], 0)
+
+        # The oldest chunks were evicted, re-reading them goes back upstream
+        fetched = len(self.cache.requests)
+        await self.get({'Range': 'bytes=0-1023'})
+        self.assertEqual(len(self.cache.requests), fetched + 1)
+
+    async def test_read_ahead_fills_next_chunks(self):
+        self.cache.read_ahead = 3
+        await self.get({'Range': 'bytes=0-10'})
+        await asyncio.wait_for(self.cache._fill_tasks[next(iter(self.cache.sources))], 1)
+
+        for index in range(1, 4):
+            self.assertIn(self.cache._chunk_path(next(iter(self.cache.sources)), index), self.cache._lru)
+
+    async def test_prefetch_fills_head_of_file(self):
+        self.cache.prefetch('http://abs/api/items/li_2/file/456?token=abc', chunks=2)
+        await asyncio.wait_for(self.cache._fill_tasks['li_2_456'], 1)
+
+        self.assertEqual(self.cache.requests, [(0, 1023), (1024, 2047)])
+        self.assertIn(self.cache._chunk_path('li_2_456', 1), self.cache._lru)
+
+    def test_uncacheable_urls_pass_through(self):
+        self.assertEqual(self.cache.local_url('http://abs/other'), 'http://abs/other')
+
+
+if __name__ == '__main__':
+    unittest.main()
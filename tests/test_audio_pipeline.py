@@ -0,0 +1,76 @@
+import unittest
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Scripts')))
+
+import discord
+import audio_pipeline
+
+
+class TestAudioPipeline(unittest.IsolatedAsyncioTestCase):
+
+    async def test_opus_pipeline_applies_volume_in_ffmpeg(self):
+        with patch.object(audio_pipeline.s, 'AUDIO_PIPELINE', 'opus'), \
+                patch.object(discord, 'FFmpegOpusAudio') as opus:
+            await audio_pipeline.create_audio_source('http://abs/file', 12.5, 0.5, bitrate=96000)
+
+        opus.probe.assert_not_called()
+        _, kwargs = opus.call_args
+        self.assertEqual(kwargs['bitrate'], 96)
+        self.assertEqual(kwargs['before_options'], f'-re -ss 12.5 {audio_pipeline.RECONNECT_OPTIONS}')
+        self.assertEqual(kwargs['options'], '-af volume=0.50')
+
+    async def test_opus_sources_are_stream_copied_at_full_volume(self):
+        with patch.object(audio_pipeline.s, 'AUDIO_PIPELINE', 'opus'), \
+                patch.object(discord, 'FFmpegOpusAudio') as opus:
+            opus.probe = AsyncMock(return_value=('opus', 64))
+            await audio_pipeline.create_audio_source('http://abs/file', 0, 1.0)
+
+        _, kwargs = opus.call_args
+        self.assertEqual(kwargs['codec'], 'copy')
+        self.assertNotIn('options', kwargs)
+
+    async def test_pcm_pipeline_scales_in_python(self):
+        pcm = MagicMock(spec=discord.AudioSource)
+        pcm.is_opus.return_value = False
+        with patch.object(audio_pipeline.s, 'AUDIO_PIPELINE', 'pcm'), \
+                patch.object(discord, 'FFmpegPCMAudio', return_value=pcm):
+            source = await audio_pipeline.create_audio_source('http://abs/file', 0, 0.3)
+
+        self.assertIsInstance(source.source, discord.PCMVolumeTransformer)
+        self.assertFalse(audio_pipeline.uses_ffmpeg_volume(source))
+        self.assertEqual(source.source.volume, 0.3)
+
+    def test_monitored_source_counts_delivered_frames(self):
+        inner = MagicMock(spec=discord.AudioSource)
+        inner.read.side_effect = [b'frame'] * 50 + [b'']
+        source = audio_pipeline.MonitoredSource(inner, start_time=30.0)
+
+        while source.read():
+            pass
+
+        self.assertEqual(source.frames, 50)
+        self.assertAlmostEqual(source.position, 31.0)
+        self.assertTrue(source.ended)
+        self.assertLessEqual(source.first_frame_at, source.last_frame_at)
+
+    def test_unsynced_seconds_count_frames_since_last_sync(self):
+        inner = MagicMock(spec=discord.AudioSource)
+        inner.read.return_value = b'frame'
+        source = audio_pipeline.MonitoredSource(inner, start_time=0.0)
+
+        for _ in range(250):
+            source.read()
+        self.assertAlmostEqual(source.unsynced_seconds, 5.0)
+
+        source.mark_synced()
+        for _ in range(100):
+            source.read()
+        self.assertAlmostEqual(source.unsynced_seconds, 2.0)
+        self.assertAlmostEqual(source.position, 7.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
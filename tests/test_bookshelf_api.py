@@ -0,0 +1,450 @@
+import asyncio
+import unittest
+import os
+import sys
+from unittest.mock import patch, AsyncMock, MagicMock
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Scripts')))
+
+import bookshelfAPI as c
+
+
+class TestSharedHttpClient(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncTearDown(self):
+        await c.close_http_client()
+
+    async def test_open_reuses_client_on_same_loop(self):
+        client = await c.open_http_client()
+        self.assertIs(await c.open_http_client(), client)
+        self.assertFalse(client.is_closed)
+
+        async with c.http_client() as pooled:
+            self.assertIs(pooled, client)
+
+    async def test_close_http_client(self):
+        client = await c.open_http_client()
+        await c.close_http_client()
+        self.assertTrue(client.is_closed)
+
+        # Falls back to a short-lived client once the shared one is closed
+        async with c.http_client() as transient:
+            self.assertIsNot(transient, client)
+            self.assertFalse(transient.is_closed)
+
+    async def test_client_from_other_loop_is_not_used(self):
+        client = await c.open_http_client()
+        c._http_client_loop = object()
+
+        async with c.http_client() as transient:
+            self.assertIsNot(transient, client)
+
+        # Restore so tearDown closes it on this loop
+        c._http_client_loop = None
+        await client.aclose()
+
+
+class TestMetadataCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        c.metadata_cache.invalidate()
+
+    def test_cache_resource_mapping(self):
+        self.assertEqual(c._cache_resource("/libraries"), ("libraries", None))
+        self.assertEqual(c._cache_resource("/libraries/lib1/series"), ("series", "lib1"))
+        self.assertEqual(c._cache_resource("/items/abc?expanded=1"), ("items", "abc"))
+        self.assertEqual(c._cache_resource("/users/u1"), ("users", "u1"))
+        self.assertIsNone(c._cache_resource("/libraries/lib1/items"))
+        self.assertIsNone(c._cache_resource("/me/progress/abc"))
+
+    def test_lru_eviction_and_ttl(self):
+        cache = c.MetadataCache(max_entries=2, ttls={"items": 60, "users": 0})
+        cache.set("a", 1, "items", "a")
+        cache.set("b", 2, "items", "b")
+        self.assertEqual(cache.get("a", "items"), 1)
+        cache.set("c", 3, "items", "c")
+
+        # "b" was least recently used
+        self.assertIsNone(cache.get("b", "items"))
+        self.assertEqual(cache.evictions, 1)
+
+        # TTL of 0 disables caching for that type
+        cache.set("u", 4, "users", "u")
+        self.assertIsNone(cache.get("u", "users"))
+
+        stats = cache.stats()
+        self.assertEqual(stats["types"]["items"]["hits"], 1)
+        self.assertEqual(stats["types"]["items"]["misses"], 1)
+
+    async def test_get_is_cached_and_write_invalidates(self):
+        response = MagicMock(status_code=200)
+        client = MagicMock()
+        client.get = AsyncMock(return_value=response)
+        client.post = AsyncMock(return_value=MagicMock(status_code=200))
+
+        with patch.dict(os.environ, {"bookshelfURL": "http://abs", "bookshelfToken": "tok"}), \
+                patch.object(c, "http_client") as http_client:
+            http_client.return_value.__aenter__ = AsyncMock(return_value=client)
+            http_client.return_value.__aexit__ = AsyncMock(return_value=False)
+
+            await c.bookshelf_conn("/users/u1", GET=True)
+            r = await c.bookshelf_conn("/users/u1", GET=True)
+            self.assertIs(r, response)
+            self.assertEqual(client.get.await_count, 1)
+
+            # Session sync updates mediaProgress, so user records are dropped
+            await c.bookshelf_conn("/session/s1/sync", POST=True, Data={})
+            await c.bookshelf_conn("/users/u1", GET=True)
+            self.assertEqual(client.get.await_count, 2)
+
+            # Uncached endpoints always hit the server
+            await c.bookshelf_conn("/me/progress/abc", GET=True)
+            await c.bookshelf_conn("/me/progress/abc", GET=True)
+            self.assertEqual(client.get.await_count, 4)
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_identical_gets_share_one_request(self):
+        release = asyncio.Event()
+
+        async def slow_get(link, headers=None):
+            await release.wait()
+            return MagicMock(status_code=200)
+
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=slow_get)
+
+        with patch.dict(os.environ, {"bookshelfURL": "http://abs", "bookshelfToken": "tok"}), \
+                patch.object(c, "http_client") as http_client:
+            http_client.return_value.__aenter__ = AsyncMock(return_value=client)
+            http_client.return_value.__aexit__ = AsyncMock(return_value=False)
+
+            calls = [asyncio.create_task(c.bookshelf_conn("/me/listening-stats", GET=True)) for _ in range(3)]
+            other = asyncio.create_task(c.bookshelf_conn("/me/listening-stats", GET=True, params="limit=5"))
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(*calls)
+            await other
+
+        self.assertEqual(client.get.await_count, 2)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(c._inflight_gets, {})
+
+
+
+def search_response(*titles, media_type='book'):
+    response = MagicMock(status_code=200)
+    response.json.return_value = {media_type: [
+        {'libraryItem': {'id': item_id, 'mediaType': media_type,
+                         'media': {'metadata': {'title': title, 'authors': [{'name': 'Author'}]}}}}
+        for item_id, title in titles]}
+    return response
+
+
+class TestFederatedSearch(unittest.IsolatedAsyncioTestCase):
+
+    async def test_merges_dedups_and_ranks(self):
+        responses = {
+            "/libraries/lib1/search": search_response(("a", "Dune Messiah"), ("b", "Children of Dune")),
+            "/libraries/lib2/search": search_response(("c", "Dune"), ("a", "Dune Messiah")),
+        }
+
+        async def fake_conn(endpoint, GET=False, params=None, **kwargs):
+            return responses[endpoint]
+
+        libraries = {"One": ("lib1", True), "Two": ("lib2", True)}
+        with patch.object(c, "bookshelf_libraries", AsyncMock(return_value=libraries)), \
+                patch.object(c, "bookshelf_conn", side_effect=fake_conn):
+            results = await c.bookshelf_federated_search("dune", limit=2)
+
+        # Exact title match first, duplicates collapsed, limited to top-k
+        self.assertEqual([r["id"] for r in results], ["c", "a"])
+
+    async def test_slow_library_returns_partial_results(self):
+        async def fake_conn(endpoint, GET=False, params=None, **kwargs):
+            if endpoint == "/libraries/slow/search":
+                await asyncio.sleep(5)
+            return search_response(("a", "Dune"))
+
+        libraries = {"Fast": ("fast", True), "Slow": ("slow", True)}
+        with patch.object(c, "bookshelf_libraries", AsyncMock(return_value=libraries)), \
+                patch.object(c, "bookshelf_conn", side_effect=fake_conn):
+            started = asyncio.get_running_loop().time()
+            results = await c.bookshelf_federated_search("dune", deadline=0.3, library_timeout=0.2)
+
+        self.assertLess(asyncio.get_running_loop().time() - started, 1.0)
+        self.assertEqual([r["id"] for r in results], ["a"])
+
+
+
+class TestLibraryPagination(unittest.IsolatedAsyncioTestCase):
+
+    def make_page(self, start, count, total):
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"total": total, "results": [
+            {"id": str(i), "mediaType": "book", "addedAt": i,
+             "media": {"metadata": {"title": f"Book {i}", "authorName": "Author"}}}
+            for i in range(start, start + count)]}
+        return response
+
+    async def test_pages_lazily_and_stops_early(self):
+        pages = [self.make_page(0, 2, 5), self.make_page(2, 2, 5), self.make_page(4, 1, 5)]
+        conn = AsyncMock(side_effect=pages)
+
+        with patch.object(c, "bookshelf_conn", conn):
+            ids = [item["id"] async for item in c.bookshelf_iter_library_items("lib1", page_size=2)]
+        self.assertEqual(ids, ["0", "1", "2", "3", "4"])
+        self.assertEqual(conn.await_count, 3)
+        self.assertIn("&limit=2&page=2", conn.await_args.kwargs["params"])
+
+        # Early termination only requests the pages that were consumed
+        conn = AsyncMock(side_effect=pages)
+        with patch.object(c, "bookshelf_conn", conn):
+            ids = [item["id"] async for item in c.bookshelf_iter_library_items("lib1", page_size=2, limit=3)]
+        self.assertEqual(ids, ["0", "1", "2"])
+        self.assertEqual(conn.await_count, 2)
+
+    async def test_failed_page_raises(self):
+        with patch.object(c, "bookshelf_conn", AsyncMock(return_value=MagicMock(status_code=500))):
+            with self.assertRaises(Exception):
+                async for _ in c.bookshelf_iter_library_pages("lib1"):
+                    pass
+
+
+
+def library_item(item_id, title, genres=()):
+    return {"id": item_id, "mediaType": "book", "addedAt": 0,
+            "media": {"metadata": {"title": title, "authors": [{"name": "Author"}], "genres": list(genres)},
+                      "audioFiles": [{"duration": 60}]}}
+
+
+class TestBatchItemDetails(unittest.IsolatedAsyncioTestCase):
+
+    async def test_batch_endpoint(self):
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"libraryItems": [library_item("a", "Dune", ["Sci-Fi"]),
+                                                       library_item("b", "Emma")]}
+        conn = AsyncMock(return_value=response)
+
+        with patch.object(c, "bookshelf_conn", conn):
+            details = await c.bookshelf_get_items_details(["a", "b", "a"])
+
+        self.assertEqual(conn.await_count, 1)
+        self.assertEqual(conn.await_args.kwargs["Data"], {"libraryItemIds": ["a", "b"]})
+        self.assertEqual(details["a"]["genres"], "Sci-Fi")
+        self.assertEqual(details["b"]["duration"], 60)
+
+    async def test_falls_back_to_single_fetches(self):
+        single = AsyncMock(side_effect=lambda item_id: {"title": item_id})
+        with patch.object(c, "bookshelf_conn", AsyncMock(return_value=MagicMock(status_code=404))), \
+                patch.object(c, "bookshelf_get_item_details", single):
+            details = await c.bookshelf_get_items_details(["a", "b", "c"], concurrency=2)
+
+        self.assertEqual(single.await_count, 3)
+        self.assertEqual(set(details), {"a", "b", "c"})
+
+
+
+class TestProgressMap(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        c._progress_maps.clear()
+
+    async def test_loads_once_and_applies_local_updates(self):
+        me = MagicMock(status_code=200)
+        me.json.return_value = {"mediaProgress": [
+            {"libraryItemId": "a", "isFinished": True, "progress": 1.0, "currentTime": 60, "duration": 60},
+            {"libraryItemId": "p", "episodeId": "e1", "isFinished": False, "progress": 0.5},
+        ]}
+        conn = AsyncMock(return_value=me)
+
+        with patch.dict(os.environ, {"bookshelfURL": "http://abs", "bookshelfToken": "tok"}), \
+                patch.object(c, "bookshelf_conn", conn):
+            progress = await c.bookshelf_progress_map()
+            self.assertTrue(c.is_item_finished(progress, "a"))
+            self.assertFalse(c.is_item_finished(progress, "p", "e1"))
+
+            # Our own sync marks the episode finished without another request
+            c.update_progress_map("p", "e1", current_time=100, duration=100, is_finished=True)
+            progress = await c.bookshelf_progress_map()
+            self.assertTrue(c.is_item_finished(progress, "p", "e1"))
+            self.assertEqual(conn.await_count, 1)
+
+    async def test_add_progress_indicators(self):
+        import utils
+
+        progress = {("a", None): {"isFinished": True}}
+        choices = [{"name": "Book A", "value": "a"}, {"name": "Book B", "value": "b"},
+                   {"name": "📚 Random Book (Surprise me!)", "value": "random"}]
+
+        with patch.object(c, "bookshelf_progress_map", AsyncMock(return_value=progress)):
+            updated, timed_out = await utils.add_progress_indicators(choices)
+
+        self.assertFalse(timed_out)
+        self.assertEqual([choice["name"] for choice in updated],
+                         ["✅ Book A", "Book B", "📚 Random Book (Surprise me!)"])
+
+
+class TestRetryAndCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        c._breakers.clear()
+        c.metadata_cache.invalidate()
+
+    def patched_client(self, client):
+        http_client = patch.object(c, "http_client").start()
+        http_client.return_value.__aenter__ = AsyncMock(return_value=client)
+        http_client.return_value.__aexit__ = AsyncMock(return_value=False)
+        patch.dict(os.environ, {"bookshelfURL": "http://abs", "bookshelfToken": "tok"}).start()
+        patch.object(c.asyncio, "sleep", AsyncMock()).start()
+        self.addCleanup(patch.stopall)
+
+    async def test_get_retries_transient_errors(self):
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=[httpx.ConnectError("refused"), MagicMock(status_code=503),
+                                            MagicMock(status_code=200)])
+        self.patched_client(client)
+
+        r = await c.bookshelf_conn("/me/listening-stats", GET=True)
+
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(client.get.await_count, 3)
+        stats = c.get_breaker_stats()["abs"]
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["state"], "closed")
+
+    async def test_post_is_not_retried(self):
+        client = MagicMock()
+        client.post = AsyncMock(return_value=MagicMock(status_code=503))
+        self.patched_client(client)
+
+        r = await c.bookshelf_conn("/session/s1/sync", POST=True, Data={})
+        self.assertEqual(r.status_code, 503)
+        self.assertEqual(client.post.await_count, 1)
+
+    async def test_breaker_opens_short_circuits_and_recovers(self):
+        client = MagicMock()
+        client.get = AsyncMock(return_value=MagicMock(status_code=500))
+        self.patched_client(client)
+
+        with patch.object(c, "BREAKER_FAILURE_THRESHOLD", 2), patch.object(c, "BREAKER_RESET_TIMEOUT", 30):
+            await c.bookshelf_conn("/me/listening-stats", GET=True)
+            await c.bookshelf_conn("/me/listening-stats", GET=True)
+
+            with self.assertRaises(c.ABSUnavailableError):
+                await c.bookshelf_conn("/me/listening-stats", GET=True)
+            self.assertEqual(client.get.await_count, 2)
+
+            # After the reset timeout a single probe closes the circuit again
+            breaker = c._breakers["abs"]
+            breaker.opened_at -= 31
+            client.get = AsyncMock(return_value=MagicMock(status_code=200))
+            r = await c.bookshelf_conn("/me/listening-stats", GET=True)
+
+        self.assertEqual(r.status_code, 200)
+        stats = c.get_breaker_stats()["abs"]
+        self.assertEqual(stats["state"], "closed")
+        self.assertEqual(stats["short_circuited"], 1)
+        self.assertEqual(stats["opened"], 1)
+
+
+class TestAsyncConnectionHelpers(unittest.IsolatedAsyncioTestCase):
+
+    def patched_client(self, client):
+        http_client = patch.object(c, "http_client").start()
+        http_client.return_value.__aenter__ = AsyncMock(return_value=client)
+        http_client.return_value.__aexit__ = AsyncMock(return_value=False)
+        patch.dict(os.environ, {"bookshelfURL": "http://abs"}).start()
+        self.addCleanup(patch.stopall)
+
+    async def test_user_login_with_token(self):
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"user": {"token": "tok", "username": "alice", "type": "admin"}}
+        client = MagicMock()
+        client.post = AsyncMock(return_value=response)
+        self.patched_client(client)
+
+        user_info = await c.bookshelf_user_login(token="tok")
+
+        self.assertEqual(user_info, {"username": "alice", "type": "admin", "token": "tok"})
+        self.assertEqual(client.post.await_args.kwargs["params"], {"token": "tok"})
+
+    async def test_user_login_failure(self):
+        client = MagicMock()
+        client.post = AsyncMock(side_effect=httpx.ConnectError("refused"))
+        self.patched_client(client)
+
+        user_info = await c.bookshelf_user_login("alice", "wrong")
+        self.assertEqual(user_info["username"], "")
+        self.assertIsNone(user_info["type"])
+
+    async def test_connection_test_retries_without_blocking(self):
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=[httpx.ConnectTimeout("timeout"), MagicMock(status_code=200)])
+        self.patched_client(client)
+        sleep = patch.object(c.asyncio, "sleep", AsyncMock()).start()
+
+        self.assertEqual(await c.bookshelf_test_connection(max_attempts=3), 200)
+        sleep.assert_awaited_once_with(5)
+
+        client.get = AsyncMock(side_effect=httpx.ConnectError("refused"))
+        self.assertIsNone(await c.bookshelf_test_connection(max_attempts=2, exit_on_failure=False))
+
+
+class TestABSClient(unittest.IsolatedAsyncioTestCase):
+
+    async def test_clients_are_scoped_per_task(self):
+        seen = {}
+
+        async def fake_conn(endpoint, GET=False, **kwargs):
+            await asyncio.sleep(0)
+            seen[endpoint] = c.current_client().key
+            return MagicMock(status_code=200)
+
+        async def as_user(token, endpoint):
+            async with c.ABSClient(token, "http://abs"):
+                await asyncio.sleep(0)
+                return await c.bookshelf_conn(endpoint, GET=True)
+
+        with patch.dict(os.environ, {"bookshelfURL": "http://env", "bookshelfToken": "env-token"}), \
+                patch.object(c, "bookshelf_conn", side_effect=fake_conn):
+            await asyncio.gather(as_user("alice", "/a"), as_user("bob", "/b"))
+
+            self.assertEqual(seen, {"/a": ("http://abs", "alice"), "/b": ("http://abs", "bob")})
+            # Nothing leaks into the environment or the surrounding context
+            self.assertEqual(c.current_client().key, ("http://env", "env-token"))
+
+    async def test_bound_calls_and_explicit_client(self):
+        client = MagicMock()
+        client.get = AsyncMock(return_value=MagicMock(status_code=200))
+
+        with patch.dict(os.environ, {"bookshelfURL": "http://env", "bookshelfToken": "env-token"}), \
+                patch.object(c, "http_client") as http_client:
+            http_client.return_value.__aenter__ = AsyncMock(return_value=client)
+            http_client.return_value.__aexit__ = AsyncMock(return_value=False)
+
+            await c.bookshelf_conn("/me/items-in-progress", GET=True, client=c.ABSClient("alice", "http://abs"))
+            self.assertEqual(client.get.await_args.args[0], "http://abs/api/me/items-in-progress?token=alice")
+
+            with patch.object(c, "bookshelf_auth_test", AsyncMock(side_effect=lambda: c.current_client().token)):
+                self.assertEqual(await c.ABSClient("bob").bookshelf_auth_test(), "bob")
+
+    async def test_use_client_lasts_for_the_task(self):
+        async def interaction(token):
+            c.use_client(c.ABSClient(token, "http://abs") if token else None)
+            await asyncio.sleep(0)
+            return c.current_client().token
+
+        with patch.dict(os.environ, {"bookshelfURL": "http://env", "bookshelfToken": "env-token"}):
+            tokens = await asyncio.gather(asyncio.create_task(interaction("alice")),
+                                          asyncio.create_task(interaction(None)))
+
+            self.assertEqual(tokens, ["alice", "env-token"])
+            self.assertEqual(c.current_client().token, "env-token")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import os
+import shutil
+import tempfile
+import sys
+from unittest.mock import patch, AsyncMock, MagicMock
+
+# Ensure Scripts directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Scripts')))
+
+import catalog_index
+from catalog_index import SQLiteCatalogIndex
+
+
+def make_item(item_id, title, author, updated_at, media_type='book', series='', narrator=''):
+    metadata = {'title': title, 'seriesName': series, 'narratorName': narrator}
+    if media_type == 'podcast':
+        metadata['author'] = author
+    else:
+        metadata['authorName'] = author
+    return {'id': item_id, 'libraryId': 'lib1', 'mediaType': media_type, 'addedAt': updated_at,
+            'updatedAt': updated_at, 'media': {'metadata': metadata}}
+
+
+def items_response(items):
+    response = MagicMock(status_code=200)
+    response.json.return_value = {'results': items}
+    return response
+
+
+class TestCatalogIndex(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = SQLiteCatalogIndex(os.path.join(self.test_dir, 'test_catalog.db'))
+        await self.db.connect()
+        await self.db.create_catalog_tables()
+
+        self.items = [
+            make_item('1', 'The Hobbit', 'J.R.R. Tolkien', 100, series='Middle-earth'),
+            make_item('2', 'The Fellowship of the Ring', 'J.R.R. Tolkien', 200, narrator='Rob Inglis'),
+            make_item('3', 'Project Hail Mary', 'Andy Weir', 300),
+            make_item('4', 'Hardcore History', 'Dan Carlin', 400, media_type='podcast'),
+        ]
+        ebook = make_item('5', 'The Hobbit (ebook)', 'J.R.R. Tolkien', 500)
+        ebook['media']['ebookFormat'] = 'epub'
+        self.items.append(ebook)
+
+        with patch.object(catalog_index.c, 'bookshelf_conn',
+                          AsyncMock(return_value=items_response(self.items))):
+            await self.db.sync_library('lib1', full=True)
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    async def test_search_substring_and_fields(self):
+        results = await self.db.search('hobbit', ['lib1'])
+        self.assertEqual([r['id'] for r in results], ['1'])
+
+        # Author, narrator and series are indexed too
+        self.assertEqual({r['id'] for r in await self.db.search('tolkien', ['lib1'])}, {'1', '2'})
+        self.assertEqual([r['id'] for r in await self.db.search('inglis', ['lib1'])], ['2'])
+        self.assertEqual([r['id'] for r in await self.db.search('middle earth', ['lib1'])], ['1'])
+
+        podcast = await self.db.search('carlin', ['lib1'])
+        self.assertEqual(podcast[0]['mediaType'], 'podcast')
+
+    async def test_search_typo_tolerant(self):
+        results = await self.db.search('projet hail mery', ['lib1'])
+        self.assertEqual(results[0]['id'], '3')
+
+        results = await self.db.search('fellowshp', ['lib1'])
+        self.assertEqual(results[0]['id'], '2')
+
+    async def test_search_respects_libraries(self):
+        self.assertEqual(await self.db.search('hobbit', ['other']), [])
+
+    async def test_incremental_sync_stops_at_watermark(self):
+        updated = [make_item('6', 'Artemis', 'Andy Weir', 600)] + list(reversed(self.items))
+        conn = AsyncMock(return_value=items_response(updated))
+        with patch.object(catalog_index.c, 'bookshelf_conn', conn):
+            written = await self.db.sync_library('lib1')
+
+        self.assertEqual(written, 1)
+        self.assertEqual(conn.await_count, 1)
+        self.assertEqual([r['id'] for r in await self.db.search('artemis', ['lib1'])], ['6'])
+
+    async def test_full_sync_removes_deleted_items(self):
+        with patch.object(catalog_index.c, 'bookshelf_conn',
+                          AsyncMock(return_value=items_response(self.items[1:]))):
+            await self.db.sync_library('lib1', full=True)
+
+        self.assertEqual(await self.db.search('hobbit', ['lib1']), [])
+
+    async def test_scheduled_sync_uses_bot_client(self):
+        tokens = []
+
+        async def sync(library_ids=None, force=False):
+            tokens.append(catalog_index.c.current_client().token)
+
+        with patch.dict(os.environ, {'bookshelfToken': 'bot-token'}), \
+                patch.object(self.db, 'sync', sync):
+            with catalog_index.c.ABSClient('user-token'):
+                task = self.db.schedule_sync(['lib1'])
+            await task
+
+        self.assertEqual(tokens, ['bot-token'])
+
+
+if __name__ == '__main__':
+    unittest.main()
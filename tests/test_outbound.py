@@ -0,0 +1,89 @@
+import asyncio
+import time
+import unittest
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Scripts')))
+
+from outbound import OutboundQueue, RouteBucket, pack_embeds
+
+
+class RateLimited(Exception):
+    status = 429
+    retry_after = 0.01
+
+
+class FakeChannel:
+    def __init__(self, fail_times=0):
+        self.messages = []
+        self.fail_times = fail_times
+
+    async def send(self, **kwargs):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RateLimited()
+        self.messages.append(kwargs)
+        return kwargs
+
+
+class TestOutboundQueue(unittest.IsolatedAsyncioTestCase):
+
+    def test_pack_embeds(self):
+        messages = pack_embeds(list(range(23)), content="New books!")
+        self.assertEqual([len(m["embeds"]) for m in messages], [10, 10, 3])
+        self.assertEqual(messages[0]["content"], "New books!")
+        self.assertNotIn("content", messages[1])
+        self.assertEqual(pack_embeds([], content="hi"), [{"content": "hi"}])
+        self.assertEqual(pack_embeds([]), [])
+
+    async def test_bucket_spaces_out_sends(self):
+        bucket = RouteBucket(limit=2, window=0.1)
+        started = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+    async def test_routes_are_ordered_and_independent(self):
+        queue = OutboundQueue(route_limit=1, route_window=0.05)
+        busy, quiet = FakeChannel(), FakeChannel()
+
+        burst = asyncio.create_task(queue.send("channel:1", busy, embeds=list(range(40))))
+        await asyncio.sleep(0)
+        self.assertEqual(queue.depth(), 4)
+
+        await asyncio.wait_for(queue.send("channel:2", quiet, embeds=[1]), 0.04)
+        await burst
+
+        self.assertEqual([m["embeds"][0] for m in busy.messages], [0, 10, 20, 30])
+        self.assertEqual(queue.stats()["sent"], 5)
+        self.assertEqual(queue.stats()["embeds_sent"], 41)
+        self.assertEqual(queue.depth(), 0)
+
+    async def test_rate_limited_messages_are_retried(self):
+        queue = OutboundQueue()
+        channel = FakeChannel(fail_times=1)
+        await queue.send("channel:1", channel, embeds=[1], content="hi")
+
+        self.assertEqual(len(channel.messages), 1)
+        self.assertEqual(queue.stats()["rate_limited"], 1)
+
+    async def test_users_and_channels_are_cached(self):
+        bot = MagicMock()
+        bot.fetch_user = AsyncMock(return_value=MagicMock())
+        bot.fetch_channel = AsyncMock(return_value=FakeChannel())
+        queue = OutboundQueue(bot)
+
+        await queue.get_user(1)
+        await queue.get_user(1)
+        await queue.send_to_channel(5, embeds=[1])
+        await queue.send_to_channel(5, embeds=[2])
+
+        bot.fetch_user.assert_awaited_once_with(1)
+        bot.fetch_channel.assert_awaited_once_with(5)
+        self.assertEqual(queue.stats()["cache_hits"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
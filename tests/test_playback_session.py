@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Scripts')))
+
+from playback_session import (PlaybackSession, ResourceSampler, SESSION_ATTRIBUTES, StreamHealth, bind_guild,
+                              current_guild_id, gap_stats, next_book_start_time, playback_stats)
+
+
+class TestPlaybackSession(unittest.IsolatedAsyncioTestCase):
+
+    async def test_guild_binding_is_per_task(self):
+        async def work(guild_id):
+            bind_guild(guild_id)
+            await asyncio.sleep(0.01)
+            return current_guild_id()
+
+        bind_guild(None)
+        self.assertEqual(await asyncio.gather(work(1), work(2)), [1, 2])
+        self.assertIsNone(current_guild_id())
+
+    def test_session_attributes(self):
+        for name in ('sessionID', 'bookItemID', 'activeSessions', 'voice_state', 'session_update', 'volume', 'abs_client'):
+            self.assertIn(name, SESSION_ATTRIBUTES)
+
+        first, second = PlaybackSession(1), PlaybackSession(2)
+        first.seriesList.append('book')
+        self.assertEqual(second.seriesList, [])
+
+    def test_stats_per_active_stream(self):
+        sessions = {1: PlaybackSession(1), 2: PlaybackSession(2), 3: PlaybackSession(3)}
+        sessions[1].activeSessions = 1
+        sessions[2].activeSessions = 1
+
+        stats = playback_stats(sessions, ResourceSampler())
+
+        self.assertEqual(stats['active_streams'], 2)
+        self.assertEqual(set(stats['sessions']), {'1', '2'})
+        self.assertGreater(stats['rss_mb'], 0)
+        self.assertAlmostEqual(stats['rss_mb_per_stream'], stats['rss_mb'] / 2, places=0)
+        self.assertEqual(stats['transition_gap']['count'], 0)
+
+    def test_transition_gap_stats(self):
+        self.assertEqual(gap_stats([0.5, 0.25, 1.5]), {"count": 3, "last": 1.5, "avg": 0.75, "max": 1.5})
+        self.assertIsNone(gap_stats([])['avg'])
+
+    def test_next_book_start_time(self):
+        # No progress yet, ABS answers 404 and bookshelf_item_progress returns None
+        self.assertIsNone(next_book_start_time(None))
+        self.assertIsNone(next_book_start_time({'finished': 'False'}))
+        self.assertEqual(next_book_start_time({'finished': 'True'}), 0.0)
+
+    def test_stream_health_stats(self):
+        health = StreamHealth()
+        health.record_stall()
+        health.record_recovery(2.0)
+        health.record_stall()
+        health.record_failure()
+
+        stats = playback_stats({}, ResourceSampler(), stream_health=health)['streams']
+        self.assertEqual((stats['stalls'], stats['recoveries'], stats['failures']), (2, 1, 1))
+        self.assertEqual(stats['recovery_time']['last'], 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import os
+import shutil
+import tempfile
+import sys
+
+# Ensure Scripts directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Scripts')))
+
+from runtime_metrics import SQLiteMetricsStore
+
+
+class TestMetricsStore(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = SQLiteMetricsStore(os.path.join(self.test_dir, 'test_metrics.db'))
+        await self.store.connect()
+        await self.store.create_metrics_table()
+
+    async def asyncTearDown(self):
+        await self.store.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    async def test_publish_and_read_keep_timestamp_apart(self):
+        breakers = {"abs": {"state": "closed"}, "updated_at": {"state": "open"}}
+        await self.store.publish({"breakers": breakers})
+
+        metrics = await self.store.read()
+        self.assertEqual(metrics["breakers"]["data"], breakers)
+        self.assertIsInstance(metrics["breakers"]["updated_at"], float)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import asyncio
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Scripts')))
+
+from scheduler import Job, Lease, Scheduler
+
+
+class FakeLease(Lease):
+    duration = 0.03
+
+    def __init__(self, renew_result=True):
+        self.renew_result = renew_result
+        self.held = False
+        self.renewals = 0
+
+    async def acquire(self):
+        if self.held:
+            return False
+        self.held = True
+        return True
+
+    async def renew(self):
+        self.renewals += 1
+        return self.renew_result
+
+    async def release(self):
+        self.held = False
+
+
+class TestJob(unittest.IsolatedAsyncioTestCase):
+
+    async def test_overlapping_runs_are_skipped(self):
+        release = asyncio.Event()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await release.wait()
+
+        job = Job('slow', slow, interval=0.01, jitter=0)
+        job.start(delay=0)
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(len(calls), 1)
+        self.assertGreater(job.skipped, 0)
+        self.assertTrue(job.in_progress)
+
+        job.stop()
+        release.set()
+        await asyncio.sleep(0)
+        self.assertFalse(job.running)
+
+    async def test_jitter_stays_in_range(self):
+        job = Job('jitter', lambda: None, interval=100, jitter=0.2)
+        delays = [job._delay() for _ in range(200)]
+        self.assertTrue(all(80 <= delay <= 120 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+        job.defer(5)
+        self.assertEqual(job._delay(), 5)
+
+    async def test_records_status_and_histogram(self):
+        async def failing():
+            raise ValueError("boom")
+
+        ok = Job('ok', lambda: asyncio.sleep(0), interval=60)
+        await ok.run_once()
+
+        failed = Job('failed', failing, interval=60)
+        await failed.run_once()
+
+        stats = failed.stats()
+        self.assertEqual(stats['last_status'], 'error')
+        self.assertEqual(stats['last_error'], 'boom')
+        self.assertEqual(stats['failures'], 1)
+        self.assertEqual(ok.stats()['duration_histogram']['le_0.1'], 1)
+
+    async def test_lease_is_renewed_during_long_runs(self):
+        lease = FakeLease()
+
+        async def long_run():
+            self.assertTrue(lease.held)
+            await asyncio.sleep(0.05)
+
+        job = Job('leased', long_run, interval=60, lease=lease)
+        await job.run_once()
+
+        self.assertGreater(lease.renewals, 0)
+        self.assertFalse(lease.held)
+        self.assertEqual(job.last_status, 'ok')
+
+    async def test_lost_lease_cancels_run(self):
+        lease = FakeLease(renew_result=False)
+        finished = []
+
+        async def long_run():
+            await asyncio.sleep(1)
+            finished.append(True)
+
+        job = Job('leased', long_run, interval=60, lease=lease)
+        await job.run_once()
+
+        self.assertEqual(finished, [])
+        self.assertEqual(job.last_status, 'lease_lost')
+        self.assertEqual(job.lease_lost, 1)
+
+    async def test_scheduler_stats(self):
+        registry = Scheduler()
+        job = registry.add_job('a', lambda: asyncio.sleep(0), interval=60)
+        job.start()
+        self.assertTrue(registry.stats()['a']['scheduled'])
+        registry.stop_all()
+        self.assertFalse(registry.stats()['a']['scheduled'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,11 +3,15 @@ import asyncio
 import os
 import shutil
 import tempfile
+import time
 import sys
+from unittest.mock import patch, AsyncMock, MagicMock
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Scripts')))
 
-from subscription_task import SQLiteTaskDatabase
+import subscription_task
+import wishlist
+from subscription_task import SQLiteTaskDatabase, SubscriptionTask
 
 
 class TestSubscriptionTaskDatabase(unittest.IsolatedAsyncioTestCase):
@@ -62,6 +66,15 @@ class TestSubscriptionTaskDatabase(unittest.IsolatedAsyncioTestCase):
         owner_after = await self.db.check_lock_owner(task_name="sync_task")
         self.assertFalse(owner_after)
 
+    async def test_lock_renewal(self):
+        self.assertTrue(await self.db.acquire_lock(task_name="long_task", lock_duration_seconds=1))
+        self.assertTrue(await self.db.renew_lock(task_name="long_task", lock_duration_seconds=60))
+        self.assertFalse(await self.db.acquire_lock(task_name="long_task", lock_duration_seconds=60))
+
+        # A lock released (or expired and taken over) can no longer be renewed
+        await self.db.release_lock(task_name="long_task")
+        self.assertFalse(await self.db.renew_lock(task_name="long_task", lock_duration_seconds=60))
+
     async def test_message_tracking(self):
         # Initial check
         sent = await self.db.has_message_been_sent(channel_id=111, book_id="book_abc", message_type="new_book")
@@ -75,5 +88,187 @@ class TestSubscriptionTaskDatabase(unittest.IsolatedAsyncioTestCase):
         self.assertTrue(sent_after)
 
 
+
+class TestConcurrentChannels(unittest.IsolatedAsyncioTestCase):
+
+    async def test_channels_run_concurrently_and_share_results_per_user(self):
+        tokens_seen = []
+        sent = {}
+        release = asyncio.Event()
+
+        async def collect():
+            tokens_seen.append(subscription_task.c.current_client().token)
+            return ["book"]
+
+        async def send(channel_id, data):
+            if channel_id == 1:
+                # A slow channel must not hold up the others
+                await release.wait()
+            sent[channel_id] = data
+            if len(sent) == 3:
+                release.set()
+
+        users = {"tok-a": "user-1", "tok-a2": "user-1", "tok-b": "user-2"}
+        rows = [("new-book-check", 1, 1, "tok-a"), ("new-book-check", 2, 2, "tok-a2"),
+                ("new-book-check", 3, 3, "tok-b"), ("new-book-check", 4, 4, "tok-a")]
+
+        with patch.object(subscription_task, "abs_user_key", AsyncMock(side_effect=lambda t: users[t])):
+            await asyncio.wait_for(SubscriptionTask._run_channels(MagicMock(), rows, collect, send), 2)
+
+        self.assertEqual(sorted(tokens_seen), ["tok-a", "tok-b"])
+        self.assertEqual(set(sent), {1, 2, 3, 4})
+
+
+    async def test_new_book_embeds_are_built_once_per_book(self):
+        task = MagicMock()
+        task.NewBookCheckEmbed = AsyncMock(side_effect=lambda enable_notifications, items_added:
+                                           [f"embed-{item['id']}" for item in items_added])
+        results = {"user-1": [{"id": "a"}, {"id": "b"}], "user-2": [{"id": "b"}], "user-3": []}
+
+        prepared = await SubscriptionTask._prepare_new_books(task, results)
+
+        task.NewBookCheckEmbed.assert_awaited_once()
+        self.assertEqual(len(task.NewBookCheckEmbed.await_args.kwargs["items_added"]), 2)
+        self.assertEqual(prepared["user-1"][1], ["embed-a", "embed-b"])
+        self.assertEqual(prepared["user-2"], ([{"id": "b"}], ["embed-b"]))
+        self.assertEqual(prepared["user-3"], ([], []))
+
+    async def test_wishlist_matches_are_sent_as_one_dm_per_user(self):
+        task = MagicMock(ServerNickName="ABS", embedColor=None)
+        task.notify_wishlist_user = lambda *args, **kwargs: SubscriptionTask.notify_wishlist_user(task, *args, **kwargs)
+        task.send_user_wishlist = lambda *args, **kwargs: SubscriptionTask.send_user_wishlist(task, *args, **kwargs)
+        books = [{"id": str(i), "title": f"Book {i}", "author": "Author", "addedTime": "2024/01/01 00:00"}
+                 for i in range(12)]
+        matches = {str(i): [(1, "{}", f"Book {i}")] for i in range(12)}
+        matches["0"].append((2, "{}", "Book 0"))
+        send = AsyncMock(return_value=[])
+        user = MagicMock(display_name="Reader")
+
+        with patch.object(subscription_task, "match_wishlist", AsyncMock(return_value=matches)), \
+                patch.object(subscription_task.c, "bookshelf_cover_image", AsyncMock(return_value="cover")), \
+                patch.object(subscription_task, "search_task_db", AsyncMock(return_value=None)), \
+                patch.object(subscription_task, "mark_book_as_downloaded", AsyncMock()) as mark, \
+                patch.object(subscription_task.outbound, "get_user", AsyncMock(return_value=user)), \
+                patch.object(subscription_task.outbound, "send", send):
+            embeds = await SubscriptionTask.NewBookCheckEmbed(task, enable_notifications=True, items_added=books)
+
+        self.assertEqual(len(embeds), 12)
+        sent = {call.args[0]: call.kwargs for call in send.await_args_list}
+        self.assertEqual(set(sent), {"dm:1", "dm:2"})
+        self.assertEqual(len(sent["dm:1"]["embeds"]), 12)
+        self.assertIn("12 of your wishlisted books", sent["dm:1"]["content"])
+        self.assertIn("**Book 0**", sent["dm:2"]["content"])
+        self.assertEqual(mark.await_count, 13)
+
+
+class TestNewBookWatermarks(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db = SQLiteTaskDatabase(os.path.join(self.test_dir, 'test_tasks.db'))
+        await self.db.connect()
+        await self.db.create_library_watermarks_table()
+        patcher = patch.object(subscription_task, "task_db", self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        shutil.rmtree(self.test_dir)
+
+    @staticmethod
+    def item(item_id, added_at, media_type='book'):
+        return {"id": item_id, "title": f"Book {item_id} (Unabridged)", "author": "Author",
+                "addedTime": added_at, "mediaType": media_type}
+
+    async def test_watermark_limits_scan_and_checks_every_library(self):
+        now = int(time.time() * 1000)
+        catalog = {
+            "lib1": [self.item("a2", now - 1000), self.item("a1", now - 2000), self.item("old", now - 10 ** 9)],
+            "lib2": [self.item("b1", now - 500, media_type='podcast'), self.item("b0", now - 3000)],
+        }
+        consumed = {"lib1": 0, "lib2": 0}
+
+        async def iter_items(library_id, params='', page_size=None, limit=None):
+            for item in catalog[library_id]:
+                consumed[library_id] += 1
+                yield item
+
+        libraries = {"One": ("lib1", True), "Two": ("lib2", False)}
+        with patch.object(subscription_task.c, "bookshelf_libraries", AsyncMock(return_value=libraries)), \
+                patch.object(subscription_task.c, "bookshelf_iter_library_items", iter_items):
+            first = await subscription_task.newBookList(use_watermark=True)
+            self.assertEqual(sorted(book["id"] for book in first), ["a1", "a2", "b0"])
+            self.assertEqual(first[0]["title"], "Book a2")
+            # Stops at the first item older than the lookback window
+            self.assertEqual(consumed["lib1"], 3)
+
+            catalog["lib1"].insert(0, self.item("a3", now))
+            second = await subscription_task.newBookList(use_watermark=True)
+
+        self.assertEqual([book["id"] for book in second], ["a3"])
+        self.assertEqual(consumed["lib1"], 5)
+        self.assertEqual(await self.db.get_library_watermark(subscription_task._watermark_scope(), "lib2"),
+                         now - 500)
+
+    async def test_new_books_match_wishlist_by_asin(self):
+        wishlist_db = wishlist.SQLiteDatabase(os.path.join(self.test_dir, 'test_wishlist.db'))
+        await wishlist_db.connect()
+        await wishlist_db.create_wishlist_table()
+        self.addAsyncCleanup(wishlist_db.close)
+        await wishlist_db.insert_wishlist_data(
+            title="The Hobbit", author="J.R.R. Tolkien", description="", cover="", provider="audible",
+            provider_id="B0099SQG2I", discord_id=1, data="{}")
+
+        # Raw /libraries/{id}/items entry, ABS titles it differently than the wishlist
+        raw_item = {"id": "li_1", "libraryId": "lib1", "mediaType": "book", "addedAt": int(time.time() * 1000),
+                    "media": {"metadata": {"title": "Hobbit: Graphic Audio Edition", "authorName": "Tolkien",
+                                           "asin": "b0099sqg2i"}}}
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"results": [raw_item], "total": 1}
+
+        with patch.object(subscription_task.c, "bookshelf_libraries", AsyncMock(return_value={"One": ("lib1", True)})), \
+                patch.object(subscription_task.c, "bookshelf_conn", AsyncMock(return_value=response)), \
+                patch.object(wishlist, "db", wishlist_db):
+            books = await subscription_task.newBookList()
+            matches = await subscription_task.match_wishlist(books)
+
+        self.assertEqual([book["provider_id"] for book in books], ["b0099sqg2i"])
+        self.assertEqual([m[0] for m in matches["li_1"]], [1])
+
+    async def test_finished_books_are_reported_once_per_user(self):
+        await self.db.create_progress_watermarks_table()
+        now = int(time.time() * 1000)
+        progress = {
+            "u1": [{"mediaItemType": "book", "isFinished": True, "finishedAt": now - 1000,
+                    "libraryItemId": "a", "displayTitle": "A"},
+                   {"mediaItemType": "book", "isFinished": True, "finishedAt": now - 10 ** 9,
+                    "libraryItemId": "old", "displayTitle": "Old"},
+                   {"mediaItemType": "podcast", "isFinished": True, "finishedAt": now,
+                    "libraryItemId": "p", "displayTitle": "P"}],
+            "u2": [],
+        }
+
+        async def fake_conn(endpoint, GET=False, **kwargs):
+            response = MagicMock(status_code=200)
+            response.json.return_value = {"mediaProgress": progress[endpoint.rsplit("/", 1)[1]]}
+            return response
+
+        users = {"users": [{"id": "u1", "username": "alice"}, {"id": "u2", "username": "bob"}]}
+        conn = AsyncMock(side_effect=fake_conn)
+        with patch.object(subscription_task.c, "get_users", AsyncMock(return_value=users)), \
+                patch.object(subscription_task.c, "bookshelf_conn", conn), \
+                patch.object(subscription_task.c, "bookshelf_get_valid_books", AsyncMock()) as valid_books:
+            first = await SubscriptionTask.getFinishedBooks()
+            self.assertEqual([(b["libraryItemId"], b["username"]) for b in first], [("a", "alice")])
+
+            progress["u2"].append({"mediaItemType": "book", "isFinished": True, "finishedAt": now,
+                                   "libraryItemId": "b", "displayTitle": "B"})
+            second = await SubscriptionTask.getFinishedBooks()
+
+        self.assertEqual([b["libraryItemId"] for b in second], ["b"])
+        self.assertEqual(conn.await_count, 4)
+        valid_books.assert_not_awaited()
+
+
 if __name__ == "__main__":
     unittest.main()
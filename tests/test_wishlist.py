@@ -72,5 +72,31 @@ class TestWishlistDatabase(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(all_rows[0][8], 1)
 
 
+    async def test_matcher_normalizes_and_refreshes(self):
+        await self.db.insert_wishlist_data(
+            title="The Hobbit", author="J.R.R. Tolkien", description="", cover="", provider="audible",
+            provider_id="B0099SQG2I", discord_id=1, data="{}")
+        await self.db.insert_wishlist_data(
+            title="Project Hail Mary", author="Andy Weir", description="", cover="", provider="audible",
+            provider_id="", discord_id=2, data="{}")
+
+        matcher = await self.db.get_matcher()
+        self.assertIs(await self.db.get_matcher(), matcher)
+
+        matches = matcher.match_books([
+            {"id": "a", "title": "The Hobbit (Unabridged)", "author": "Tolkien"},
+            {"id": "b", "title": "Projet Hail Mary", "author": "Andy Weir"},
+            {"id": "c", "title": "Something Else", "author": "", "provider_id": "b0099sqg2i"},
+            {"id": "d", "title": "Hail Mary", "author": "Someone Else"},
+        ])
+        self.assertEqual({book_id: [m[0] for m in found] for book_id, found in matches.items()},
+                         {"a": [1], "b": [2], "c": [1]})
+
+        # Marking as downloaded rebuilds the index without the entry
+        await self.db.update_wishlist_db(discord_id=1, downloaded=1, title="The Hobbit")
+        matcher = await self.db.get_matcher()
+        self.assertEqual(matcher.match("The Hobbit"), [])
+
+
 if __name__ == "__main__":
     unittest.main()